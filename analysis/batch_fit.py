@@ -0,0 +1,222 @@
+"""
+Closed form least squares fitting of many data sets at once.
+
+The models in analysis.slope_fit (linear, log10 and quadratic) are all linear in their parameters, so there is no need
+for the iterative optimization of scipy.optimize.curve_fit.  The methods here stack every data set into arrays and solve
+all of the weighted least squares problems together through a batched QR decomposition, returning the coefficients and
+their covariance for each data set.
+
+Coefficients are returned in the same order as the slope_fit equivalents:
+
+    linear: ( m, b )        for m * x + b
+    log10:  ( a, b )        for a * log10( x ) + b
+    quad:   ( a, b, c )     for a * x^2 + b * x + c
+
+The covariance follows the curve_fit convention (absolute_sigma=False): it is scaled by the reduced chi^2 of the fit,
+so sqrt( diag( cov ) ) matches the uncertainty reported by generic_fit( ..., get_uncertainty=True ).
+"""
+from typing import Iterable, List, Tuple
+
+from numpy import ndarray
+
+from spectrum import Spectrum
+
+
+def batch_least_squares( design: ndarray, y_data: ndarray, sigma: ndarray = None,
+                         mask: ndarray = None ) -> Tuple[ ndarray, ndarray ]:
+    """
+    Solves the weighted linear least squares problem y = design @ coeff for every row of y_data.
+
+    design may be shared by every row, with shape ( number of points, number of parameters ), or given per row with
+    shape ( number of rows, number of points, number of parameters ).  Points are excluded where mask is False, where
+    y_data, sigma or the design is not finite, or where sigma is zero.  Rows with fewer usable points than parameters
+    (or a singular design) have NaN coefficients and covariance.
+
+    :param design: Design matrix, shared or per row
+    :type design: ndarray
+    :param y_data: Data of shape ( number of rows, number of points )
+    :type y_data: ndarray
+    :param sigma: Uncertainty of each y_data point.  Defaults to None (unweighted)
+    :type sigma: ndarray
+    :param mask: Boolean array of points to use.  Defaults to None (all points)
+    :type mask: ndarray
+    :return: ( coefficients of shape ( rows, parameters ), covariance of shape ( rows, parameters, parameters ) )
+    :rtype: tuple
+    """
+    from numpy import asarray, broadcast_to, einsum, errstate, isfinite, nan, ones_like, sqrt, where
+    from numpy.linalg import matrix_rank, pinv, qr
+
+    y_data = asarray( y_data, dtype=float )
+    if y_data.ndim == 1:
+        y_data = y_data[ None, : ]
+    n_rows, n_points = y_data.shape
+    design = broadcast_to( asarray( design, dtype=float ), (n_rows, n_points, asarray( design ).shape[ -1 ]) )
+    n_params = design.shape[ -1 ]
+
+    sigma = ones_like( y_data ) if sigma is None else broadcast_to( asarray( sigma, dtype=float ), y_data.shape )
+    use = isfinite( y_data ) & isfinite( sigma ) & (sigma != 0) & isfinite( design ).all( axis=-1 )
+    if mask is not None:
+        use &= broadcast_to( asarray( mask, dtype=bool ), y_data.shape )
+
+    with errstate( divide='ignore', invalid='ignore' ):
+        root_w = where( use, 1 / sigma, 0 )
+    weighted_design = where( use[ ..., None ], design, 0 ) * root_w[ ..., None ]
+    weighted_y = where( use, y_data, 0 ) * root_w
+
+    # Scale the columns to unit norm so the QR is well conditioned (e.g. x^2 ~ 1e7 next to a constant term of 1)
+    col_scale = sqrt( einsum( 'rip,rip->rp', weighted_design, weighted_design ) )
+    col_scale = where( col_scale > 0, col_scale, 1 )
+    weighted_design = weighted_design / col_scale[ :, None, : ]
+
+    q, r = qr( weighted_design )
+    r_inv = pinv( r )
+    coeff = einsum( 'rpq,rq->rp', r_inv, einsum( 'rip,ri->rp', q, weighted_y ) )
+    residual = weighted_y - einsum( 'rip,rp->ri', weighted_design, coeff )
+
+    dof = use.sum( axis=1 ) - n_params
+    with errstate( divide='ignore', invalid='ignore' ):
+        reduced_chi = where( dof > 0, (residual ** 2).sum( axis=1 ) / dof, nan )
+    cov = einsum( 'rpk,rqk->rpq', r_inv, r_inv ) * reduced_chi[ :, None, None ]
+
+    coeff = coeff / col_scale
+    cov = cov / (col_scale[ :, :, None ] * col_scale[ :, None, : ])
+
+    bad = (use.sum( axis=1 ) < n_params) | (matrix_rank( r ) < n_params)
+    coeff[ bad ] = nan
+    cov[ bad ] = nan
+    return coeff, cov
+
+
+def linear_design( x_data: ndarray ) -> ndarray:
+    """
+    Design matrix for m * x + b.  Columns ( x, 1 )
+
+    :param x_data: x values, of any shape
+    :type x_data: ndarray
+    :rtype: ndarray
+    """
+    from numpy import asarray, ones_like, stack
+    x_data = asarray( x_data, dtype=float )
+    return stack( (x_data, ones_like( x_data )), axis=-1 )
+
+
+def log10_design( x_data: ndarray ) -> ndarray:
+    """
+    Design matrix for a * log10( x ) + b.  Columns ( log10( x ), 1 )
+
+    :param x_data: x values, of any shape
+    :type x_data: ndarray
+    :rtype: ndarray
+    """
+    from numpy import asarray, errstate, log10, ones_like, stack
+    x_data = asarray( x_data, dtype=float )
+    with errstate( divide='ignore', invalid='ignore' ):
+        return stack( (log10( x_data ), ones_like( x_data )), axis=-1 )
+
+
+def quad_design( x_data: ndarray ) -> ndarray:
+    """
+    Design matrix for a * x^2 + b * x + c.  Columns ( x^2, x, 1 )
+
+    :param x_data: x values, of any shape
+    :type x_data: ndarray
+    :rtype: ndarray
+    """
+    from numpy import asarray, ones_like, stack
+    x_data = asarray( x_data, dtype=float )
+    return stack( (x_data ** 2, x_data, ones_like( x_data )), axis=-1 )
+
+
+def batch_linear_fit( x_data: ndarray, y_data: ndarray, sigma: ndarray = None,
+                      mask: ndarray = None ) -> Tuple[ ndarray, ndarray ]:
+    """
+    Fits m * x + b to every row of y_data.  x_data may be shared, with shape ( number of points ), or given per row with
+    the shape of y_data.  See batch_least_squares for sigma and mask.
+
+    :param x_data: x values
+    :type x_data: ndarray
+    :param y_data: y values of shape ( number of rows, number of points )
+    :type y_data: ndarray
+    :param sigma: Uncertainty of each y_data point.  Defaults to None (unweighted)
+    :type sigma: ndarray
+    :param mask: Boolean array of points to use.  Defaults to None (all points)
+    :type mask: ndarray
+    :return: ( coefficients ( m, b ) per row, covariance per row )
+    :rtype: tuple
+    """
+    return batch_least_squares( linear_design( x_data ), y_data, sigma, mask )
+
+
+def batch_log10_fit( x_data: ndarray, y_data: ndarray, sigma: ndarray = None,
+                     mask: ndarray = None ) -> Tuple[ ndarray, ndarray ]:
+    """
+    Fits a * log10( x ) + b to every row of y_data.  x_data may be shared, with shape ( number of points ), or given
+    per row with the shape of y_data.  See batch_least_squares for sigma and mask.
+
+    :param x_data: x values
+    :type x_data: ndarray
+    :param y_data: y values of shape ( number of rows, number of points )
+    :type y_data: ndarray
+    :param sigma: Uncertainty of each y_data point.  Defaults to None (unweighted)
+    :type sigma: ndarray
+    :param mask: Boolean array of points to use.  Defaults to None (all points)
+    :type mask: ndarray
+    :return: ( coefficients ( a, b ) per row, covariance per row )
+    :rtype: tuple
+    """
+    return batch_least_squares( log10_design( x_data ), y_data, sigma, mask )
+
+
+def batch_quad_fit( x_data: ndarray, y_data: ndarray, sigma: ndarray = None,
+                    mask: ndarray = None ) -> Tuple[ ndarray, ndarray ]:
+    """
+    Fits a * x^2 + b * x + c to every row of y_data.  x_data may be shared, with shape ( number of points ), or given
+    per row with the shape of y_data.  See batch_least_squares for sigma and mask.
+
+    :param x_data: x values
+    :type x_data: ndarray
+    :param y_data: y values of shape ( number of rows, number of points )
+    :type y_data: ndarray
+    :param sigma: Uncertainty of each y_data point.  Defaults to None (unweighted)
+    :type sigma: ndarray
+    :param mask: Boolean array of points to use.  Defaults to None (all points)
+    :type mask: ndarray
+    :return: ( coefficients ( a, b, c ) per row, covariance per row )
+    :rtype: tuple
+    """
+    return batch_least_squares( quad_design( x_data ), y_data, sigma, mask )
+
+
+def spectrum_batch_linear_fit( speclist: Iterable[ Spectrum ], wl_low: float = None, wl_high: float = None,
+                               weighted: bool = False ) -> Tuple[ List[ str ], ndarray, ndarray ]:
+    """
+    Batch form of slope_fit.spectrum_linear_fit.  Fits Flux Density = m * Wavelength + b to every spectrum in speclist
+    over wl_low <= wavelength <= wl_high at once, e.g. spectrum_batch_linear_fit( speclist, *CONT_RANGE ) for the
+    continuum slopes of a catalog.
+
+    Spectra are stacked with spectrum.utils.stack_speclist; wavelengths missing from a spectrum are masked.  If weighted
+    is True, the flux density errors are used as the fit uncertainties.
+
+    :param speclist: Iterable of Spectrum to fit
+    :type speclist: Iterable
+    :param wl_low: Low limit of wavelength range.  Defaults to None
+    :type wl_low: float
+    :param wl_high: Upper limit of wavelength range.  Defaults to None
+    :type wl_high: float
+    :param weighted: Weight the fit by the flux density errors.  Defaults to False
+    :type weighted: bool
+    :return: ( namestrings, coefficients ( m, b ) per spectrum, covariance per spectrum )
+    :rtype: tuple
+    """
+    from spectrum.utils import align_wavelengths, stack_speclist
+
+    if not isinstance( speclist, list ):
+        speclist = list( speclist )
+    wavelengths = set()
+    for spec in speclist:
+        wavelengths.update( spec.keys() )
+    wavelengths = align_wavelengths( wavelengths, wavelengths, wl_low, wl_high )
+
+    namestrings, wavelengths, flux, err = stack_speclist( speclist, wavelengths )
+    coeff, cov = batch_linear_fit( wavelengths, flux, err if weighted else None )
+    return namestrings, coeff, cov
@@ -1,6 +1,6 @@
-from typing import Dict
+from typing import Dict, Iterable, Tuple
 
-from spectrum import Iterable, Spectrum, Tuple
+from spectrum import Spectrum
 
 
 def __chi_value( prime_point: Tuple[ float, float ], sec_point: Tuple[ float, float ], n_sigma: float ) -> float:
@@ -63,3 +63,33 @@ def multi_chi_analysis( primary: Spectrum, speclist: Iterable[ Spectrum ], wl_lo
     input_values = [ (primary, spec, wl_low, wl_high, n_sigma) for spec in speclist ]
     generic_unordered_multiprocesser( input_values, __multi_chi_wrapper, results )
     return dict( results )
+
+
+def multi_primary_chi( primary_flux, primary_err, secondary_flux, secondary_err, n_sigma: float = 1 ):
+    """
+    Vectorized form of chi() evaluating one secondary against many primaries at once.
+
+    The primaries are stacked onto a shared wavelength grid with shape ( number of primaries, number of wavelengths ),
+    and the secondary given on that same grid (see spectrum.utils.stack_speclist).  Wavelengths missing from either
+    spectrum must be NaN and are excluded, just as chi() uses only the wavelengths the two spectra share.
+
+    :param primary_flux: Stacked primary flux densities
+    :type primary_flux: ndarray
+    :param primary_err: Stacked primary flux density errors
+    :type primary_err: ndarray
+    :param secondary_flux: Secondary flux densities on the primary grid
+    :type secondary_flux: ndarray
+    :param secondary_err: Secondary flux density errors on the primary grid
+    :type secondary_err: ndarray
+    :param n_sigma: Error bound multiplier in which to define the overlap range where chi value is zero.  Defaults to 1.
+    :type n_sigma: float
+    :return: Chi^2 value of the secondary against each primary
+    :rtype: ndarray
+    """
+    from numpy import abs, errstate, isfinite, where
+
+    err = (primary_err + secondary_err) * n_sigma
+    diff = abs( primary_flux - secondary_flux )
+    with errstate( divide='ignore', invalid='ignore' ):
+        values = where( err > diff, diff ** 2 / primary_flux, 0 )
+    return where( isfinite( diff ) & isfinite( err ), values, 0 ).sum( axis=-1 )
@@ -1,4 +1,6 @@
-from spectrum import Spectrum, align_wavelengths
+from typing import Iterator, List
+
+from spectrum import Iterable, Spectrum, align_wavelengths
 
 
 def divide( numerator: Spectrum, denominator: Spectrum, wl_low: float = None, wl_high: float = None ) -> Spectrum:
@@ -28,3 +30,116 @@ def divide( numerator: Spectrum, denominator: Spectrum, wl_low: float = None, wl
         divided[ wl ] = (flux, err)
 
     return divided
+
+
+def divide_arrays( num_flux, num_err, den_flux, den_err ) -> tuple:
+    """
+    Vectorized form of the divide() error propagation.  The numerator arrays may be a stack of shape
+    ( number of spectra, number of wavelengths ), which the denominator arrays ( number of wavelengths ) are broadcast
+    across.  Points where the denominator is zero (or either value is NaN) are masked with NaN in both returned arrays.
+
+    :param num_flux: Numerator flux density array
+    :type num_flux: ndarray
+    :param num_err: Numerator flux density error array
+    :type num_err: ndarray
+    :param den_flux: Denominator flux density array
+    :type den_flux: ndarray
+    :param den_err: Denominator flux density error array
+    :type den_err: ndarray
+    :return: ( flux, err ) arrays of the divided values
+    :rtype: tuple
+    """
+    from numpy import asarray, errstate, nan, sqrt, where
+
+    den_flux = asarray( den_flux, dtype=float )
+    den_err = asarray( den_err, dtype=float )
+    zero_mask = den_flux == 0
+    d = where( zero_mask, nan, den_flux )
+
+    with errstate( divide='ignore', invalid='ignore' ):
+        flux = num_flux / d
+        err = sqrt( (num_err / d) ** 2 + (num_flux / (d ** 2) * den_err) ** 2 )
+    return flux, err
+
+
+def batch_divide( numerators: Iterable[ Spectrum ], denominator: Spectrum, wl_low: float = None,
+                  wl_high: float = None, chunk_size: int = 500 ) -> Iterator[ tuple ]:
+    """
+    Divides every spectrum in numerators by the single denominator spectrum, chunk_size spectra at a time.  The same
+    error propagation as divide() is used, but no Spectrum objects are formed.  Instead, this is a generator yielding
+    one tuple per chunk:
+    
+    ( namestrings, wavelengths, flux, err )
+    
+    where wavelengths are the denominator wavelengths within wl_low <= wl <= wl_high and flux / err are arrays of shape
+    ( len( namestrings ), len( wavelengths ) ).  Wavelengths missing from a numerator, or where the denominator is zero,
+    are NaN.
+    
+    numerators may be any iterable (such as a generator loading from the disk); only one chunk is held at a time.
+    
+    :param numerators: Iterable of Spectrum to be divided
+    :type numerators: Iterable
+    :param denominator: Spectrum to divide by (typically a composite)
+    :type denominator: Spectrum
+    :param wl_low: Minimum wavelength.  Defaults to None
+    :type wl_low: float
+    :param wl_high: Maximum wavelength.  Defaults to None
+    :type wl_high: float
+    :param chunk_size: Number of spectra divided per chunk.  Defaults to 500
+    :type chunk_size: int
+    :return: Generator of ( namestrings, wavelengths, flux, err ) chunks
+    :rtype: Iterator
+    """
+    from itertools import islice
+    from spectrum.utils import stack_speclist
+
+    wls = align_wavelengths( denominator, denominator, wl_low, wl_high )
+    _, wls, den_flux, den_err = stack_speclist( [ denominator ], wls )
+
+    numerators = iter( numerators )
+    while True:
+        chunk = list( islice( numerators, chunk_size ) )
+        if len( chunk ) == 0:
+            break
+        namestrings, _, num_flux, num_err = stack_speclist( chunk, wls )
+        del chunk
+        flux, err = divide_arrays( num_flux, num_err, den_flux[ 0 ], den_err[ 0 ] )
+        yield namestrings, wls, flux, err
+
+
+def batch_divide_to_disk( numerators: Iterable[ Spectrum ], denominator: Spectrum, path: str,
+                          filename: str = "divided", wl_low: float = None, wl_high: float = None,
+                          chunk_size: int = 500 ) -> List[ str ]:
+    """
+    Streams the chunks of batch_divide() to the disk as they are formed.  Each chunk is written with
+    fileio.utils.object_writer as the tuple ( namestrings, wavelengths, flux, err ) to the file
+    
+    /path/filename_####.dchunk
+    
+    and may be read back in with fileio.utils.object_loader.  Returns the list of chunk file names written, in order.
+    
+    :param numerators: Iterable of Spectrum to be divided
+    :type numerators: Iterable
+    :param denominator: Spectrum to divide by
+    :type denominator: Spectrum
+    :param path: /path/to/output directory
+    :type path: str
+    :param filename: Leading chunk file name.  Defaults to "divided"
+    :type filename: str
+    :param wl_low: Minimum wavelength.  Defaults to None
+    :type wl_low: float
+    :param wl_high: Maximum wavelength.  Defaults to None
+    :type wl_high: float
+    :param chunk_size: Number of spectra per chunk file.  Defaults to 500
+    :type chunk_size: int
+    :return: List of chunk file names
+    :rtype: list
+    """
+    from fileio.utils import object_writer
+
+    written = [ ]
+    for i, chunk in enumerate( batch_divide( numerators, denominator, wl_low, wl_high, chunk_size ) ):
+        chunk_name = f"{filename}_{i:04d}.dchunk"
+        object_writer( chunk, path, chunk_name )
+        written.append( chunk_name )
+    return written
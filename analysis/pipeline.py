@@ -1,4 +1,4 @@
-from typing import Callable, Dict, Iterable, Optional, Tuple, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from common.constants import CHI_BASE_MAG
 from spectrum import Spectrum, flux_from_AB
@@ -23,15 +23,34 @@ class analysis_pipeline:
        
     Both before and after reduce_results() is called, get_results() can be called and the results dictionary will be
     returned.  If do_analysis() has not yet been called, both of these methods will raise an AssertionError. 
+    
+    Alternatively, stream_analysis() may be used in place of do_analysis() and reduce_results().  It yields each result
+    as soon as a worker returns it, applying the range_limits (or a custom reduction function) on arrival, so only the
+    surviving results are ever held.  Survivors may also be passed directly to a sink, such as a
+    fileio.list_dict_utils.csv_result_sink.
+    
+    Long runs may be checkpointed by passing a checkpoint_file and an input_key function at initialization.  Every
+    completed ( namestring, value ) result is then periodically saved to the checkpoint_file (see pipeline_checkpoint).
+    Should the run be interrupted - by CTRL+C, a crash, etc - a new pipeline with the same analysis_function,
+    range_limits and checkpoint_tag will restore the saved results, skip every input whose input_key was completed, and
+    merge the new results with the restored ones.  The checkpoint_file is left in place once the run completes; delete
+    it to force a full rerun.
     """
     __input_list = None
     __range_limits = None
     __analysis_function = None
     __results = None
+    __checkpoint_file = None
+    __checkpoint_interval = 100
+    __checkpoint_tag = ""
+    __input_key = None
+    __backend = "process"
 
     def __init__( self, input_list: Iterable,
                   analysis_function: Callable[ [ object ], Tuple[ str, float ] ],
-                  range_limits: Tuple[ Optional[ float ], Optional[ float ] ] = (None, None) ):
+                  range_limits: Tuple[ Optional[ float ], Optional[ float ] ] = (None, None),
+                  checkpoint_file: str = None, input_key: Callable[ [ object ], str ] = None,
+                  checkpoint_tag: str = "", checkpoint_interval: int = 100, backend: str = "process" ):
         """
         analysis_pipeline initializer.  See class comments for further information.
         
@@ -54,24 +73,111 @@ class analysis_pipeline:
         :param range_limits: ( Min, Max ) limitations to be used of the float returned value from analysis_function when
         reduce_results() is called.
         :type range_limits: tuple
+        :param checkpoint_file: /path/to/checkpoint file.  Defaults to None (no checkpointing)
+        :type checkpoint_file: str
+        :param input_key: Method which returns, for a value of input_list, the namestring analysis_function will return
+        for it.  Required if checkpoint_file is passed
+        :type input_key: Callable
+        :param checkpoint_tag: Any further description of the run configuration (such as the primary namestring) which
+        must match for a checkpoint to be resumed.  Defaults to ""
+        :type checkpoint_tag: str
+        :param checkpoint_interval: Number of results between checkpoint saves.  Defaults to 100
+        :type checkpoint_interval: int
+        :param backend: Execution backend used to operate analysis_function (see tools.async_tools).  Defaults to
+        "process"
+        :type backend: str
+        :raises: ValueError
         """
+        if checkpoint_file is not None and input_key is None:
+            raise ValueError( "analysis_pipeline: An input_key method is required to checkpoint the pipeline" )
         self.__input_list = input_list
         self.__range_limits = range_limits
         self.__analysis_function = analysis_function
+        self.__checkpoint_file = checkpoint_file
+        self.__input_key = input_key
+        self.__checkpoint_tag = checkpoint_tag
+        self.__checkpoint_interval = checkpoint_interval
+        self.__backend = backend
 
     def do_analysis( self ):
         """
         Start the analysis_function processing.
         :return: 
         """
-        assert self.__primeSpec is not None and self.__input_list is not None and self.__analysis_function is not None and self.__range_limits is not None
-        from tools.async_tools import generic_unordered_multiprocesser
-        from tools.list_dict import paired_list_to_dict
+        assert self.__input_list is not None and self.__analysis_function is not None and self.__range_limits is not None
+        self.__results = dict( self.__run() )
 
-        results = [ ]
-        generic_unordered_multiprocesser( input_values=self.__input_list, multi_function=self.__analysis_function,
-                                          output_values=results )
-        self.__results = paired_list_to_dict( results )
+    def stream_analysis( self, reduction_fuction: Optional[ Callable[ [ Tuple[ str, float ] ], bool ] ] = None,
+                         sink: Optional[ Callable[ [ Tuple[ str, float ] ], None ] ] = None ) -> Iterator[
+        Tuple[ str, float ] ]:
+        """
+        Streaming alternative to do_analysis() followed by reduce_results().  A generator which yields each
+        ( namestring, value ) result that survives reduction as soon as it is returned by a worker process, in no
+        particular order.
+        
+        If reduction_function is not passed, the range_limits provided at initialization are used.  Otherwise the
+        custom reduction function is applied as in reduce_results().
+        
+        If sink is passed, it is called with each surviving ( namestring, value ) tuple as it arrives (i.e. a
+        fileio.list_dict_utils.csv_result_sink to write results straight to the disk).
+        
+        The surviving results are stored as they arrive, and are available from get_results() once the generator has
+        been exhausted.  To run the stream to completion without handling each result, pass it to a deque of maxlen=0
+        or simply loop over it:
+        
+        for namestring, value in pipeline.stream_analysis( sink=csv_sink ):
+            ...
+        
+        :param reduction_fuction: Custom method to determine reduction of results.  Must accept a tuple of ( str, float )
+        :type reduction_fuction: Callable
+        :param sink: Callable to be passed each surviving result
+        :type sink: Callable
+        :return: Generator of surviving ( namestring, value ) results
+        :rtype: Iterator
+        """
+        assert self.__input_list is not None and self.__analysis_function is not None and self.__range_limits is not None
+        keep = reduction_fuction if reduction_fuction is not None else self.__in_range_limits
+        survivors = { }
+        for result in self.__run():
+            if not keep( result ):
+                continue
+            survivors[ result[ 0 ] ] = result[ 1 ]
+            if sink is not None:
+                sink( result )
+            yield result
+        self.__results = survivors
+
+    def __run( self ) -> Iterator[ Tuple[ str, float ] ]:
+        """
+        Yields every ( namestring, value ) result as it is returned, first restoring those of any matching checkpoint
+        and then skipping their inputs.
+        """
+        from tools.async_tools import generic_unordered_multiprocesser_iter
+
+        input_values = self.__input_list
+        checkpoint = None
+        if self.__checkpoint_file is not None:
+            checkpoint = pipeline_checkpoint( self.__checkpoint_file,
+                                              pipeline_signature( self.__analysis_function, self.__range_limits,
+                                                                  self.__checkpoint_tag ), self.__checkpoint_interval )
+            completed = checkpoint.open()
+            for result in completed.items():
+                yield result
+            input_values = (value for value in input_values if self.__input_key( value ) not in completed)
+
+        try:
+            for result in generic_unordered_multiprocesser_iter( input_values, self.__analysis_function,
+                                                                 backend=self.__backend ):
+                if checkpoint is not None:
+                    checkpoint.record( result )
+                yield result
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
+    def __in_range_limits( self, result: Tuple[ str, float ] ) -> bool:
+        low_limit, high_limit = self.__range_limits
+        return (low_limit is None or result[ 1 ] >= low_limit) and (high_limit is None or result[ 1 ] <= high_limit)
 
     def reduce_results( self, reduction_fuction: Optional[ Callable[ [ Tuple[ str, float ] ], bool ] ] = None ) -> dict:
         """
@@ -133,9 +239,345 @@ class analysis_pipeline:
         return self.__results
 
 
+def pipeline_signature( analysis_function: Callable, range_limits: Tuple[ Optional[ float ], Optional[ float ] ],
+                        checkpoint_tag: str = "" ) -> tuple:
+    """
+    The configuration signature stored in an analysis_pipeline checkpoint.  A checkpoint is only resumed when the
+    signature of the new pipeline matches.
+
+    :param analysis_function: The pipeline analysis function
+    :type analysis_function: Callable
+    :param range_limits: The pipeline range limits
+    :type range_limits: tuple
+    :param checkpoint_tag: Further description of the run configuration.  Defaults to ""
+    :type checkpoint_tag: str
+    :return: Signature tuple
+    :rtype: tuple
+    """
+    return (f"{analysis_function.__module__}.{analysis_function.__qualname__}", tuple( range_limits ),
+            str( checkpoint_tag ))
+
+
+class pipeline_checkpoint:
+    """
+    Append-only checkpoint file of completed ( namestring, value ) results, as used by analysis_pipeline.
+
+    The file is a sequence of pickled records:  first the configuration signature (see pipeline_signature), then one
+    ( namestring, value ) record per completed result.  Records are buffered and saved every interval results or every
+    max_seconds, whichever comes first, and on close().  Any partially written record at the end of the file (from a
+    crash mid-save) is discarded when the checkpoint is reopened.
+    """
+
+    def __init__( self, path: str, signature: tuple, interval: int = 100, max_seconds: float = 60 ):
+        """
+        :param path: /path/to/checkpoint file
+        :type path: str
+        :param signature: Run configuration signature
+        :type signature: tuple
+        :param interval: Number of results between saves.  Defaults to 100
+        :type interval: int
+        :param max_seconds: Maximum number of seconds between saves.  Defaults to 60
+        :type max_seconds: float
+        """
+        self.__path = path
+        self.__signature = signature
+        self.__interval = max( 1, interval )
+        self.__max_seconds = max_seconds
+        self.__buffer = [ ]
+        self.__outfile = None
+        self.__last_save = 0
+
+    @staticmethod
+    def read( path: str, signature: tuple ) -> Dict[ str, float ]:
+        """
+        Returns the { namestring : value } results saved in the checkpoint at path.  If the file does not exist, or was
+        written with a different signature, an empty dictionary is returned.
+
+        :param path: /path/to/checkpoint file
+        :type path: str
+        :param signature: Run configuration signature
+        :type signature: tuple
+        :return: Saved results
+        :rtype: dict
+        """
+        import os
+        import pickle
+
+        completed = { }
+        if not os.path.isfile( path ):
+            return completed
+        with open( path, 'rb' ) as infile:
+            try:
+                if pickle.load( infile ) != signature:
+                    return completed
+                while True:
+                    namestring, value = pickle.load( infile )
+                    completed[ namestring ] = value
+            except (EOFError, pickle.UnpicklingError, ValueError, TypeError):
+                pass
+        return completed
+
+    def open( self ) -> Dict[ str, float ]:
+        """
+        Opens the checkpoint for recording, returning the results already saved with a matching signature.  The file is
+        rewritten with only those valid results before new records are appended.  A checkpoint with a different
+        signature is replaced.  The rewritten file is written alongside and moved over the old one only once complete,
+        so the saved results survive an interruption at any point.
+
+        :return: Saved results
+        :rtype: dict
+        """
+        import os
+        import pickle
+        import tempfile
+        from time import time
+        from common.messaging import tab_print
+        from fileio.utils import dirCheck
+
+        completed = self.read( self.__path, self.__signature )
+        if os.path.isfile( self.__path ) and len( completed ) == 0:
+            tab_print( f"pipeline_checkpoint: {self.__path} does not match this configuration.  Starting over." )
+        elif len( completed ) > 0:
+            tab_print( f"pipeline_checkpoint: Resuming with {len( completed )} completed results." )
+
+        directory = os.path.split( os.path.abspath( self.__path ) )[ 0 ]
+        dirCheck( directory )
+        handle, temp_path = tempfile.mkstemp( prefix=os.path.basename( self.__path ) + ".", suffix=".tmp",
+                                              dir=directory )
+        try:
+            with os.fdopen( handle, 'wb' ) as outfile:
+                pickle.dump( self.__signature, outfile, protocol=pickle.HIGHEST_PROTOCOL )
+                for result in completed.items():
+                    pickle.dump( result, outfile, protocol=pickle.HIGHEST_PROTOCOL )
+                outfile.flush()
+                os.fsync( outfile.fileno() )
+            os.replace( temp_path, self.__path )
+        except BaseException:
+            if os.path.exists( temp_path ):
+                os.remove( temp_path )
+            raise
+
+        self.__outfile = open( self.__path, 'ab' )
+        self.__last_save = time()
+        return completed
+
+    def record( self, result: Tuple[ str, float ] ) -> None:
+        """
+        Buffers a completed result, saving the buffer if interval results or max_seconds have passed.
+
+        :param result: ( namestring, value )
+        :type result: tuple
+        :rtype: None
+        """
+        from time import time
+        self.__buffer.append( result )
+        if len( self.__buffer ) >= self.__interval or time() - self.__last_save >= self.__max_seconds:
+            self.__save()
+
+    def close( self ) -> None:
+        """
+        Saves any buffered results and closes the file.
+
+        :rtype: None
+        """
+        if self.__outfile is not None:
+            self.__save()
+            self.__outfile.close()
+            self.__outfile = None
+
+    def __save( self ) -> None:
+        import os
+        import pickle
+        from time import time
+
+        for result in self.__buffer:
+            pickle.dump( tuple( result ), self.__outfile, protocol=pickle.HIGHEST_PROTOCOL )
+        self.__buffer = [ ]
+        self.__outfile.flush()
+        os.fsync( self.__outfile.fileno() )
+        self.__last_save = time()
+
+
+class pipeline_stage:
+    """
+    A single stage of a staged_pipeline.  The stage function accepts one item from the previous stage (or the source)
+    and returns one item for the next stage.  Returning None drops the item, so a stage may also act as a filter.
+
+    workers threads run the stage concurrently.  Threads suit disk reads and NumPy work, which release the GIL.  For
+    pure Python, CPU bound work pass use_processes=True:  each worker thread then hands its items to the shared process
+    pool of tools.async_tools (see acquire_shared_pool), so the function (and items) must be picklable.  At most workers
+    items of the stage are then in the pool at once, and the pool's size bounds how many of them run at the same time.
+
+    queue_size bounds the number of items waiting to enter this stage.  When it is full, the previous stage blocks until
+    this stage catches up (back-pressure), so no stage can run far ahead of the others.
+    """
+
+    def __init__( self, function: Callable[ [ object ], object ], workers: int = 1, queue_size: int = None,
+                  use_processes: bool = False, name: str = None ):
+        """
+        :param function: Stage function.  Accepts one item, returns one item or None to drop it
+        :type function: Callable
+        :param workers: Number of concurrent workers.  Defaults to 1
+        :type workers: int
+        :param queue_size: Maximum number of items waiting for this stage.  Defaults to 2 * workers
+        :type queue_size: int
+        :param use_processes: Run the function in the shared process pool.  Defaults to False
+        :type use_processes: bool
+        :param name: Stage name used in error messages.  Defaults to the function name
+        :type name: str
+        """
+        self.function = function
+        self.workers = max( 1, workers )
+        self.queue_size = queue_size or 2 * self.workers
+        self.use_processes = use_processes
+        self.name = name or getattr( function, "__name__", "stage" )
+
+
+class staged_pipeline:
+    """
+    Runs a source iterable through a series of pipeline_stage objects connected by bounded queues, i.e.
+    
+    load -> scale -> analyze -> reduce -> write
+    
+    Every stage runs at the same time with its own number of workers, so disk reads overlap computation, and the
+    bounded queues mean no intermediate is ever fully materialized.  Items are not kept in order.
+    
+    run() is a generator yielding each item that leaves the final stage.  If sink is passed, it is also called with each
+    of those items.  Should any stage raise an exception, the remaining items are drained and the first exception is
+    raised from run() once the stages have stopped.
+    """
+    __DONE = object()
+
+    def __init__( self, source: Iterable, stages: List[ pipeline_stage ],
+                  sink: Optional[ Callable[ [ object ], None ] ] = None, output_queue_size: int = 64 ):
+        """
+        :param source: Iterable of items passed to the first stage
+        :type source: Iterable
+        :param stages: Ordered list of stages
+        :type stages: list
+        :param sink: Callable passed each item leaving the final stage.  Defaults to None
+        :type sink: Callable
+        :param output_queue_size: Maximum number of finished items waiting to be yielded.  Defaults to 64
+        :type output_queue_size: int
+        """
+        self.__source = source
+        self.__stages = list( stages )
+        self.__sink = sink
+        self.__output_queue_size = output_queue_size
+
+    def run( self ) -> Iterator:
+        """
+        Starts every stage and yields items from the final stage as they finish.  Stopping iteration early stops the
+        stages.
+
+        :return: Generator of final stage items
+        :rtype: Iterator
+        """
+        from queue import Queue
+        from threading import Event, Lock, Thread
+        from tools.async_tools import release_shared_pool
+
+        queues = [ Queue( maxsize=stage.queue_size ) for stage in self.__stages ]
+        queues.append( Queue( maxsize=self.__output_queue_size ) )
+        stop = Event()
+        errors = [ ]
+        threads = [ ]
+
+        def put( q: Queue, item: object ) -> None:
+            from queue import Full
+            while not stop.is_set():
+                try:
+                    q.put( item, timeout=0.1 )
+                    return
+                except Full:
+                    continue
+
+        def get( q: Queue ) -> object:
+            from queue import Empty
+            while not stop.is_set():
+                try:
+                    return q.get( timeout=0.1 )
+                except Empty:
+                    continue
+            return self.__DONE
+
+        def feed() -> None:
+            try:
+                for item in self.__source:
+                    if stop.is_set():
+                        break
+                    put( queues[ 0 ], item )
+            except BaseException as e:
+                errors.append( e )
+            finally:
+                for _ in range( self.__stages[ 0 ].workers ):
+                    put( queues[ 0 ], self.__DONE )
+
+        def work( i: int, stage: pipeline_stage, pool, remaining: list, lock: Lock ) -> None:
+            # BaseException, as some methods (i.e. Spectrum.aveFlux) call exit() on bad input.  The last worker of a
+            # stage always passes DONE on, or run() would wait on the final queue forever
+            in_q, out_q = queues[ i ], queues[ i + 1 ]
+            try:
+                while True:
+                    item = get( in_q )
+                    if item is self.__DONE:
+                        break
+                    if len( errors ) > 0:
+                        continue
+                    try:
+                        result = stage.function( item ) if pool is None else pool.apply( stage.function, (item,) )
+                    except BaseException as e:
+                        errors.append(
+                                RuntimeError( f"staged_pipeline: Stage '{stage.name}' failed on an item: {e!r}" ) )
+                        continue
+                    if result is not None:
+                        put( out_q, result )
+            finally:
+                with lock:
+                    remaining[ 0 ] -= 1
+                    last = remaining[ 0 ] == 0
+                if last:
+                    if pool is not None:
+                        release_shared_pool( pool )
+                    downstream = self.__stages[ i + 1 ].workers if i + 1 < len( self.__stages ) else 1
+                    for _ in range( downstream ):
+                        put( out_q, self.__DONE )
+
+        for i, stage in enumerate( self.__stages ):
+            pool = None
+            if stage.use_processes:
+                # Held until the stage's last worker finishes, so a restart of the shared pool cannot terminate it
+                from tools.async_tools import acquire_shared_pool
+                pool = acquire_shared_pool( stage.function )
+            remaining, lock = [ stage.workers ], Lock()
+            for _ in range( stage.workers ):
+                threads.append( Thread( target=work, args=(i, stage, pool, remaining, lock), daemon=True ) )
+        threads.append( Thread( target=feed, daemon=True ) )
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[ -1 ].get()
+                if item is self.__DONE:
+                    break
+                if self.__sink is not None:
+                    self.__sink( item )
+                yield item
+        finally:
+            stop.set()
+            for q in queues:
+                while not q.empty():
+                    q.get_nowait()
+
+        if len( errors ) > 0:
+            raise errors[ 0 ]
+
+
 def get_chi_analysis_pipeline( primary_spectrum: Union[ Spectrum, str ], speclist: Iterable[ Union[ Spectrum, str ] ],
                                wl_limits: Tuple[ float, float ], maximum_chi_value: float, n_sigma: float = 1,
-                               scale_AB_mag: float = CHI_BASE_MAG ) -> analysis_pipeline:
+                               scale_AB_mag: float = CHI_BASE_MAG, checkpoint_file: str = None,
+                               backend: str = "process" ) -> analysis_pipeline:
     """
     Prebuilt method for forming a chi^2 analysis pipeline with the analysis_pipeline class.
     
@@ -150,6 +592,10 @@ def get_chi_analysis_pipeline( primary_spectrum: Union[ Spectrum, str ], speclis
     The pipeline object, prepared with range_limits of ( None, maximum_chi_value ) is returned.  No analysis is
     performed; neither do_analysis() nor reduce_results() are called. 
     
+    If checkpoint_file is passed, the pipeline is checkpointed there (see analysis_pipeline).  The primary namestring,
+    wl_limits, n_sigma and scale_AB_mag form the checkpoint tag, and namestrings already completed in a matching
+    checkpoint are not loaded from the disk at all.
+    
     :param primary_spectrum: Spectrum to perform chi^2 matching to.  May be a namestring or Spectrum object
     :type primary_spectrum: str or Spectrum
     :param speclist: Iterable of Spectrum or namestring objects to match to primary
@@ -162,6 +608,10 @@ def get_chi_analysis_pipeline( primary_spectrum: Union[ Spectrum, str ], speclis
     :type n_sigma: float
     :param scale_AB_mag: AB magnitude to scale all objects to.  Defaults to common.constants.CHI_BASE_MAG
     :type scale_AB_mag: float
+    :param checkpoint_file: /path/to/checkpoint file.  Defaults to None (no checkpointing)
+    :type checkpoint_file: str
+    :param backend: Execution backend of the pipeline (see tools.async_tools).  Defaults to "process"
+    :type backend: str
     :return: Prepared chi^2 analysis pipeline.
     :rtype: analysis_pipeline
     """
@@ -174,14 +624,175 @@ def get_chi_analysis_pipeline( primary_spectrum: Union[ Spectrum, str ], speclis
     primary_spectrum.scale( scaleflux=flux_from_AB( scale_AB_mag ) )
     if not isinstance( speclist, list ):
         speclist = list( speclist )
-    if not isinstance( speclist[ 0 ], Spectrum ):
-        speclist = async_rspec_scaled( speclist, primary_spectrum )
-    else:
-        speclist = mutli_scale( primary_spectrum, speclist )
+    checkpoint_tag = f"{primary_spectrum.getNS()}|{tuple( wl_limits )}|{n_sigma}|{scale_AB_mag}"
+    if checkpoint_file is not None and len( speclist ) > 0 and isinstance( speclist[ 0 ], str ):
+        completed = pipeline_checkpoint.read( checkpoint_file,
+                                              pipeline_signature( chi_pipeline_function, (None, maximum_chi_value),
+                                                                  checkpoint_tag ) )
+        speclist = [ ns for ns in speclist if ns not in completed ]
+    if len( speclist ) > 0:
+        if not isinstance( speclist[ 0 ], Spectrum ):
+            speclist = async_rspec_scaled( speclist, primary_spectrum )
+        else:
+            speclist = mutli_scale( primary_spectrum, speclist )
 
     input_values = [ (primary_spectrum, spec, wl_limits[ 0 ], wl_limits[ 1 ], n_sigma) for spec in speclist ]
     return analysis_pipeline( input_values, chi_pipeline_function,
-                              (None, maximum_chi_value) )
+                              (None, maximum_chi_value), checkpoint_file=checkpoint_file, input_key=chi_input_key,
+                              checkpoint_tag=checkpoint_tag, backend=backend )
+
+
+def get_chi_staged_pipeline( primary_spectrum: Union[ Spectrum, str ], speclist: Iterable[ Union[ Spectrum, str ] ],
+                             wl_limits: Tuple[ float, float ], maximum_chi_value: float, n_sigma: float = 1,
+                             scale_AB_mag: float = CHI_BASE_MAG, load_workers: int = 4, chi_workers: int = None,
+                             sink: Optional[ Callable[ [ Tuple[ str, float ] ], None ] ] = None ) -> staged_pipeline:
+    """
+    Prebuilt staged_pipeline form of get_chi_analysis_pipeline.  Rather than loading and scaling the entire speclist
+    before any chi^2 values are found, the stages
+    
+    load (load_workers threads) -> scale -> chi^2 (shared process pool) -> reduce -> sink
+    
+    run concurrently through bounded queues, so disk loading overlaps the chi^2 computation.  speclist values may be
+    Spectrum objects or namestrings (loaded from REST_SPEC_PATH), and may be mixed.  Spectrum objects passed in are
+    copied before scaling, so are not modified.
+    
+    Call .run() on the returned pipeline to start it; it yields each ( namestring, chi^2 ) result no greater than
+    maximum_chi_value, and passes it to sink if one is given (such as a fileio.list_dict_utils.csv_result_sink).
+    
+    :param primary_spectrum: Spectrum to perform chi^2 matching to.  May be a namestring or Spectrum object
+    :type primary_spectrum: str or Spectrum
+    :param speclist: Iterable of Spectrum or namestring objects to match to primary
+    :type speclist: Iterable
+    :param wl_limits: tuple of ( wl_low, wl_high ) range to match against.
+    :type wl_limits: tuple
+    :param maximum_chi_value: Maximum value of chi^2 result to keep
+    :type maximum_chi_value: float
+    :param n_sigma: Uncertainty multiplier to be passed to analysis.chi.  Defaults to 1.
+    :type n_sigma: float
+    :param scale_AB_mag: AB magnitude to scale all objects to.  Defaults to common.constants.CHI_BASE_MAG
+    :type scale_AB_mag: float
+    :param load_workers: Number of loading threads.  Defaults to 4
+    :type load_workers: int
+    :param chi_workers: Number of chi^2 items sent to the shared process pool at once.  Defaults to its size
+    :type chi_workers: int
+    :param sink: Callable to be passed each kept result.  Defaults to None
+    :type sink: Callable
+    :return: Prepared staged chi^2 pipeline
+    :rtype: staged_pipeline
+    """
+    from fileio.spec_load_write import rspecLoader
+    from fileio.utils import fns
+    from tools.async_tools import shared_pool_size
+
+    if isinstance( primary_spectrum, str ):
+        primary_spectrum = rspecLoader( fns( primary_spectrum ) )
+    else:
+        primary_spectrum = primary_spectrum.cpy()
+    primary_spectrum.scale( scaleflux=flux_from_AB( scale_AB_mag ) )
+    scale_flux = primary_spectrum.aveFlux()
+
+    def load_stage( spec: Union[ Spectrum, str ] ) -> Spectrum:
+        # Copied, as scale_stage scales in place
+        return rspecLoader( spec ) if isinstance( spec, str ) else spec.cpy()
+
+    def scale_stage( spec: Spectrum ) -> tuple:
+        spec.scale( scaleflux=scale_flux )
+        return (primary_spectrum, spec, wl_limits[ 0 ], wl_limits[ 1 ], n_sigma)
+
+    def reduce_stage( result: Tuple[ str, float ] ) -> Optional[ Tuple[ str, float ] ]:
+        return result if result[ 1 ] <= maximum_chi_value else None
+
+    stages = [ pipeline_stage( load_stage, load_workers, name="load" ),
+               pipeline_stage( scale_stage, 1, name="scale" ),
+               pipeline_stage( chi_pipeline_function, chi_workers or shared_pool_size(), use_processes=True,
+                               name="chi" ),
+               pipeline_stage( reduce_stage, 1, name="reduce" ) ]
+    return staged_pipeline( speclist, stages, sink )
+
+
+def multi_primary_chi_analysis( primaries: Iterable[ Union[ Spectrum, str ] ],
+                                speclist: Iterable[ Union[ Spectrum, str ] ], wl_limits: Tuple[ float, float ],
+                                maximum_chi_value: float = None, n_sigma: float = 1,
+                                scale_AB_mag: float = CHI_BASE_MAG, chunk_size: int = 100,
+                                MAX_PROC: int = None ) -> Dict[ str, Dict[ str, float ] ]:
+    """
+    Chi^2 matches many primaries against a catalog in a single pass over its spectra.
+
+    Equivalent to calling get_chi_analysis_pipeline( primary, speclist, wl_limits, maximum_chi_value, ... ) followed by
+    do_analysis() and reduce_results() for each primary, without loading and scanning speclist once per primary.
+
+    Every primary is scaled to an AB magnitude of scale_AB_mag and the primaries are stacked onto one wavelength grid
+    limited to wl_limits.  speclist is then split into chunks of chunk_size spread over worker processes.  Each
+    secondary is loaded (if passed as a namestring, from REST_SPEC_PATH) and scaled once, and its chi^2 value against
+    all primaries is determined in a single vectorized step by analysis.chi.multi_primary_chi.  Results arrive as they
+    finish and only values <= maximum_chi_value (if passed) are kept.
+
+    :param primaries: Iterable of Spectrum or namestrings to match against.  Namestrings must be unique.
+    :type primaries: Iterable
+    :param speclist: Iterable of Spectrum or namestring objects to match to the primaries
+    :type speclist: Iterable
+    :param wl_limits: tuple of ( wl_low, wl_high ) range to match against.
+    :type wl_limits: tuple
+    :param maximum_chi_value: Maximum chi^2 value to keep.  Defaults to None (all values kept)
+    :type maximum_chi_value: float
+    :param n_sigma: Uncertainty multiplier, as in analysis.chi.  Defaults to 1.
+    :type n_sigma: float
+    :param scale_AB_mag: AB magnitude to scale all objects to.  Defaults to common.constants.CHI_BASE_MAG
+    :type scale_AB_mag: float
+    :param chunk_size: Number of secondaries per worker task.  Defaults to 100
+    :type chunk_size: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: { primary namestring : { secondary namestring : chi^2 value } }
+    :rtype: dict
+    :raises: ValueError
+    """
+    from fileio.spec_load_write import rspecLoader
+    from fileio.utils import fns
+    from spectrum.utils import align_wavelengths, stack_speclist
+    from tools.async_tools import generic_unordered_multiprocesser_iter
+
+    scale_flux = flux_from_AB( scale_AB_mag )
+    primaries = [ rspecLoader( fns( p ) ) if isinstance( p, str ) else p.cpy() for p in primaries ]
+    for primary in primaries:
+        primary.scale( scaleflux=scale_flux )
+
+    wavelengths = set()
+    for primary in primaries:
+        wavelengths.update( primary.keys() )
+    wavelengths = align_wavelengths( wavelengths, wavelengths, *wl_limits )
+    primary_names, wavelengths, primary_flux, primary_err = stack_speclist( primaries, wavelengths )
+    if len( set( primary_names ) ) != len( primary_names ):
+        raise ValueError( f"multi_primary_chi_analysis: Primary namestrings must be unique: {primary_names}" )
+    del primaries
+
+    speclist = list( speclist )
+    input_values = ((speclist[ i: i + chunk_size ], wavelengths, primary_flux, primary_err, scale_flux, n_sigma) for
+                    i in range( 0, len( speclist ), chunk_size ))
+
+    results = { ns: { } for ns in primary_names }
+    for chunk_results in generic_unordered_multiprocesser_iter( input_values, __multi_primary_chi_wrapper,
+                                                                MAX_PROC ):
+        for ns, chi_values in chunk_results:
+            for primary_ns, chi_value in zip( primary_names, chi_values ):
+                if maximum_chi_value is None or chi_value <= maximum_chi_value:
+                    results[ primary_ns ][ ns ] = float( chi_value )
+    return results
+
+
+def __multi_primary_chi_wrapper( input_value: tuple ) -> list:
+    speclist, wavelengths, primary_flux, primary_err, scale_flux, n_sigma = input_value
+    from analysis.chi import multi_primary_chi
+    from fileio.spec_load_write import rspecLoader
+    from spectrum.utils import stack_speclist
+
+    results = [ ]
+    for spec in speclist:
+        spec = rspecLoader( spec ) if isinstance( spec, str ) else spec
+        spec.scale( scaleflux=scale_flux )
+        _, _, flux, err = stack_speclist( [ spec ], wavelengths )
+        results.append( (spec.getNS(), multi_primary_chi( primary_flux, primary_err, flux[ 0 ], err[ 0 ], n_sigma )) )
+    return results
 
 
 def chi_pipeline_function( input_value: Tuple[ Spectrum, Spectrum, float, float, float ] ) -> Tuple[ str, float ]:
@@ -196,3 +807,15 @@ def chi_pipeline_function( input_value: Tuple[ Spectrum, Spectrum, float, float,
     from analysis.chi import chi
     primary, seconday, wl_low, wl_high, n_sigma = input_value
     return (seconday.getNS(), chi( primary, seconday, wl_low, wl_high, n_sigma ))
+
+
+def chi_input_key( input_value: Tuple[ Spectrum, Spectrum, float, float, float ] ) -> str:
+    """
+    The analysis_pipeline input_key of a chi_pipeline_function input value:  the secondary spectrum namestring.
+
+    :param input_value: tuple of ( primary_spectrum, secondary_spectrum, wl_low_lit, wl_high_limit, n_sigma )
+    :type input_value: tuple
+    :return: Secondary spectrum namestring
+    :rtype: str
+    """
+    return input_value[ 1 ].getNS()
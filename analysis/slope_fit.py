@@ -1,9 +1,9 @@
-from typing import Callable, Union
+from typing import Callable, Iterable, Optional, Tuple, Union
 
 from numpy import diag, sqrt
 from scipy.optimize import curve_fit
 
-from spectrum import Iterable, Spectrum, Tuple
+from spectrum import Spectrum
 
 
 def __linear_func( x: float, m: float, b: float ) -> float:
@@ -132,3 +132,153 @@ def spectrum_linear_fit( spec: Spectrum, wl_low: float = None, wl_high: float =
         wls = filter( lambda wl: wl <= wl_high, wls )
     fluxdata = [ spec.getFlux( wl ) for wl in wls ]  # Can't use .getFluxlist here in clase wavelength limits used
     return generic_linear_fit( wls, fluxdata )
+
+
+""" Default x values of a resampled fit band.  Matches the redshift range drawn by tools.plot.ab_z_plot """
+DEFAULT_BAND_X = [ z / 100 for z in range( 46, 83 ) ]
+
+
+def bootstrap_fit( model: str, x_data: Iterable[ float ], y_data: Iterable[ float ], n_resamples: int = 1000,
+                   seed: int = None, percentiles: Tuple[ float, float ] = (2.5, 97.5),
+                   band_x: Iterable[ float ] = None, batch_size: int = 250, MAX_PROC: int = None ) -> dict:
+    """
+    Bootstrap uncertainties for a 'linear', 'log10' or 'quad' fit (the models of generic_linear_fit, generic_log10_fit
+    and generic_quad_fit).  The ( x, y ) points are resampled with replacement n_resamples times and every resample is
+    refit.  Refits are solved in closed form in batches of batch_size resamples (see analysis.batch_fit), with the
+    batches spread over a process pool.
+
+    Each batch draws from its own random stream spawned from seed, so the results are reproducible for a given seed and
+    batch_size regardless of the number of processes.
+
+    Returns a dictionary of:
+    
+        'fit':          tuple of the fit values to the original data, as generic_fit would return
+        'params':       ndarray of shape ( n_resamples, number of parameters ) of the refit values
+        'uncertainty':  tuple of the standard deviation of each parameter over the resamples
+        'percentiles':  { percentile : tuple of parameter values } for each of the passed percentiles
+        'band':         ( band_x, lower, upper ) lists of the fit function percentile band evaluated at band_x, using the
+                        lowest and highest passed percentiles.  This may be passed directly to ab_z_plot as rs_fit_band.
+
+    :param model: One of 'linear', 'log10' or 'quad'
+    :type model: str
+    :param x_data:
+    :type x_data: Iterable
+    :param y_data:
+    :type y_data: Iterable
+    :param n_resamples: Number of bootstrap resamples.  Defaults to 1000
+    :type n_resamples: int
+    :param seed: Random seed.  Defaults to None (unpredictable)
+    :type seed: int
+    :param percentiles: Percentiles to report, and of which the outermost form the band.  Defaults to ( 2.5, 97.5 )
+    :type percentiles: tuple
+    :param band_x: x values to evaluate the band at.  Defaults to DEFAULT_BAND_X, the ab_z_plot redshift range
+    :type band_x: Iterable
+    :param batch_size: Number of resamples refit per task.  Defaults to 250
+    :type batch_size: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: Dictionary of resampled fit results
+    :rtype: dict
+    :raises: ValueError
+    """
+    return __resample_fit( model, "bootstrap", x_data, y_data, None, n_resamples, seed, percentiles, band_x,
+                           batch_size, MAX_PROC )
+
+
+def monte_carlo_fit( model: str, x_data: Iterable[ float ], y_data: Iterable[ float ], y_err: Iterable[ float ],
+                     n_resamples: int = 1000, seed: int = None, percentiles: Tuple[ float, float ] = (2.5, 97.5),
+                     band_x: Iterable[ float ] = None, batch_size: int = 250, MAX_PROC: int = None ) -> dict:
+    """
+    Monte Carlo uncertainties for a 'linear', 'log10' or 'quad' fit.  Each of the n_resamples realizations perturbs
+    every y value by a normal deviate of width y_err, and is refit.  Otherwise identical to bootstrap_fit; see that
+    method for the batching, reproducibility and returned dictionary.
+
+    i.e. for the AB magnitude versus redshift fits:
+
+        results = monte_carlo_fit( 'log10', z_data, ab_data, ab_err )
+        ab_z_plot( ..., rs_fit_band=results[ 'band' ] )
+
+    :param model: One of 'linear', 'log10' or 'quad'
+    :type model: str
+    :param x_data:
+    :type x_data: Iterable
+    :param y_data:
+    :type y_data: Iterable
+    :param y_err: Uncertainty of each y value
+    :type y_err: Iterable
+    :param n_resamples: Number of Monte Carlo realizations.  Defaults to 1000
+    :type n_resamples: int
+    :param seed: Random seed.  Defaults to None (unpredictable)
+    :type seed: int
+    :param percentiles: Percentiles to report, and of which the outermost form the band.  Defaults to ( 2.5, 97.5 )
+    :type percentiles: tuple
+    :param band_x: x values to evaluate the band at.  Defaults to DEFAULT_BAND_X, the ab_z_plot redshift range
+    :type band_x: Iterable
+    :param batch_size: Number of realizations refit per task.  Defaults to 250
+    :type batch_size: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: Dictionary of resampled fit results
+    :rtype: dict
+    :raises: ValueError
+    """
+    return __resample_fit( model, "monte_carlo", x_data, y_data, y_err, n_resamples, seed, percentiles, band_x,
+                           batch_size, MAX_PROC )
+
+
+def __get_design( model: str ) -> Callable:
+    from analysis.batch_fit import linear_design, log10_design, quad_design
+    designs = { "linear": linear_design, "log10": log10_design, "quad": quad_design }
+    if model not in designs:
+        raise ValueError( f"slope_fit: Unknown fit model {model}.  Use one of {sorted( designs )}" )
+    return designs[ model ]
+
+
+def __resample_fit( model: str, method: str, x_data: Iterable[ float ], y_data: Iterable[ float ],
+                    y_err: Optional[ Iterable[ float ] ], n_resamples: int, seed: Optional[ int ],
+                    percentiles: Tuple[ float, ... ], band_x: Optional[ Iterable[ float ] ], batch_size: int,
+                    MAX_PROC: Optional[ int ] ) -> dict:
+    from numpy import array, concatenate, einsum, nanpercentile, nanstd
+    from numpy.random import SeedSequence
+    from analysis.batch_fit import batch_least_squares
+    from tools.async_tools import generic_unordered_multiprocesser
+
+    design = __get_design( model )
+    x_data = array( x_data, dtype=float )
+    y_data = array( y_data, dtype=float )
+    y_err = None if y_err is None else array( y_err, dtype=float )
+    band_x = list( DEFAULT_BAND_X if band_x is None else band_x )
+
+    coeff, _ = batch_least_squares( design( x_data ), y_data )
+
+    batch_sizes = [ min( batch_size, n_resamples - i ) for i in range( 0, n_resamples, batch_size ) ]
+    seeds = SeedSequence( seed ).spawn( len( batch_sizes ) )
+    input_values = [ (i, model, method, x_data, y_data, y_err, batch_sizes[ i ], seeds[ i ]) for i in
+                     range( len( batch_sizes ) ) ]
+    results = [ ]
+    generic_unordered_multiprocesser( input_values, __resample_wrapper, results, MAX_PROC )
+    params = concatenate( [ p for _, p in sorted( results, key=lambda x: x[ 0 ] ) ] )
+
+    curves = einsum( 'bp,rp->rb', design( array( band_x ) ), params )
+    low, high = min( percentiles ), max( percentiles )
+    return { 'fit': tuple( coeff[ 0 ] ),
+             'params': params,
+             'uncertainty': tuple( nanstd( params, axis=0, ddof=1 ) ),
+             'percentiles': { p: tuple( nanpercentile( params, p, axis=0 ) ) for p in percentiles },
+             'band': (band_x, nanpercentile( curves, low, axis=0 ).tolist(),
+                      nanpercentile( curves, high, axis=0 ).tolist()) }
+
+
+def __resample_wrapper( inputV: tuple ) -> tuple:
+    index, model, method, x_data, y_data, y_err, n_resamples, seed = inputV
+    from numpy.random import default_rng
+    from analysis.batch_fit import batch_least_squares
+
+    rng = default_rng( seed )
+    if method == "bootstrap":
+        picks = rng.integers( 0, x_data.size, (n_resamples, x_data.size) )
+        x_resampled, y_resampled = x_data[ picks ], y_data[ picks ]
+    else:
+        x_resampled, y_resampled = x_data, y_data + rng.normal( 0, 1, (n_resamples, y_data.size) ) * y_err
+    coeff, _ = batch_least_squares( __get_design( model )( x_resampled ), y_resampled )
+    return index, coeff
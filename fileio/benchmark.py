@@ -0,0 +1,170 @@
+"""
+Benchmark of spectrum load throughput with and without compression (see fileio.spec_format codecs).
+
+Each codec's copy of a set of spectra is written to a scratch directory.  Its files are then evicted from the operating
+system's page cache, and the copy is loaded back both one file at a time (load) and in bulk (async_load).  The
+spectrum cache is disabled for the duration, so that every load reads and decodes from the disk.  Eviction uses
+posix_fadvise( POSIX_FADV_DONTNEED ), which is only available on some platforms (Linux among them).  Where it is not,
+the page cache is warm and the results are reported as such.
+
+    python -m fileio.benchmark /path/to/rest/spectra .rspec 2000
+
+or
+
+    from fileio.benchmark import compression_benchmark, print_benchmark
+    print_benchmark( compression_benchmark( speclist ) )
+"""
+from typing import Dict, Iterable, List
+
+from spectrum import Spectrum
+
+BENCHMARK_CODECS = ("none", "zlib", "lzma")
+
+
+def compression_benchmark( speclist: Iterable[ Spectrum ], scratch_path: str = None,
+                           codecs: Iterable[ str ] = BENCHMARK_CODECS ) -> Dict[ str, dict ]:
+    """
+    Writes speclist with each codec in turn and measures how quickly it loads back from a cold page cache.
+
+    For each codec, the returned dictionary holds:
+
+        "spectra", "bytes"              number of spectra and their total size on the disk
+        "ratio"                         uncompressed (codec "none") size / this size
+        "write_seconds"                 time to write them
+        "load_per_second"               spectra per second, loaded one at a time with load()
+        "load_mb_per_second"            as above, in MB of files read per second
+        "async_per_second"              spectra per second, loaded together with async_load()
+        "async_mb_per_second"           as above, in MB per second
+        "lossless"                      whether every spectrum loaded back exactly as written
+        "cold"                          whether the page cache could be evicted before loading
+
+    :param speclist: Spectra to benchmark with
+    :type speclist: Iterable
+    :param scratch_path: (optional) Directory in which to write the scratch copies - on the drive of interest.  Defaults
+     to the system's temporary directory.  The copies are removed afterwards
+    :type scratch_path: str
+    :param codecs: Names of the codecs to compare.  Defaults to BENCHMARK_CODECS
+    :type codecs: Iterable
+    :return: { codec : results }
+    :rtype: dict
+    """
+    import shutil
+    import tempfile
+    from time import perf_counter
+    from fileio.spec_cache import SPEC_CACHE
+    from fileio.spec_format import can_encode, encode_spectrum
+    from fileio.spec_load_write import async_load, load, write
+    from fileio.utils import join, ns2f
+
+    speclist = [ spec for spec in speclist if can_encode( spec ) ]
+    budget = SPEC_CACHE.stats()[ "budget" ]
+    SPEC_CACHE.set_budget( 0 )
+    scratch = tempfile.mkdtemp( prefix="spec_benchmark_", dir=scratch_path )
+
+    results = { }
+    try:
+        for codec in codecs:
+            path = join( scratch, codec )
+            filelist = [ ns2f( spec.getNS(), ".spec" ) for spec in speclist ]
+
+            start = perf_counter()
+            for spec, filename in zip( speclist, filelist ):
+                write( spec, path, filename, codec=codec )
+            write_seconds = perf_counter() - start
+            n_bytes = sum( __file_size( path, f ) for f in filelist )
+
+            cold = __evict( path, filelist )
+            start = perf_counter()
+            loaded = [ load( path, f, cache=False ) for f in filelist ]
+            load_seconds = perf_counter() - start
+
+            __evict( path, filelist )
+            start = perf_counter()
+            async_load( path, filelist, ordered=True )
+            async_seconds = perf_counter() - start
+
+            results[ codec ] = {
+                "spectra"            : len( speclist ), "bytes": n_bytes, "write_seconds": write_seconds,
+                "load_per_second"    : __rate( len( speclist ), load_seconds ),
+                "load_mb_per_second" : __rate( n_bytes / 1E6, load_seconds ),
+                "async_per_second"   : __rate( len( speclist ), async_seconds ),
+                "async_mb_per_second": __rate( n_bytes / 1E6, async_seconds ),
+                "lossless"           : all( encode_spectrum( a ) == encode_spectrum( b )
+                                            for a, b in zip( loaded, speclist ) ),
+                "cold"               : cold }
+    finally:
+        shutil.rmtree( scratch, ignore_errors=True )
+        SPEC_CACHE.set_budget( budget )
+
+    reference = results.get( "none", { } ).get( "bytes" )
+    for result in results.values():
+        result[ "ratio" ] = reference / result[ "bytes" ] if reference and result[ "bytes" ] else None
+    return results
+
+
+def print_benchmark( results: Dict[ str, dict ] ) -> None:
+    """
+    Prints the results of compression_benchmark() as a table.
+
+    :param results: As returned by compression_benchmark()
+    :type results: dict
+    :rtype: None
+    """
+    from common.messaging import tab_print
+
+    tab_print( f"{'codec':<6} {'MB':>9} {'ratio':>6} {'load/s':>9} {'load MB/s':>10} {'async/s':>9} {'async MB/s':>11} "
+               f"{'lossless':>9} {'cold':>5}" )
+    for codec, r in results.items():
+        ratio = f"{r[ 'ratio' ]:.2f}" if r[ "ratio" ] is not None else "-"
+        tab_print( f"{codec:<6} {r[ 'bytes' ] / 1E6:>9.2f} {ratio:>6} {r[ 'load_per_second' ]:>9.1f} "
+                   f"{r[ 'load_mb_per_second' ]:>10.2f} {r[ 'async_per_second' ]:>9.1f} "
+                   f"{r[ 'async_mb_per_second' ]:>11.2f} {str( r[ 'lossless' ] ):>9} {str( r[ 'cold' ] ):>5}" )
+
+
+def __file_size( path: str, filename: str ) -> int:
+    import os
+    return os.path.getsize( os.path.join( path, filename ) )
+
+
+def __rate( amount: float, seconds: float ) -> float:
+    return amount / seconds if seconds > 0 else 0.0
+
+
+def __evict( path: str, filelist: List[ str ] ) -> bool:
+    """
+    Flushes each file of filelist to the disk and asks the operating system to drop it from the page cache.
+
+    :return: Whether the files could be evicted
+    """
+    import os
+
+    if not hasattr( os, "posix_fadvise" ):
+        return False
+    for filename in filelist:
+        fd = os.open( os.path.join( path, filename ), os.O_RDONLY )
+        try:
+            os.fdatasync( fd )
+            os.posix_fadvise( fd, 0, 0, os.POSIX_FADV_DONTNEED )
+        finally:
+            os.close( fd )
+    return True
+
+
+def main():
+    import sys
+    from fileio.spec_load_write import async_load
+    from fileio.utils import getFiles
+
+    if len( sys.argv ) < 3:
+        print( "usage: python -m fileio.benchmark /path/to/spectra extention [count] [scratch path]" )
+        return
+    path, extention = sys.argv[ 1 ], sys.argv[ 2 ]
+    count = int( sys.argv[ 3 ] ) if len( sys.argv ) > 3 else 1000
+    scratch_path = sys.argv[ 4 ] if len( sys.argv ) > 4 else None
+
+    filelist = sorted( getFiles( path, extention ) )[ :count ]
+    print_benchmark( compression_benchmark( async_load( path, filelist, ordered=True ), scratch_path ) )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from typing import List, Union
+from typing import List, Tuple, Union
 
 
 def namestring_dict_writer( output_dict: dict, path: str, filename: str, top_key: str = "namestring",
@@ -47,6 +47,60 @@ def namestring_dict_writer( output_dict: dict, path: str, filename: str, top_key
         outfile.writelines( f"{key},{sub_string( output_dict[ key ] )}" for key in namekeys )
 
 
+class csv_result_sink:
+    """
+    Writes ( namestring, value ) results to a CSV file one at a time as they are passed to it, in the same layout as
+    namestring_dict_writer produces for a { namestring : value } dictionary.  Intended for use as the sink of
+    analysis_pipeline.stream_analysis(), so results reach the disk without first being gathered into memory.
+
+    Each line is flushed as it is written.  Use as a context manager, or call close() when finished:
+
+    with csv_result_sink( path, "chi results.csv", "chi" ) as sink:
+        for result in pipeline.stream_analysis( sink=sink ):
+            ...
+    """
+
+    def __init__( self, path: str, filename: str, value_key: str = None, top_key: str = "namestring" ):
+        """
+        Opens /path/filename for writing.  If value_key is passed, a header of top_key,value_key is written first.
+
+        :param path: /path/to/write/to
+        :type path: str
+        :param filename: filename.csv
+        :type filename: str
+        :param value_key: Column title of the values.  Defaults to None, in which case no header is written
+        :type value_key: str
+        :param top_key: Column title of the namestrings.  Defaults to 'namestring'
+        :type top_key: str
+        """
+        from fileio.utils import dirCheck, join
+        from common.constants import os
+
+        dirCheck( path )
+        self.__linesep = os.linesep
+        self.__outfile = open( join( path, filename ), 'w' )
+        if value_key is not None:
+            self.__outfile.write( f"{top_key},{value_key}{self.__linesep}" )
+
+    def __call__( self, result: Tuple[ str, object ] ) -> None:
+        self.__outfile.write( f"{result[ 0 ]},{result[ 1 ]}{self.__linesep}" )
+        self.__outfile.flush()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc_info ) -> None:
+        self.close()
+
+    def close( self ) -> None:
+        """
+        Closes the output file.
+
+        :rtype: None
+        """
+        self.__outfile.close()
+
+
 def namestring_dict_reader( path: str, filename: str, top_key: str = "namestring", has_header: bool = True ) -> dict:
     from fileio.utils import fileCheck, join
     fileCheck( path, filename )
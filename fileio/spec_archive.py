@@ -0,0 +1,391 @@
+"""
+Single file spectrum archive.  Rather than a directory of tens of thousands of small files, an archive holds any number of
+spectra (as fileio.spec_format records) in one file, with a namestring -> ( offset, length ) index at its end:
+
+    magic           4 bytes     b"QSOA"
+    version         uint8       ARCHIVE_VERSION
+    reserved        3 bytes
+    footer_offset   uint64      Position of the current footer
+    records         each an encoded spectrum (or a pickle, for spectra spec_format cannot hold)
+    index           per entry:  ns_length uint16, namestring, offset uint64, length uint64
+    footer          index_offset uint64, index_count uint64, b"QSOI"
+
+Any one spectrum is then loaded with a single read, with no directory listing, open or stat per spectrum.
+
+Appending never overwrites the current index:  new records, then their new index and footer, are written after the
+current footer, and only once they are on the disk is footer_offset changed to point at the new footer.  An append
+interrupted at any point leaves the archive as it was before it, with the partial append as unused space at the end of
+the file.  (Version 1 archives, without footer_offset, had their footer at the end of the file.  They can be read, but
+not appended to.)
+
+Archives are written with spec_archive (see pack_directory() to convert an existing spectrum directory).  For reading,
+the loaders of fileio.spec_load_write accept the path of an archive wherever they accept a directory:  e.g. with
+REST_SPEC_PATH set to an archive file, rspecLoader( namestring ) reads the namestring entry of that archive.
+"""
+import struct
+from threading import Lock
+from typing import Iterable, Iterator, List, Tuple
+
+from spectrum import Spectrum
+
+ARCHIVE_MAGIC = b"QSOA"
+ARCHIVE_VERSION = 2
+ARCHIVE_EXTENTION = ".sarc"
+
+
+def is_archive( path: str ) -> bool:
+    """
+    :param path: /path/to/file
+    :type path: str
+    :return: Whether path is a spectrum archive file
+    :rtype: bool
+    """
+    import os
+
+    if not os.path.isfile( path ):
+        return False
+    with open( path, 'rb' ) as infile:
+        return infile.read( len( ARCHIVE_MAGIC ) ) == ARCHIVE_MAGIC
+
+
+class spec_archive:
+    """
+    A spectrum archive file, opened for reading ( mode="r" ) or reading and appending ( mode="a", creating the file if
+    necessary ).
+
+        with spec_archive( "rest.sarc", "a" ) as archive:
+            archive.extend( speclist )
+
+        archive = spec_archive( "rest.sarc" )
+        spec = archive.get( "55555-4444-333" )
+
+    Appended spectra are written immediately, but the index is only rewritten by flush() or close() (or leaving the
+    with block).  Until then, other readers of the file - and any reader after an interruption - see the archive as it
+    was before.  Appending over an existing namestring replaces it in the index; the old record, like each replaced
+    index, remains as dead space.  Reads use os.pread where available, so one archive may be read from many threads at
+    once.
+    """
+    __PREFIX = struct.Struct( "<4sB3x" )
+    __POINTER = struct.Struct( "<Q" )
+    __ENTRY = struct.Struct( "<QQ" )
+    __FOOTER = struct.Struct( "<QQ4s" )
+    __INDEX_MAGIC = b"QSOI"
+
+    def __init__( self, path: str, mode: str = "r" ):
+        """
+        :param path: /path/to/archive file
+        :type path: str
+        :param mode: "r" to read, "a" to read and append.  Defaults to "r"
+        :type mode: str
+        :raises: ValueError, FileNotFoundError
+        """
+        import os
+
+        if mode not in ("r", "a"):
+            raise ValueError( f"spec_archive: Unknown mode {mode}" )
+        self.__path = path
+        self.__mode = mode
+        self.__lock = Lock()
+        self.__index = { }  # { namestring : ( offset, length ) }
+        self.__dirty = False
+
+        if mode == "a" and not os.path.isfile( path ):
+            directory = os.path.split( os.path.abspath( path ) )[ 0 ]
+            if not os.path.isdir( directory ):
+                os.makedirs( directory )
+            with open( path, 'wb' ) as outfile:
+                outfile.write( self.__PREFIX.pack( ARCHIVE_MAGIC, ARCHIVE_VERSION ) + self.__POINTER.pack( 0 ) )
+                self.__write_index( outfile, self.__PREFIX.size + self.__POINTER.size )
+
+        self.__file = open( path, 'rb' if mode == "r" else 'r+b' )
+        self.__read_index()
+
+    def __read_index( self ) -> None:
+        import os
+
+        magic, version = self.__PREFIX.unpack( self.__pread( self.__PREFIX.size, 0 ) )
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError( f"spec_archive: {self.__path} is not a spectrum archive" )
+        if version > ARCHIVE_VERSION:
+            raise ValueError( f"spec_archive: Unsupported archive version {version}" )
+        if version < 2 and self.__mode == "a":
+            raise ValueError( f"spec_archive: Version {version} archive {self.__path} cannot be appended to" )
+
+        if version < 2:
+            footer_offset = os.fstat( self.__file.fileno() ).st_size - self.__FOOTER.size
+        else:
+            footer_offset, = self.__POINTER.unpack( self.__pread( self.__POINTER.size, self.__PREFIX.size ) )
+        index_offset, count, index_magic = self.__FOOTER.unpack( self.__pread( self.__FOOTER.size, footer_offset ) )
+        if index_magic != self.__INDEX_MAGIC:
+            raise ValueError( f"spec_archive: {self.__path} has no valid index" )
+
+        buffer = self.__pread( footer_offset - index_offset, index_offset )
+        position = 0
+        index = { }
+        for _ in range( count ):
+            ns_length, = struct.unpack_from( "<H", buffer, position )
+            position += 2
+            namestring = buffer[ position:position + ns_length ].decode( "utf-8" )
+            position += ns_length
+            index[ namestring ] = self.__ENTRY.unpack_from( buffer, position )
+            position += self.__ENTRY.size
+        self.__index = index
+        self.__append_offset = footer_offset + self.__FOOTER.size
+
+    def __write_index( self, outfile, index_offset: int ) -> None:
+        """
+        Writes the index and footer at index_offset, truncating anything after them, and makes them current once they
+        are on the disk by pointing the header at the new footer.
+        """
+        import os
+
+        parts = [ ]
+        for namestring, (offset, length) in self.__index.items():
+            encoded = namestring.encode( "utf-8" )
+            parts.append( struct.pack( "<H", len( encoded ) ) + encoded + self.__ENTRY.pack( offset, length ) )
+        index = b"".join( parts )
+        outfile.seek( index_offset )
+        outfile.write( index )
+        outfile.write( self.__FOOTER.pack( index_offset, len( self.__index ), self.__INDEX_MAGIC ) )
+        outfile.truncate()
+        outfile.flush()
+        os.fsync( outfile.fileno() )
+
+        footer_offset = index_offset + len( index )
+        outfile.seek( self.__PREFIX.size )
+        outfile.write( self.__POINTER.pack( footer_offset ) )
+        outfile.flush()
+        os.fsync( outfile.fileno() )
+        self.__append_offset = footer_offset + self.__FOOTER.size
+
+    def __pread( self, length: int, offset: int ) -> bytes:
+        import os
+
+        if hasattr( os, "pread" ):
+            return os.pread( self.__file.fileno(), length, offset )
+        with self.__lock:
+            self.__file.seek( offset )
+            return self.__file.read( length )
+
+    def __contains__( self, namestring: str ) -> bool:
+        return namestring in self.__index
+
+    def __len__( self ) -> int:
+        return len( self.__index )
+
+    def __iter__( self ) -> Iterator[ str ]:
+        return iter( list( self.__index ) )
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_val, exc_tb ) -> None:
+        self.close()
+
+    def getPath( self ) -> str:
+        """
+        :return: /path/to/archive file
+        :rtype: str
+        """
+        return self.__path
+
+    def keys( self ) -> List[ str ]:
+        """
+        :return: Namestrings of every spectrum in the archive, in the order they were added
+        :rtype: list
+        """
+        return list( self.__index )
+
+    def offset( self, namestring: str ) -> int:
+        """
+        :param namestring: Namestring of a spectrum in the archive
+        :type namestring: str
+        :return: Byte offset of the spectrum record within the archive file
+        :rtype: int
+        :raises: KeyError
+        """
+        return self.__index[ namestring ][ 0 ]
+
+    def extent( self, namestring: str ) -> Tuple[ int, int ]:
+        """
+        :param namestring: Namestring of a spectrum in the archive
+        :type namestring: str
+        :return: ( offset, length ) in bytes of the spectrum record within the archive file
+        :rtype: tuple
+        :raises: KeyError
+        """
+        return self.__index[ namestring ]
+
+    def read_bytes( self, namestring: str ) -> bytes:
+        """
+        Reads the raw record of namestring with a single read.
+
+        :param namestring: Namestring of desired spectrum
+        :type namestring: str
+        :return: The encoded spectrum record
+        :rtype: bytes
+        :raises: KeyError
+        """
+        offset, length = self.__index[ namestring ]
+        return self.__pread( length, offset )
+
+    def get( self, namestring: str ) -> Spectrum:
+        """
+        Loads a single spectrum from the archive.
+
+        :param namestring: Namestring of desired spectrum
+        :type namestring: str
+        :rtype: Spectrum
+        :raises: KeyError
+        """
+        import pickle
+        from fileio.spec_format import decode_spectrum, is_binary_spectrum
+
+        buffer = self.read_bytes( namestring )
+        if is_binary_spectrum( buffer ):
+            return decode_spectrum( buffer )
+        return pickle.loads( buffer )
+
+    def get_arrays( self, namestring: str ) -> tuple:
+        """
+        Loads a single spectrum from the archive as ( namestring, z, gmag, wavelengths, flux, err ) numpy columns.  See
+        fileio.spec_format.decode_arrays().
+
+        :param namestring: Namestring of desired spectrum
+        :type namestring: str
+        :rtype: tuple
+        :raises: KeyError
+        """
+        from numpy import array
+        from fileio.spec_format import decode_arrays, is_binary_spectrum
+
+        buffer = self.read_bytes( namestring )
+        if is_binary_spectrum( buffer ):
+            return decode_arrays( buffer )
+        spec = self.get( namestring )
+        values = array( list( spec.values() ), dtype=float ).reshape( -1, 2 )
+        return spec.getNS(), spec.getRS(), spec.getGmag(), array( list( spec.keys() ) ), values[ :, 0 ], values[ :, 1 ]
+
+    def add( self, spec: Spectrum, namestring: str = None, codec=None ) -> None:
+        """
+        Appends spec to the archive, under its own namestring unless another is given.
+
+        :param spec: Spectrum to append
+        :type spec: Spectrum
+        :param namestring: Index namestring.  Defaults to spec.getNS()
+        :type namestring: str
+        :param codec: (optional) Compression codec, see fileio.spec_format.codec_id().  Defaults to none
+        :type codec: str or int
+        :rtype: None
+        :raises: ValueError
+        """
+        self.extend( [ spec ] if namestring is None else [ (namestring, spec) ], codec )
+
+    def extend( self, speclist: Iterable, codec=None ) -> None:
+        """
+        Appends every spectrum of speclist to the archive.  speclist may also contain ( namestring, Spectrum ) pairs.
+        Each record may be compressed with codec; records are decompressed transparently when read.
+
+        :param speclist: Iterable of Spectrum or ( namestring, Spectrum )
+        :type speclist: Iterable
+        :param codec: (optional) Compression codec, see fileio.spec_format.codec_id().  Defaults to none
+        :type codec: str or int
+        :rtype: None
+        :raises: ValueError
+        """
+        import pickle
+        from fileio.spec_format import can_encode, encode_spectrum
+
+        if self.__mode != "a":
+            raise ValueError( "spec_archive: Archive is not open for appending" )
+
+        with self.__lock:
+            # Records go after the current footer, which stays valid until flush() replaces it
+            self.__file.seek( self.__append_offset )
+            for spec in speclist:
+                namestring, spec = spec if isinstance( spec, tuple ) else (spec.getNS(), spec)
+                if can_encode( spec ):
+                    record = encode_spectrum( spec, codec )
+                else:
+                    record = pickle.dumps( spec, protocol=pickle.HIGHEST_PROTOCOL )
+                self.__file.write( record )
+                self.__index[ str( namestring ) ] = (self.__append_offset, len( record ))
+                self.__append_offset += len( record )
+                self.__dirty = True
+
+    def flush( self ) -> None:
+        """
+        Writes the index, so that the appended spectra are visible to other readers of the file.
+
+        :rtype: None
+        """
+        if self.__dirty:
+            with self.__lock:
+                self.__write_index( self.__file, self.__append_offset )
+                self.__dirty = False
+
+    def close( self ) -> None:
+        """
+        Flushes any appended spectra and closes the archive file.
+
+        :rtype: None
+        """
+        if self.__file is not None:
+            self.flush()
+            self.__file.close()
+            self.__file = None
+
+
+def pack_directory( path: str, extention: str, archive_path: str, codec=None ) -> int:
+    """
+    Packs every spectrum file of the given extention in the directory path into the archive at archive_path (which is
+    created or appended to).  Spectra are indexed by the namestring of their file name.
+
+    :param path: /path/to/spectrum directory
+    :type path: str
+    :param extention: File extention of the spectra, e.g. ".rspec"
+    :type extention: str
+    :param archive_path: /path/to/archive file
+    :type archive_path: str
+    :param codec: (optional) Compression codec, see fileio.spec_format.codec_id().  Defaults to none
+    :type codec: str or int
+    :return: Number of spectra packed
+    :rtype: int
+    """
+    import os
+    from fileio.spec_load_write import load
+    from fileio.utils import getFiles
+
+    filelist = sorted( getFiles( path, extention ) )
+    with spec_archive( archive_path, "a" ) as archive:
+        archive.extend( ((os.path.splitext( f )[ 0 ], load( path, f )) for f in filelist), codec )
+    return len( filelist )
+
+
+__open_archives = { }  # { path : ( ( mtime, size ), spec_archive ) }
+__open_archives_lock = Lock()
+
+
+def open_archive( path: str ) -> spec_archive:
+    """
+    Returns a read only spec_archive of path, reusing the one already open unless the file has changed since.  This is
+    used by the loaders of fileio.spec_load_write, so that an archive is opened and its index read only once.
+
+    Safe to call from many threads.  An archive replaced because its file changed is not closed, as other threads may
+    still be reading from it; its file is closed when the last of them lets go of it.
+
+    :param path: /path/to/archive file
+    :type path: str
+    :rtype: spec_archive
+    """
+    import os
+
+    path = os.path.abspath( path )
+    stat = os.stat( path )
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with __open_archives_lock:
+        cached = __open_archives.get( path )
+        if cached is None or cached[ 0 ] != signature:
+            cached = (signature, spec_archive( path, "r" ))
+            __open_archives[ path ] = cached
+        return cached[ 1 ]
@@ -0,0 +1,185 @@
+"""
+Process-wide, bounded LRU cache of loaded spectra, used by fileio.spec_load_write.load() and so by every loader built on
+it (rspecLoader, bspecLoader, sspecLoader, async_load, async_rspec, async_rspec_scaled, ...).
+
+Entries are keyed by the absolute path of the file (or archive and entry) together with its modification time and size,
+so a spectrum rewritten on the disk is never served stale.  The total (estimated) size of the cached spectra is kept
+under a memory budget, evicting the least recently used first.
+
+The cache is for the main process.  Pool workers (e.g. those of tools.async_tools running rspecLoader for
+multi_compose or multi_primary_chi) are each handed different spectra and rarely load one twice, so a cache in each
+would only multiply memory use by the number of workers.  Their budget is WORKER_CACHE_BUDGET - 0, off, unless raised
+before the pool is started.
+
+Callers never receive the cached Spectrum itself, but a copy sharing its ( flux, err ) tuples.  As these tuples are
+immutable, and Spectrum methods such as scale() replace them rather than modify them, a caller may scale, trim or
+otherwise alter its copy without affecting the cache - at the cost of a dictionary copy rather than a disk read and
+decode.  Subclasses of Spectrum, which may hold further mutable state, are deep copied.
+
+    from fileio.spec_cache import SPEC_CACHE
+    SPEC_CACHE.set_budget( 1024 ** 3 )  # 1 GB
+    ...
+    print( SPEC_CACHE.stats() )
+"""
+from typing import Callable, Dict, Hashable
+
+from spectrum import Spectrum
+
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024  # bytes
+WORKER_CACHE_BUDGET = 0  # bytes, in each pool worker process
+
+
+class spec_cache:
+    """
+    Bounded LRU cache of Spectrum, with a memory budget in bytes.  Thread safe.
+    """
+
+    def __init__( self, budget: int = DEFAULT_CACHE_BUDGET ):
+        """
+        :param budget: Memory budget in bytes.  0 disables caching.  Defaults to DEFAULT_CACHE_BUDGET
+        :type budget: int
+        """
+        from collections import OrderedDict
+        from threading import Lock
+
+        self.__budget = budget
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @staticmethod
+    def spectrum_bytes( spec: Spectrum ) -> int:
+        """
+        Estimated memory use of spec:  the dictionary, plus a key, tuple and two floats per wavelength.
+
+        :param spec: Spectrum
+        :type spec: Spectrum
+        :rtype: int
+        """
+        import sys
+        return sys.getsizeof( spec ) + len( spec ) * 136
+
+    @staticmethod
+    def file_key( path: str, *entry: str ) -> Hashable:
+        """
+        Cache key of the file at path (and, for an archive, the entry within it):  its absolute path, entry,
+        modification time and size.
+
+        :param path: /path/to/file
+        :type path: str
+        :param entry: Further parts of the key, such as an archive entry name
+        :type entry: str
+        :rtype: Hashable
+        :raises: FileNotFoundError
+        """
+        import os
+
+        path = os.path.abspath( path )
+        stat = os.stat( path )
+        return (path,) + entry + (stat.st_mtime_ns, stat.st_size)
+
+    def get( self, key: Hashable, loader: Callable[ [ ], Spectrum ] ) -> Spectrum:
+        """
+        Returns a copy of the spectrum cached under key, first calling loader() to load and cache it on a miss.
+
+        :param key: Cache key (see file_key())
+        :type key: Hashable
+        :param loader: Method which loads the spectrum
+        :type loader: Callable
+        :rtype: Spectrum
+        """
+        with self.__lock:
+            spec = self.__entries.get( key )
+            if spec is not None:
+                self.__entries.move_to_end( key )
+                self.__hits += 1
+            else:
+                self.__misses += 1
+
+        if spec is None:
+            spec = loader()
+            self.put( key, spec )
+        return self.__copy( spec )
+
+    def put( self, key: Hashable, spec: Spectrum ) -> None:
+        """
+        Caches spec under key, evicting the least recently used entries as required by the budget.  Spectra larger than
+        the entire budget are not cached.
+
+        :param key: Cache key
+        :type key: Hashable
+        :param spec: Spectrum to cache.  It must not be changed afterwards
+        :type spec: Spectrum
+        :rtype: None
+        """
+        size = self.spectrum_bytes( spec )
+        with self.__lock:
+            if size > self.__budget:
+                return
+            if key in self.__entries:
+                self.__bytes -= self.spectrum_bytes( self.__entries.pop( key ) )
+            self.__entries[ key ] = spec
+            self.__bytes += size
+            self.__evict()
+
+    def __evict( self ) -> None:
+        while self.__bytes > self.__budget and len( self.__entries ) > 0:
+            _, spec = self.__entries.popitem( last=False )
+            self.__bytes -= self.spectrum_bytes( spec )
+            self.__evictions += 1
+
+    @staticmethod
+    def __copy( spec: Spectrum ) -> Spectrum:
+        if type( spec ) is not Spectrum:
+            return spec.cpy()
+        copy = Spectrum( namestring=spec.getNS(), z=spec.getRS(), gmag=spec.getGmag() )
+        copy.update( spec )
+        return copy
+
+    def set_budget( self, budget: int ) -> None:
+        """
+        Sets the memory budget in bytes, evicting entries if needed.  0 disables caching.
+
+        :param budget: Memory budget in bytes
+        :type budget: int
+        :rtype: None
+        """
+        with self.__lock:
+            self.__budget = budget
+            self.__evict()
+
+    def clear( self ) -> None:
+        """
+        Empties the cache and resets its statistics.
+
+        :rtype: None
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+            self.__hits = self.__misses = self.__evictions = 0
+
+    def stats( self ) -> Dict[ str, float ]:
+        """
+        :return: { "hits", "misses", "hit_rate", "evictions", "entries", "bytes", "budget" }
+        :rtype: dict
+        """
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return { "hits"     : self.__hits, "misses": self.__misses,
+                     "hit_rate" : self.__hits / lookups if lookups > 0 else 0.0, "evictions": self.__evictions,
+                     "entries"  : len( self.__entries ), "bytes": self.__bytes, "budget": self.__budget }
+
+
+def __default_budget() -> int:
+    """
+    DEFAULT_CACHE_BUDGET in the main process, WORKER_CACHE_BUDGET in any other (i.e. a spawned pool worker).
+    """
+    from multiprocessing import current_process
+    return DEFAULT_CACHE_BUDGET if current_process().name == "MainProcess" else WORKER_CACHE_BUDGET
+
+
+SPEC_CACHE = spec_cache( __default_budget() )
@@ -0,0 +1,250 @@
+"""
+Versioned binary file format for Spectrum, as written by fileio.spec_load_write.write() and read by load().
+
+Every value is little-endian.  A file is a fixed header, the namestring, then the data columns:
+
+    magic           4 bytes     b"QSOS"
+    version         uint8       FORMAT_VERSION
+    flags           uint8       FLAG_INT_WAVELENGTHS | FLAG_GRID | FLAG_SHUFFLE
+    codec           uint8       Compression of the data columns.  CODEC_NONE (0), CODEC_ZLIB (1) or CODEC_LZMA (2)
+    dtype           uint8       Bytes per flux density / error value.  8 (float64) or 4 (float32)
+    n_pixels        uint64      Number of wavelengths
+    z               float64     Redshift
+    gmag            float64     g magnitude
+    ns_length       uint16      Length of the UTF-8 namestring in bytes
+    namestring      ns_length bytes
+
+    if FLAG_GRID:   start, step         int64, int64   wavelength i is start + i * step
+    else:           wavelengths         n_pixels int64 (if FLAG_INT_WAVELENGTHS) or float64
+    flux density    n_pixels values of dtype
+    error           n_pixels values of dtype
+
+Wavelengths are stored in the order of the Spectrum keys.  Integer wavelengths with a constant step - rest frame and
+binned spectra - are stored as just their start and step.  The columns are read with numpy.frombuffer, without any
+per-pixel parsing.
+
+With a codec other than CODEC_NONE, everything after the namestring (the wavelengths, flux density and error) is
+compressed as one zlib or lzma stream, and is otherwise laid out as above.  If FLAG_SHUFFLE is set, each array column
+was byte-shuffled before compression:  its first bytes of every value, then its second bytes, and so on.  The sign,
+exponent and high mantissa bytes of neighbouring values are much alike, so grouping them gives the compressor long
+similar runs that the interleaved values do not.  Both codecs are lossless, and in the standard library.
+
+Files written with pickle start with a different byte (b"\\x80"), so is_binary_spectrum() tells the two apart.
+"""
+import struct
+
+from spectrum import Spectrum
+
+MAGIC = b"QSOS"
+FORMAT_VERSION = 1
+
+FLAG_INT_WAVELENGTHS = 1
+FLAG_GRID = 2
+FLAG_SHUFFLE = 4
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+CODECS = { "none": CODEC_NONE, "zlib": CODEC_ZLIB, "lzma": CODEC_LZMA }
+
+__HEADER = struct.Struct( "<4sBBBBQddH" )
+__GRID = struct.Struct( "<qq" )
+
+
+def is_binary_spectrum( buffer: bytes ) -> bool:
+    """
+    :param buffer: The first (at least four) bytes of a file
+    :type buffer: bytes
+    :return: Whether the buffer begins a binary format spectrum
+    :rtype: bool
+    """
+    return bytes( buffer[ :len( MAGIC ) ] ) == MAGIC
+
+
+def can_encode( spec: Spectrum ) -> bool:
+    """
+    Whether spec can be written in the binary format without losing anything.  Subclasses of Spectrum (such as
+    spectrum.composite.composite_spectrum) carry further state and are not encoded, nor are spectra whose redshift or
+    magnitude are not numbers, nor spectra with a flux density or error of None (which the float columns would turn
+    into NaN).
+
+    :param spec: Spectrum to check
+    :type spec: Spectrum
+    :rtype: bool
+    """
+    from numbers import Real
+
+    return type( spec ) is Spectrum and isinstance( spec.getRS(), Real ) and isinstance( spec.getGmag(), Real ) and \
+        not any( flux is None or err is None for flux, err in spec.values() )
+
+
+def codec_id( codec ) -> int:
+    """
+    :param codec: A codec constant, or its name in CODECS ("none", "zlib" or "lzma").  None is CODEC_NONE
+    :type codec: int or str
+    :return: The codec constant
+    :rtype: int
+    :raises: ValueError
+    """
+    if codec is None:
+        return CODEC_NONE
+    if isinstance( codec, str ):
+        if codec.lower() not in CODECS:
+            raise ValueError( f"spec_format: Unknown codec {codec}" )
+        return CODECS[ codec.lower() ]
+    if codec not in CODECS.values():
+        raise ValueError( f"spec_format: Unknown codec {codec}" )
+    return codec
+
+
+def encode_spectrum( spec: Spectrum, codec=CODEC_NONE, shuffle: bool = True ) -> bytes:
+    """
+    Encodes spec in the binary format, compressing the data columns with codec.
+
+    :param spec: Spectrum to encode
+    :type spec: Spectrum
+    :param codec: CODEC_NONE, CODEC_ZLIB or CODEC_LZMA (or their names, see codec_id()).  Defaults to CODEC_NONE
+    :type codec: int or str
+    :param shuffle: Byte-shuffle the columns before compressing them.  Ignored for CODEC_NONE.  Defaults to True
+    :type shuffle: bool
+    :return: Encoded spectrum
+    :rtype: bytes
+    :raises: ValueError
+    """
+    from numbers import Integral
+    from numpy import array, diff, integer
+
+    if not can_encode( spec ):
+        raise ValueError( f"spec_format: Unable to encode {type( spec ).__name__} {spec.getNS()}" )
+    codec = codec_id( codec )
+
+    wavelengths = list( spec.keys() )
+    values = array( list( spec.values() ), dtype='<f8' ).reshape( -1, 2 )
+    namestring = str( spec.getNS() ).encode( "utf-8" )
+
+    flags = 0
+    if all( isinstance( wl, (Integral, integer) ) and not isinstance( wl, bool ) for wl in wavelengths ):
+        flags |= FLAG_INT_WAVELENGTHS
+        wl_array = array( wavelengths, dtype='<i8' )
+        if len( wavelengths ) > 1:
+            steps = diff( wl_array )
+            if (steps == steps[ 0 ]).all():
+                flags |= FLAG_GRID
+    else:
+        wl_array = array( wavelengths, dtype='<f8' )
+
+    shuffle = shuffle and codec != CODEC_NONE
+    if shuffle:
+        flags |= FLAG_SHUFFLE
+
+    def column( values_array ) -> bytes:
+        return __shuffle( values_array ) if shuffle else values_array.tobytes()
+
+    header = __HEADER.pack( MAGIC, FORMAT_VERSION, flags, codec, 8, len( wavelengths ), float( spec.getRS() ),
+                            float( spec.getGmag() ), len( namestring ) )
+    if flags & FLAG_GRID:
+        wl_bytes = __GRID.pack( int( wl_array[ 0 ] ), int( wl_array[ 1 ] - wl_array[ 0 ] ) )
+    else:
+        wl_bytes = column( wl_array )
+
+    data = b"".join( (wl_bytes, column( values[ :, 0 ] ), column( values[ :, 1 ] )) )
+    if codec == CODEC_ZLIB:
+        import zlib
+        data = zlib.compress( data, 6 )
+    elif codec == CODEC_LZMA:
+        import lzma
+        data = lzma.compress( data )
+    return b"".join( (header, namestring, data) )
+
+
+def __shuffle( column ) -> bytes:
+    """
+    Byte-shuffles a numpy array:  the first byte of each value, then the second byte of each, ...
+    """
+    from numpy import ascontiguousarray
+
+    return ascontiguousarray( column ).view( 'u1' ).reshape( -1, column.dtype.itemsize ).T.tobytes()
+
+
+def __unshuffle( buffer, dtype: str, n_values: int, offset: int ):
+    """
+    Reverses __shuffle() for n_values values of dtype at offset of buffer.
+    """
+    from numpy import ascontiguousarray, dtype as np_dtype, frombuffer
+
+    itemsize = np_dtype( dtype ).itemsize
+    planes = frombuffer( buffer, 'u1', itemsize * n_values, offset ).reshape( itemsize, n_values )
+    return ascontiguousarray( planes.T ).view( dtype ).reshape( n_values )
+
+
+def decode_arrays( buffer: bytes ) -> tuple:
+    """
+    Decodes a binary format spectrum into its header values and numpy columns, without forming a Spectrum:
+
+    ( namestring, z, gmag, wavelengths, flux, err )
+
+    flux and err (and wavelengths, unless stored as a grid) are read-only views of buffer, so no data is copied.  This
+    is the fast path for array work on many spectra, e.g. stacking them.  Compressed spectra are decompressed first, and
+    their columns are then views of (or, if shuffled, copies from) the decompressed data.
+
+    :param buffer: Encoded spectrum, as from encode_spectrum() or a file written by spec_load_write.write()
+    :type buffer: bytes, memoryview or numpy.memmap
+    :return: ( namestring, z, gmag, wavelengths, flux, err )
+    :rtype: tuple
+    :raises: ValueError
+    """
+    from numpy import arange, frombuffer
+
+    magic, version, flags, codec, dtype, n_pixels, z, gmag, ns_length = __HEADER.unpack_from( buffer, 0 )
+    if magic != MAGIC:
+        raise ValueError( "spec_format: Not a binary format spectrum" )
+    if version > FORMAT_VERSION:
+        raise ValueError( f"spec_format: Unsupported format version {version}" )
+    if codec not in CODECS.values():
+        raise ValueError( f"spec_format: Unsupported codec {codec}" )
+
+    offset = __HEADER.size
+    namestring = bytes( buffer[ offset:offset + ns_length ] ).decode( "utf-8" )
+    offset += ns_length
+
+    if codec == CODEC_ZLIB:
+        import zlib
+        buffer, offset = zlib.decompress( buffer[ offset: ] ), 0
+    elif codec == CODEC_LZMA:
+        import lzma
+        buffer, offset = lzma.decompress( buffer[ offset: ] ), 0
+
+    def column( value_type: str, n_values: int, at: int ):
+        if flags & FLAG_SHUFFLE:
+            return __unshuffle( buffer, value_type, n_values, at )
+        return frombuffer( buffer, value_type, n_values, at )
+
+    if flags & FLAG_GRID:
+        start, step = __GRID.unpack_from( buffer, offset )
+        offset += __GRID.size
+        wavelengths = arange( n_pixels, dtype='<i8' ) * step + start
+    else:
+        wavelengths = column( '<i8' if flags & FLAG_INT_WAVELENGTHS else '<f8', n_pixels, offset )
+        offset += 8 * n_pixels
+
+    value_type = '<f8' if dtype == 8 else '<f4'
+    flux = column( value_type, n_pixels, offset )
+    err = column( value_type, n_pixels, offset + dtype * n_pixels )
+    return namestring, z, gmag, wavelengths, flux, err
+
+
+def decode_spectrum( buffer: bytes ) -> Spectrum:
+    """
+    Decodes a binary format spectrum.
+
+    :param buffer: Encoded spectrum, as from encode_spectrum() or a file written by spec_load_write.write()
+    :type buffer: bytes or memoryview
+    :return: Decoded Spectrum
+    :rtype: Spectrum
+    :raises: ValueError
+    """
+    namestring, z, gmag, wavelengths, flux, err = decode_arrays( buffer )
+
+    spec = Spectrum( namestring=namestring, z=z, gmag=gmag )
+    spec.update( zip( wavelengths.tolist(), zip( flux.tolist(), err.tolist() ) ) )
+    return spec
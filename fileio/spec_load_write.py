@@ -1,6 +1,6 @@
 import pickle
 from csv import DictReader, DictWriter
-from typing import List, Union
+from typing import Iterator, List, Union
 
 from common.constants import BINNED_SPEC_PATH, REST_SPEC_PATH, SOURCE_SPEC_PATH, os
 from fileio.utils import dirCheck, extCheck, fileCheck, fns, join, ns2f
@@ -8,10 +8,19 @@ from spectrum import Iterable, Spectrum
 
 """
 The methods contained here exist for the sole purpose of reading and writing Spectrum class files to/from the disk.
-Unless specified by the "text_" delineation in the method name, all methods write/load serialized objects using
-Python's pickle package.  All are written with the highest protocol.
-
-"async_" delineated methods make use of Python's asyncio package and common.async_tool's generic_async_wrapper method
+Unless specified by the "text_" delineation in the method name, all methods write/load spectra in the binary format of
+fileio.spec_format.  Spectra which that format cannot hold (subclasses of Spectrum, such as composite_spectrum) are
+serialized using Python's pickle package, with the highest protocol.  Binary files may optionally be compressed (see
+write()), and are decompressed transparently by every loader.  load() reads either, as well as any file written
+with pickle by earlier versions.  Every loader goes through load(), and so through its LRU cache (fileio.spec_cache).
+
+"async_" delineated methods make use of Python's asyncio package and tools.async_tools' generic_async_wrapper method,
+which runs the blocking reads and writes concurrently on a bounded thread pool.  Each accepts a max_concurrency limit, and
+the loaders an ordered flag to return spectra in the order requested, and a locality flag to read the files in their
+on-disk order (returning them in the order requested all the same).  last_load_stats() gives the throughput achieved.
+
+"prefetch_" delineated methods instead return an iterator, yielding spectra in the order requested while the next few
+are loaded in the background - overlapping the disk reads with whatever is done with each spectrum.
 """
 def text_load( path: str, filename: str ) -> Spectrum:
     """
@@ -19,6 +28,9 @@ def text_load( path: str, filename: str ) -> Spectrum:
     
     Note: If for some reason, the redshift and/or gmag values cannot be converted to a float,
     they will be assigned a value of -1
+
+    The file is read whole and its numeric block split and converted a column at a time, rather than row by row through
+    a csv.DictReader.  Files whose columns are not in the order text_write gives them are read with the DictReader.
     
     :param path: /path/to/input file
     :param filename: input file name
@@ -37,7 +49,7 @@ def text_load( path: str, filename: str ) -> Spectrum:
             namestring=55555-4444-333,z=float(),gmag=float()
             wavelength,flux density,error
 
-        Parse the first line, use the second as CSV reader input
+        Parse the first line, then the remainder as comma separated columns
          """
         header = infile.readline( ).strip( ).split( ',' )
         namestring = fns( header[ 0 ] )
@@ -50,19 +62,19 @@ def text_load( path: str, filename: str ) -> Spectrum:
         except ValueError:
             gmag = -1
 
-        reader = DictReader( infile, fieldnames=infile.readline( ).strip( ).split( ',' ) )
-        wls = [ ]
-        flux = [ ]
-        err = [ ]
-        for row in reader:
+        fieldnames = infile.readline( ).strip( ).split( ',' )
+        if fieldnames == __TEXT_FIELDNAMES:
+            block = infile.read( )
             try:
-                wls.append( int( row[ 'wavelength' ] ) )
+                wls, flux, err = __parse_text_columns( block )
             except ValueError:
-                wls.append( float( row[ 'wavelength' ] ) )
-            flux.append( float( row[ 'flux density' ] ) )
-            err.append( float( row[ 'error' ] ) )
+                # Not as text_write would have written it:  leave it to the DictReader
+                from io import StringIO
+                wls, flux, err = __read_text_rows( DictReader( StringIO( block ), fieldnames=fieldnames ) )
+        else:
+            wls, flux, err = __read_text_rows( DictReader( infile, fieldnames=fieldnames ) )
     spec = Spectrum( namestring=namestring, z=z, gmag=gmag )
-    spec.setDict( wls, flux, err )
+    spec.update( zip( wls, zip( flux, err ) ) )
     return spec
 
 
@@ -72,6 +84,7 @@ def text_write( spec: Spectrum, path: str, filename: str ) -> None:
 
     Format can be read in by spec_load_write.text_load() method
 
+    The rows are formatted in bulk, byte for byte as a csv.DictWriter of Spectrum.lineDictList() would write them.
 
     :param spec: spectrum to be written
     :param path: /path/to/write/
@@ -88,41 +101,175 @@ def text_write( spec: Spectrum, path: str, filename: str ) -> None:
         header = "namestring=%s,z=%f,gmag=%f%s" % (spec.getNS( ), spec.getRS( ), spec.getGmag( ), os.linesep)
         outfile.writelines( header )
 
-        fieldnames = [ "wavelength", "flux density", "error" ]
-        writer = DictWriter( outfile, fieldnames=fieldnames )
-        writer.writeheader( )
-        writer.writerows( spec.lineDictList( ) )
+        # csv.DictWriter's default dialect:  unquoted numbers, rows terminated by \r\n
+        rows = [ (wl, flux, err) for wl, (flux, err) in sorted( spec.items( ) ) ]
+        if not any( flux is None or err is None for _, flux, err in rows ):
+            outfile.write( ",".join( __TEXT_FIELDNAMES ) + "\r\n" )
+            outfile.write( "".join( map( "%s,%s,%s\r\n".__mod__, rows ) ) )
+        else:
+            writer = DictWriter( outfile, fieldnames=__TEXT_FIELDNAMES )
+            writer.writeheader( )
+            writer.writerows( spec.lineDictList( ) )
+
+
+__TEXT_FIELDNAMES = [ "wavelength", "flux density", "error" ]
+
+
+def __parse_text_columns( block: str ) -> tuple:
+    """
+    Parses the numeric block of a text spectrum file - rows of wavelength,flux density,error - into its three columns.
+    Wavelengths are int where they can be, as in text_load's DictReader path.  Raises ValueError for anything else.
+    """
+    tokens = ",".join( block.split( ) ).split( ',' ) if block.strip( ) else [ ]
+    if len( tokens ) % 3 != 0:
+        raise ValueError( "text_load: Malformed spectrum rows" )
+    try:
+        wls = list( map( int, tokens[ 0::3 ] ) )
+    except ValueError:
+        wls = [ ]
+        for token in tokens[ 0::3 ]:
+            try:
+                wls.append( int( token ) )
+            except ValueError:
+                wls.append( float( token ) )
+    return wls, list( map( float, tokens[ 1::3 ] ) ), list( map( float, tokens[ 2::3 ] ) )
+
+
+def __read_text_rows( reader: DictReader ) -> tuple:
+    """
+    Reads the rows of a text spectrum file one at a time, by column name.
+    """
+    wls = [ ]
+    flux = [ ]
+    err = [ ]
+    for row in reader:
+        try:
+            wls.append( int( row[ 'wavelength' ] ) )
+        except ValueError:
+            wls.append( float( row[ 'wavelength' ] ) )
+        flux.append( float( row[ 'flux density' ] ) )
+        err.append( float( row[ 'error' ] ) )
+    return wls, flux, err
 
 
-def load( path: str, filename: str ) -> Spectrum:
+def load( path: str, filename: str, cache: bool = True ) -> Spectrum:
     """
-    Loads the serialized spectrum file at /path/filename
+    Loads the serialized spectrum file at /path/filename.  Both binary format (fileio.spec_format) and pickled files are
+    read; the format is detected from the start of the file.
+
+    path may also be a spectrum archive file (see fileio.spec_archive), in which case the entry named by filename,
+    without its extention, is read from the archive.
+
+    Unless cache is False, spectra are served from, and added to, the process-wide fileio.spec_cache.SPEC_CACHE.  The
+    returned Spectrum is always the caller's own to modify.
 
     :param path: /path/to/filename
     :param filename:  file name of spectrum to load
+    :param cache: Use the spectrum cache.  Defaults to True
     :type path: str
     :type filename: str
+    :type cache: bool
     :rtype: Spectrum
+    :raises: FileNotFoundError, KeyError
+    """
+    from fileio.spec_cache import SPEC_CACHE
+
+    if os.path.isfile( path ):
+        from fileio.spec_archive import open_archive
+        entry = os.path.splitext( filename )[ 0 ]
+        if not cache:
+            return open_archive( path ).get( entry )
+        return SPEC_CACHE.get( SPEC_CACHE.file_key( path, entry ), lambda: open_archive( path ).get( entry ) )
+
+    fileCheck( path, filename )
+    if not cache:
+        return __read_spectrum( join( path, filename ) )
+    return SPEC_CACHE.get( SPEC_CACHE.file_key( join( path, filename ) ),
+                           lambda: __read_spectrum( join( path, filename ) ) )
+
+
+def __read_spectrum( filepath: str ) -> Spectrum:
+    """
+    Reads and decodes the binary format or pickled spectrum file at filepath.
+    """
+    from fileio.spec_format import decode_spectrum, is_binary_spectrum
+
+    with open( filepath, 'rb' ) as infile:
+        buffer = infile.read()
+    if is_binary_spectrum( buffer ):
+        return decode_spectrum( buffer )
+    return pickle.loads( buffer )
+
+
+def load_arrays( path: str, filename: str, mmap: bool = False ) -> tuple:
+    """
+    Loads the spectrum file at /path/filename as numpy columns rather than a Spectrum:
+
+    ( namestring, z, gmag, wavelengths, flux, err )
+
+    Binary format files are decoded without any per-pixel work (see fileio.spec_format.decode_arrays).  If mmap is
+    True, the file is memory mapped rather than read, so that only the pages actually used are read from the disk.
+    Pickled files are loaded and converted.  As with load(), path may be a spectrum archive file (mmap is then ignored).
+
+    :param path: /path/to/filename
+    :param filename:  file name of spectrum to load
+    :param mmap: Memory map the file.  Defaults to False
+    :type path: str
+    :type filename: str
+    :type mmap: bool
+    :return: ( namestring, z, gmag, wavelengths, flux, err )
+    :rtype: tuple
     :raises: FileNotFoundError
     """
+    from numpy import array, memmap
+    from fileio.spec_format import decode_arrays, is_binary_spectrum
+
+    if os.path.isfile( path ):
+        from fileio.spec_archive import open_archive
+        return open_archive( path ).get_arrays( os.path.splitext( filename )[ 0 ] )
+
     fileCheck( path, filename )
-    return pickle.load( open( join( path, filename ), 'rb' ) )
+    if mmap:
+        buffer = memmap( join( path, filename ), dtype='u1', mode='r' )
+    else:
+        with open( join( path, filename ), 'rb' ) as infile:
+            buffer = infile.read()
+    if is_binary_spectrum( buffer ):
+        return decode_arrays( buffer )
 
+    spec = pickle.loads( bytes( buffer ) )
+    values = array( list( spec.values() ), dtype=float ).reshape( -1, 2 )
+    return spec.getNS(), spec.getRS(), spec.getGmag(), array( list( spec.keys() ) ), values[ :, 0 ], values[ :, 1 ]
 
-def write( spec: Spectrum, path: str, filename: str ) -> None:
+
+def write( spec: Spectrum, path: str, filename: str, binary: bool = True, codec=None ) -> None:
     """
     Writes a serialized spectrum file at /path/filename
+
+    The binary format of fileio.spec_format is used unless binary is False, or spec cannot be held by it (see
+    spec_format.can_encode()), in which case spec is pickled.  Binary format files may be compressed losslessly by
+    giving a codec ("zlib" or "lzma"); load() and the other loaders decompress them as they read them.
+
     :param spec: spectrum to the written
     :param path: /path/to/filename
     :param filename: file name to be written to
+    :param binary: Write in the binary format where possible.  Defaults to True
+    :param codec: (optional) Compression codec, see fileio.spec_format.codec_id().  Defaults to none
     :type spec: Spectrum
     :type path: str
     :type filename: str
+    :type binary: bool
+    :type codec: str or int
     :return: None
     """
+    from fileio.spec_format import can_encode, encode_spectrum
+
     dirCheck( path )
     with open( join( path, filename ), 'wb' ) as outfile:
-        pickle.dump( spec, outfile, protocol=pickle.HIGHEST_PROTOCOL )
+        if binary and can_encode( spec ):
+            outfile.write( encode_spectrum( spec, codec ) )
+        else:
+            pickle.dump( spec, outfile, protocol=pickle.HIGHEST_PROTOCOL )
 
 
 def bspecLoader( namestring: str ) -> Spectrum:
@@ -158,97 +305,111 @@ def sspecLoader( namestring: str ) -> Spectrum:
     return load( SOURCE_SPEC_PATH, ns2f( namestring, ".spec" ) )
 
 
-def async_bspec( namelist: List[ str ] ) -> List[ Spectrum ]:
+def async_bspec( namelist: List[ str ], ordered: bool = False, max_concurrency: int = None,
+                 locality: bool = False ) -> List[ Spectrum ]:
     """
     Loads all given binned, observed frame spectra from the BINNED_SPEC_PATH using async_load
 
     :param namelist:  Iterable
+    :param ordered: Return spectra in the order of namelist.  Defaults to False
+    :param max_concurrency: Maximum number of concurrent loads.  Defaults to tools.async_tools.DEFAULT_IO_CONCURRENCY
+    :param locality: Read in on-disk order, returning spectra in the order of namelist.  See async_load()
     :type namelist: Iterable[ str ]
+    :type ordered: bool
+    :type max_concurrency: int
+    :type locality: bool
     :return: List of binned, observed frame spectra
     :rtype: List[ Spectrum ]
     """
-    return async_load( BINNED_SPEC_PATH, namelist, ".bspec" )
+    return async_load( BINNED_SPEC_PATH, namelist, ".bspec", ordered, max_concurrency, locality )
 
 
-def async_rspec( namelist: Iterable[ str ] ) -> List[ Spectrum ]:
+def async_rspec( namelist: Iterable[ str ], ordered: bool = False, max_concurrency: int = None,
+                 locality: bool = False ) -> List[ Spectrum ]:
     """
     Loads all given rest frame spectra from the REST_SPEC_PATH using async_load
     
     :param namelist:  Iterable
+    :param ordered: Return spectra in the order of namelist.  Defaults to False
+    :param max_concurrency: Maximum number of concurrent loads.  Defaults to tools.async_tools.DEFAULT_IO_CONCURRENCY
+    :param locality: Read in on-disk order, returning spectra in the order of namelist.  See async_load()
     :type namelist: Iterable[ str ]
+    :type ordered: bool
+    :type max_concurrency: int
+    :type locality: bool
     :return: List of rest frame spectra
     :rtype: List[ Spectrum ]
     """
-    return async_load( REST_SPEC_PATH, namelist, ".rspec" )
+    return async_load( REST_SPEC_PATH, namelist, ".rspec", ordered, max_concurrency, locality )
 
 
-def async_load( path: str, filelist: List[ str ], extention: str = None ) -> List[ Spectrum ]:
+def async_load( path: str, filelist: List[ str ], extention: str = None, ordered: bool = False,
+                max_concurrency: int = None, locality: bool = False ) -> List[ Spectrum ]:
     """
     Uses asyncio to load serialized Spectrum from filelist ( list in [ str() ] form )
 
     If extension is specified, each filename in filelist will be concactated with it.  Elsewise, ignored.
 
-    :param path: /path/to/directory
+    Files are read concurrently on a bounded thread pool (see tools.async_tools.generic_async_wrapper), at most
+    max_concurrency at a time.  Unless ordered is True, the returned list is in the order the loads completed.
+
+    With locality, the files are instead read in their on-disk order (see locality_order()) - which, for a namelist
+    sorted by catalog key or redshift, spares a spinning drive from seeking back and forth across the volume - and the
+    returned list is put back in the order of filelist.  The throughput achieved by the load is given by
+    last_load_stats().
+
+    :param path: /path/to/directory (or spectrum archive)
     :param filelist: filenames of spectra to be loaded
     :param extention: (optional) file extention to append to each filename before loading
+    :param ordered: Return spectra in the order of filelist.  Defaults to False
+    :param max_concurrency: Maximum number of concurrent loads.  Defaults to tools.async_tools.DEFAULT_IO_CONCURRENCY
+    :param locality: Read in on-disk order, returning spectra in the order of filelist.  Defaults to False
     :type path: str
     :type filelist: list
     :type extention: str
+    :type ordered: bool
+    :type max_concurrency: int
+    :type locality: bool
     :return: list of loaded Spectrum type
     :rtype: list
     """
-    from tools.async_tools import generic_async_wrapper
-    import asyncio
-
-    async def __async_load_wrapper( path, filename ):
-        return load( path, filename )
-
-    output_list = [ ]
-    load_loop = asyncio.new_event_loop( )
-
     if extention is not None:
         filelist = [ f + extCheck( extention ) for f in filelist ]
 
-    try:
-        load_loop.run_until_complete(
-                generic_async_wrapper( [ (path, filename) for filename in filelist ], __async_load_wrapper,
-                                       output_list ) )
-    finally:
-        load_loop.close( )
-
-    return output_list
+    return __bulk_load( path, filelist, load, ( ), ordered, max_concurrency, locality )
 
 
-def async_write( path: str, speclist: List[ Spectrum ], extention: str = ".spec" ) -> None:
+def async_write( path: str, speclist: List[ Spectrum ], extention: str = ".spec",
+                 max_concurrency: int = None, codec=None ) -> None:
     """
     Uses asyncio to write a list of Spectrum to the disk.
 
     Will set filename from spectrum namestring.  If extention is not specificed, will default to ".spec"
 
+    Files are written concurrently on a bounded thread pool, at most max_concurrency at a time.
+
     :param path: /path/to/directory
     :param speclist: list of spectrum to output
     :param extention: desired file extention
+    :param max_concurrency: Maximum number of concurrent writes.  Defaults to tools.async_tools.DEFAULT_IO_CONCURRENCY
+    :param codec: (optional) Compression codec, see write().  Defaults to none
     :type path: str
     :type speclist: list
     :type extention: str
+    :type max_concurrency: int
+    :type codec: str or int
     :rtype: None
     """
-    from tools.async_tools import generic_async_wrapper
-    import asyncio
 
-    async def __async_write_wrapper( path, spectrum, extention ):
-        write( spectrum, path, ns2f( spectrum.getNS( ), extention ) )
+    def __write_wrapper( path, spectrum, extention ):
+        write( spectrum, path, ns2f( spectrum.getNS( ), extention ), codec=codec )
 
-    write_loop = asyncio.new_event_loop( )
-
-    try:
-        write_loop.run_until_complete(
-                generic_async_wrapper( [ (path, spec, extention) for spec in speclist ], __async_write_wrapper ) )
-    finally:
-        write_loop.close( )
+    dirCheck( path )
+    __run_async_io( [ (path, spec, extention) for spec in speclist ], __write_wrapper, False, max_concurrency )
 
 
-def async_rspec_scaled( namelist: Iterable[ str ], scale_to: Union[ float, Spectrum ] ) -> List[ Spectrum ]:
+def async_rspec_scaled( namelist: Iterable[ str ], scale_to: Union[ float, Spectrum ], ordered: bool = False,
+                        max_concurrency: int = None, locality: bool = False ) -> List[ Spectrum ]:
     """
     Uses the asyncio library to load the given namelist of Spectrum namestrings from the default rest frame spectra
     folder REST_SPEC_PATH.  While spectra are loaded from the disk, they are scaled to the given value for the scale_to variable
@@ -260,30 +421,210 @@ def async_rspec_scaled( namelist: Iterable[ str ], scale_to: Union[ float, Spect
     :param namelist: List of MJD-PLATE-FIBER namestrings.  The corresponding MJD-PLATE-FIBER.rspec must be present
      in the REST_SPEC_PATH.
     :param scale_to: float or Spectrum class which all loaded spectra will be scaled to.
+    :param ordered: Return spectra in the order of namelist.  Defaults to False
+    :param max_concurrency: Maximum number of concurrent loads.  Defaults to tools.async_tools.DEFAULT_IO_CONCURRENCY
+    :param locality: Read in on-disk order, returning spectra in the order of namelist.  See async_load()
     :type namelist: Iterable
     :type scale_to: Spectrum or float
+    :type ordered: bool
+    :type max_concurrency: int
+    :type locality: bool
     :return: Scaled restframe speclist
     :rtype: List[ Spectrum ]
     """
-    from tools.async_tools import generic_async_wrapper
-    from common.constants import REST_SPEC_PATH
-    import asyncio
-
     if type( scale_to ) is Spectrum:
         scale_to = scale_to.aveFlux( )
 
-    async def __async_scaled_load_wrapper( path, filename, scaleflx ):
+    def __scaled_load_wrapper( path, filename, scaleflx ):
         return load( path, filename ).scale( scaleflux=scaleflx )
 
+    return __bulk_load( REST_SPEC_PATH, [ f"{ns}.rspec" for ns in namelist ], __scaled_load_wrapper, (scale_to,),
+                        ordered, max_concurrency, locality )
+
+
+def locality_order( path: str, filelist: List[ str ] ) -> List[ int ]:
+    """
+    Determines the order in which to read filelist so as to follow the layout of the disk:  by record offset, if path
+    is a spectrum archive, or elsewise by inode number.  Filesystems such as ext4 allocate inodes, and generally the
+    data blocks of small files, in step with one another, so inode order approximates on-disk order without asking the
+    filesystem for the extents of each file.  Files not found are placed last.
+
+    :param path: /path/to/directory (or spectrum archive)
+    :param filelist: filenames of spectra
+    :type path: str
+    :type filelist: list
+    :return: Indices of filelist, in the order they should be read
+    :rtype: list
+    """
+    keys, _ = __locality_keys( path, filelist )
+    return sorted( range( len( filelist ) ), key=keys.__getitem__ )
+
+
+def last_load_stats( ) -> dict:
+    """
+    Throughput of the most recent async_ bulk load:
+
+    { "spectra", "bytes", "seconds", "spectra_per_second", "bytes_per_second", "locality" }
+
+    bytes (and bytes_per_second) are only known for loads made with locality, and are None otherwise.
+
+    :rtype: dict
+    """
+    return dict( __load_stats )
+
+
+__load_stats = { }
+
+
+def __locality_keys( path: str, filelist: List[ str ] ) -> tuple:
+    """
+    Returns the on-disk position and size in bytes of each file of filelist.  Directories are listed once, rather than
+    each file being stat'ed, as the inode number comes with the listing.
+    """
+    from math import inf
+
+    if os.path.isfile( path ):
+        from fileio.spec_archive import open_archive
+
+        archive = open_archive( path )
+        entries = [ os.path.splitext( f )[ 0 ] for f in filelist ]
+        extents = [ archive.extent( entry ) if entry in archive else (inf, 0) for entry in entries ]
+        return [ offset for offset, _ in extents ], [ length for _, length in extents ]
+
+    wanted = set( filelist )
+    entries = { }
+    with os.scandir( path ) as listing:
+        for entry in listing:
+            if entry.name in wanted:
+                entries[ entry.name ] = entry
+    keys, sizes = [ ], [ ]
+    for f in filelist:
+        entry = entries.get( f )
+        keys.append( entry.inode( ) if entry is not None else inf )
+        sizes.append( entry.stat( ).st_size if entry is not None else 0 )
+    return keys, sizes
+
+
+def __bulk_load( path: str, filelist: List[ str ], load_function, load_args: tuple, ordered: bool,
+                 max_concurrency: int, locality: bool ) -> List[ Spectrum ]:
+    """
+    Loads each file of filelist with load_function( path, filename, *load_args ) by __run_async_io, reading in on-disk
+    order if locality is set, and records the throughput achieved in __load_stats.
+    """
+    from time import perf_counter
+
+    start = perf_counter( )
+    n_bytes = None
+    if locality:
+        filelist = list( filelist )
+        keys, sizes = __locality_keys( path, filelist )
+        order = sorted( range( len( filelist ) ), key=keys.__getitem__ )
+        n_bytes = sum( sizes )
+        filelist = [ filelist[ i ] for i in order ]
+
+    results = __run_async_io( [ (path, filename) + load_args for filename in filelist ], load_function,
+                              ordered or locality, max_concurrency )
+
+    if locality:
+        restored = [ None ] * len( results )
+        for i, spec in zip( order, results ):
+            restored[ i ] = spec
+        results = restored
+
+    seconds = perf_counter( ) - start
+    __load_stats.clear( )
+    __load_stats.update( spectra=len( results ), bytes=n_bytes, seconds=seconds,
+                         spectra_per_second=len( results ) / seconds if seconds > 0 else 0.0,
+                         bytes_per_second=n_bytes / seconds if n_bytes is not None and seconds > 0 else None,
+                         locality=locality )
+    return results
+
+
+def prefetch_load( path: str, filelist: Iterable[ str ], extention: str = None, window: int = 16,
+                   workers: int = 4 ) -> Iterator[ Spectrum ]:
+    """
+    Iterates over the spectra of filelist in order, loading up to window of the upcoming spectra in background threads
+    while the caller works on the current one.  The disk is then kept busy during computation, rather than each load
+    waiting for the previous spectrum to be processed.
+
+    filelist may be any iterable - including a generator - and is drawn from only as the window allows, so memory holds
+    no more than window spectra ahead of the caller.  The iterator may be passed straight to anything taking an
+    Iterable of Spectrum, such as spectrum.composite.compose_stream() or composite_accumulator.extend(), or built into
+    the input values of an analysis_pipeline.  Stopping early (break, or close()) cancels the outstanding loads.
+
+    If extension is specified, each filename in filelist will be concactated with it.  Elsewise, ignored.
+
+    :param path: /path/to/directory (or spectrum archive)
+    :param filelist: filenames of spectra to be loaded, in the order they are wanted
+    :param extention: (optional) file extention to append to each filename before loading
+    :param window: Number of spectra to load ahead.  Defaults to 16
+    :param workers: Number of loading threads.  Defaults to 4
+    :type path: str
+    :type filelist: Iterable
+    :type extention: str
+    :type window: int
+    :type workers: int
+    :return: Iterator of loaded Spectrum, in the order of filelist
+    :rtype: Iterator
+    """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    if extention is not None:
+        extention = extCheck( extention )
+        filelist = (f + extention for f in filelist)
+    filelist = iter( filelist )
+
+    executor = ThreadPoolExecutor( max_workers=max( 1, workers ) )
+    pending = deque()
+    try:
+        for filename in filelist:
+            pending.append( executor.submit( load, path, filename ) )
+            if len( pending ) >= max( 1, window ):
+                break
+        while pending:
+            spec = pending.popleft().result()
+            for filename in filelist:
+                pending.append( executor.submit( load, path, filename ) )
+                break
+            yield spec
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown( wait=True )
+
+
+def prefetch_rspec( namelist: Iterable[ str ], window: int = 16, workers: int = 4 ) -> Iterator[ Spectrum ]:
+    """
+    Iterates over the rest frame spectra of namelist from REST_SPEC_PATH, in order, prefetching the upcoming ones.  See
+    prefetch_load().
+
+    :param namelist: Namestrings of the spectra, in the order they are wanted
+    :param window: Number of spectra to load ahead.  Defaults to 16
+    :param workers: Number of loading threads.  Defaults to 4
+    :type namelist: Iterable
+    :type window: int
+    :type workers: int
+    :return: Iterator of rest frame Spectrum, in the order of namelist
+    :rtype: Iterator
+    """
+    return prefetch_load( REST_SPEC_PATH, namelist, ".rspec", window, workers )
+
+
+def __run_async_io( input_values: List[ tuple ], io_function, ordered: bool, max_concurrency: int ) -> list:
+    """
+    Runs generic_async_wrapper over input_values on a new event loop, returning the results.
+    """
+    from tools.async_tools import generic_async_wrapper
+    import asyncio
+
     output_list = [ ]
-    load_loop = asyncio.new_event_loop( )
+    io_loop = asyncio.new_event_loop( )
 
     try:
-        load_loop.run_until_complete(
-                generic_async_wrapper( [ (REST_SPEC_PATH, f"{ns}.rspec", scale_to) for ns in namelist ],
-                                       __async_scaled_load_wrapper,
-                                       output_list ) )
+        io_loop.run_until_complete(
+                generic_async_wrapper( input_values, io_function, output_list, ordered, max_concurrency ) )
     finally:
-        load_loop.close( )
+        io_loop.close( )
 
     return output_list
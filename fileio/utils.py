@@ -85,7 +85,8 @@ def getFiles( path: str, extention: str = None ) -> List[ str ]:
     """
     Returns a list of all files within the given path.
 
-    If extention is specified, will only return files with said extention
+    If extention is specified, will only return files with said extention.  If path is a spectrum archive file, its
+    namestrings are returned as filenames with the given extention.
 
     :param path: /path/to/directory/of/interest
     :param extention: File extention of interest.  If not specified, all files in directory are returned
@@ -95,6 +96,11 @@ def getFiles( path: str, extention: str = None ) -> List[ str ]:
             Note that this list will NOT include the /path/to/ in the file names - merely the names themselves
     :rtype: list
     """
+    if os.path.isfile( path ):
+        # A spectrum archive (see fileio.spec_archive) lists its entries as the files it replaces
+        from fileio.spec_archive import open_archive
+        return [ f + (extCheck( extention ) if extention is not None else '') for f in open_archive( path ).keys() ]
+
     extention = extCheck ( extention ) if extention is not None else ''
     return[ f for f in os.listdir( path ) if ( os.path.isfile( os.path.join( path, f ) ) and (os.path.splitext( f )[ 1 ].endswith( extention ))) ]
 
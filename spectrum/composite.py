@@ -0,0 +1,617 @@
+"""
+Online composite spectrum building.
+
+spectrum.utils.compose_speclist requires the entire speclist in memory, gathering every ( flux, err ) tuple per
+wavelength before forming the composite.  The composite_accumulator here instead keeps running (Welford) statistics
+per wavelength, so spectra may be consumed one at a time from any iterable - a generator, a disk loader, etc. - with
+memory fixed by the number of wavelengths rather than the number of spectra.
+
+Accumulators formed separately (such as in multiple worker processes) may be merged together, giving the same result
+as a single accumulator having seen every spectrum.
+
+The composite formed is the same as that of compose_speclist:  the mean flux density at each wavelength, with the
+standard deviation of the flux density errors as its error.  Wavelengths seen only once keep their original values.
+
+For publication quality composites, robust_compose forms median or sigma-clipped mean composites on stacked arrays,
+with bootstrap uncertainties computed across a process pool.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from spectrum import Spectrum
+
+
+class composite_accumulator:
+    """
+    Running per-wavelength statistics for forming a composite spectrum.  Add spectra with add() (or extend() for an
+    iterable), combine with other accumulators via merge(), and form the composite Spectrum with get_composite().
+    """
+    __GROW_SIZE = 1024
+
+    def __init__( self ):
+        from numpy import zeros
+
+        self.__index = { }
+        self.__wavelengths = [ ]
+        self.__count = zeros( 0, dtype=int )
+        self.__flux_mean = zeros( 0 )
+        self.__err_mean = zeros( 0 )
+        self.__err_m2 = zeros( 0 )
+        self.__n_spectra = 0
+
+    def __len__( self ) -> int:
+        return self.__n_spectra
+
+    def __positions( self, wavelengths: Iterable[ float ] ):
+        """
+        Returns the array positions of the given wavelengths, adding any previously unseen wavelengths to the index
+        (and growing the statistic arrays as required).
+        """
+        from numpy import array, concatenate, zeros
+
+        positions = [ ]
+        for wl in wavelengths:
+            pos = self.__index.get( wl )
+            if pos is None:
+                pos = len( self.__wavelengths )
+                self.__index[ wl ] = pos
+                self.__wavelengths.append( wl )
+            positions.append( pos )
+
+        needed = len( self.__wavelengths ) - self.__count.size
+        if needed > 0:
+            grow = max( needed, self.__GROW_SIZE )
+            self.__count = concatenate( (self.__count, zeros( grow, dtype=int )) )
+            self.__flux_mean = concatenate( (self.__flux_mean, zeros( grow )) )
+            self.__err_mean = concatenate( (self.__err_mean, zeros( grow )) )
+            self.__err_m2 = concatenate( (self.__err_m2, zeros( grow )) )
+        return array( positions, dtype=int )
+
+    def add( self, spec: Spectrum ) -> None:
+        """
+        Adds a single spectrum to the running statistics.
+
+        :param spec: Spectrum to add
+        :type spec: Spectrum
+        :rtype: None
+        """
+        from numpy import array
+
+        if len( spec ) == 0:
+            return
+        wavelengths, values = zip( *spec.items() )
+        pos = self.__positions( wavelengths )
+        flux, err = array( values, dtype=float ).T
+
+        self.__count[ pos ] += 1
+        n = self.__count[ pos ]
+        self.__flux_mean[ pos ] += (flux - self.__flux_mean[ pos ]) / n
+        delta = err - self.__err_mean[ pos ]
+        self.__err_mean[ pos ] += delta / n
+        self.__err_m2[ pos ] += delta * (err - self.__err_mean[ pos ])
+        self.__n_spectra += 1
+
+    def remove( self, spec: Spectrum ) -> None:
+        """
+        Removes a single, previously added spectrum from the running statistics.  The spectrum must carry the same
+        values it had when added (i.e. scaled the same way), otherwise the statistics will no longer be valid.
+
+        :param spec: Spectrum to remove
+        :type spec: Spectrum
+        :rtype: None
+        :raises: KeyError
+        """
+        from numpy import array, where
+
+        if len( spec ) == 0:
+            return
+        wavelengths, values = zip( *spec.items() )
+        if any( wl not in self.__index for wl in wavelengths ):
+            raise KeyError( f"composite_accumulator.remove(): {spec.getNS()} contains wavelengths never added" )
+        pos = array( [ self.__index[ wl ] for wl in wavelengths ], dtype=int )
+        flux, err = array( values, dtype=float ).T
+
+        n = self.__count[ pos ]
+        if (n < 1).any():
+            raise KeyError( f"composite_accumulator.remove(): {spec.getNS()} was not added" )
+        remaining = where( n > 1, n - 1, 1 )
+        old_err_mean = self.__err_mean[ pos ]
+        new_err_mean = where( n > 1, (n * old_err_mean - err) / remaining, 0 )
+
+        self.__flux_mean[ pos ] = where( n > 1, (n * self.__flux_mean[ pos ] - flux) / remaining, 0 )
+        self.__err_m2[ pos ] = where( n > 1, self.__err_m2[ pos ] - (err - new_err_mean) * (err - old_err_mean), 0 )
+        self.__err_mean[ pos ] = new_err_mean
+        self.__count[ pos ] = n - 1
+        self.__n_spectra -= 1
+
+    def extend( self, speclist: Iterable[ Spectrum ] ) -> None:
+        """
+        Adds every spectrum in an iterable.  speclist is consumed one spectrum at a time, so a generator of spectra
+        loaded from the disk will never be held in memory in full.
+
+        :param speclist: Iterable of Spectrum
+        :type speclist: Iterable
+        :rtype: None
+        """
+        for spec in speclist:
+            self.add( spec )
+
+    def merge( self, other ) -> None:
+        """
+        Merges the statistics of another composite_accumulator into this one.  other is not modified.
+
+        :param other: Accumulator to merge in
+        :type other: composite_accumulator
+        :rtype: None
+        """
+        from numpy import where
+
+        o_wavelengths, o_count, o_flux_mean, o_err_mean, o_err_m2 = other.get_statistics()
+        keep = o_count > 0
+        if not keep.any():
+            return
+        pos = self.__positions( [ wl for wl, k in zip( o_wavelengths, keep ) if k ] )
+        o_count, o_flux_mean = o_count[ keep ], o_flux_mean[ keep ]
+        o_err_mean, o_err_m2 = o_err_mean[ keep ], o_err_m2[ keep ]
+
+        n_a = self.__count[ pos ]
+        n = n_a + o_count
+        flux_delta = o_flux_mean - self.__flux_mean[ pos ]
+        err_delta = o_err_mean - self.__err_mean[ pos ]
+
+        self.__flux_mean[ pos ] += flux_delta * o_count / n
+        self.__err_mean[ pos ] += err_delta * o_count / n
+        self.__err_m2[ pos ] += o_err_m2 + where( n_a > 0, err_delta ** 2 * n_a * o_count / n, 0 )
+        self.__count[ pos ] = n
+        self.__n_spectra += len( other )
+
+    def get_points( self, wavelengths: Iterable[ float ] ) -> Dict[ float, Optional[ Tuple[ float, float ] ] ]:
+        """
+        Returns the composite ( flux, err ) point at each of the given wavelengths, as get_composite() would form it.
+        Wavelengths with no remaining spectra are given as None.
+
+        :param wavelengths: Wavelengths of interest
+        :type wavelengths: Iterable
+        :return: Dictionary of { wavelength : ( flux, err ) or None }
+        :rtype: dict
+        """
+        from math import sqrt
+
+        points = { }
+        for wl in wavelengths:
+            pos = self.__index.get( wl )
+            n = 0 if pos is None else int( self.__count[ pos ] )
+            if n == 0:
+                points[ wl ] = None
+            elif n == 1:
+                points[ wl ] = (float( self.__flux_mean[ pos ] ), float( self.__err_mean[ pos ] ))
+            else:
+                points[ wl ] = (float( self.__flux_mean[ pos ] ), sqrt( max( self.__err_m2[ pos ], 0 ) / n ))
+        return points
+
+    def get_statistics( self ) -> tuple:
+        """
+        Returns the raw running statistics as a tuple of
+
+        ( wavelengths, count, flux mean, error mean, error M2 )
+
+        where wavelengths is a list and the remainder are numpy arrays in the same order.  M2 is the running sum of
+        squared differences from the mean of the errors.
+
+        :return: ( wavelengths, count, flux mean, error mean, error M2 )
+        :rtype: tuple
+        """
+        n = len( self.__wavelengths )
+        return (list( self.__wavelengths ), self.__count[ :n ].copy(), self.__flux_mean[ :n ].copy(),
+                self.__err_mean[ :n ].copy(), self.__err_m2[ :n ].copy())
+
+    def get_composite( self, namestring: str = "" ) -> Spectrum:
+        """
+        Forms the composite Spectrum from the current statistics, in the same manner as compose_speclist.
+
+        :param namestring: Namestring to assign to the composite.  Defaults to ""
+        :type namestring: str
+        :return: Composite Spectrum
+        :rtype: Spectrum
+        """
+        from numpy import sqrt, where
+
+        wavelengths, count, flux_mean, err_mean, err_m2 = self.get_statistics()
+        keep = count > 0
+        err = where( count > 1, sqrt( err_m2 / where( keep, count, 1 ) ), err_mean )
+
+        composite = Spectrum( ns=namestring )
+        composite.setDict( [ wl for wl, k in zip( wavelengths, keep ) if k ], flux_mean[ keep ].tolist(),
+                           err[ keep ].tolist() )
+        return composite
+
+
+class composite_spectrum( Spectrum ):
+    """
+    A composite Spectrum which persists the statistics it was formed from, allowing single spectra to be added or
+    removed in O( number of wavelengths ) rather than rebuilding the composite from every member.  The Spectrum
+    dictionary always holds the current composite, so it can be used anywhere a Spectrum is expected.
+
+    Members are tracked by namestring.  A spectrum must be removed with the same values (scaling) it was added with.
+
+    Being a Spectrum, it may be written and loaded with fileio.spec_load_write.write / load, statistics included, so
+    that iterative match refinement may continue from where it left off.
+    """
+
+    def __init__( self, **kwargs ):
+        """
+        Accepts the same kwargs as Spectrum.  See Spectrum constructor.
+
+        :param kwargs:
+        :type kwargs: dict
+        """
+        super( composite_spectrum, self ).__init__( **kwargs )
+        self.__accumulator = composite_accumulator()
+        self.__members = set()
+
+    def add( self, spec: Spectrum ) -> None:
+        """
+        Adds spec to the composite, updating only the wavelengths it contains.
+
+        :param spec: Spectrum to add
+        :type spec: Spectrum
+        :rtype: None
+        :raises: KeyError
+        """
+        if spec.getNS() in self.__members:
+            raise KeyError( f"composite_spectrum.add(): {spec.getNS()} is already a member of {self.getNS()}" )
+        self.__accumulator.add( spec )
+        self.__members.add( spec.getNS() )
+        self.__refresh( spec.keys() )
+
+    def extend( self, speclist: Iterable[ Spectrum ] ) -> None:
+        """
+        Adds every spectrum in speclist to the composite.
+
+        :param speclist: Iterable of Spectrum
+        :type speclist: Iterable
+        :rtype: None
+        :raises: KeyError
+        """
+        for spec in speclist:
+            self.add( spec )
+
+    def remove( self, spec: Spectrum ) -> None:
+        """
+        Removes spec from the composite, updating only the wavelengths it contains.  Wavelengths left without any
+        member spectra are deleted.
+
+        :param spec: Spectrum to remove
+        :type spec: Spectrum
+        :rtype: None
+        :raises: KeyError
+        """
+        if spec.getNS() not in self.__members:
+            raise KeyError( f"composite_spectrum.remove(): {spec.getNS()} is not a member of {self.getNS()}" )
+        self.__accumulator.remove( spec )
+        self.__members.discard( spec.getNS() )
+        self.__refresh( spec.keys() )
+
+    def get_members( self ) -> set:
+        """
+        Returns the set of member namestrings
+
+        :rtype: set
+        """
+        return set( self.__members )
+
+    def __refresh( self, wavelengths: Iterable[ float ] ) -> None:
+        for wl, point in self.__accumulator.get_points( wavelengths ).items():
+            if point is None:
+                self.pop( wl, None )
+            else:
+                self[ wl ] = point
+
+
+def compose_stream( speclist: Iterable[ Spectrum ], namestring: str = "" ) -> Spectrum:
+    """
+    Forms a composite spectrum from any iterable of Spectrum, consuming it one spectrum at a time.  Equivalent to
+    compose_speclist, without requiring the speclist be held in memory.
+
+    :param speclist: Iterable of Spectrum to compose
+    :type speclist: Iterable
+    :param namestring: Namestring to assign to the composite.  Defaults to ""
+    :type namestring: str
+    :return: Composite Spectrum
+    :rtype: Spectrum
+    """
+    accumulator = composite_accumulator()
+    accumulator.extend( speclist )
+    return accumulator.get_composite( namestring )
+
+
+def multi_compose( namelist: Iterable[ str ], namestring: str = "", scale_to: Union[ float, Spectrum ] = None,
+                   chunk_size: int = 250, MAX_PROC: int = None ) -> Spectrum:
+    """
+    Multiprocessing composite builder.  namelist is split into chunks of chunk_size namestrings.  Each worker process
+    loads its chunk of rest frame spectra from REST_SPEC_PATH one at a time, scaling each to scale_to if passed, and
+    returns a composite_accumulator.  The partial accumulators are merged to form the composite.
+
+    scale_to may be either a flux density or a Spectrum, in which case its Spectrum.aveFlux() is used.
+
+    :param namelist: Iterable of namestrings to compose
+    :type namelist: Iterable
+    :param namestring: Namestring to assign to the composite.  Defaults to ""
+    :type namestring: str
+    :param scale_to: Flux density or Spectrum to scale each spectrum to.  Defaults to None (no scaling)
+    :type scale_to: float or Spectrum
+    :param chunk_size: Number of namestrings per worker task.  Defaults to 250
+    :type chunk_size: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: Composite Spectrum
+    :rtype: Spectrum
+    """
+    groups = __grouped_accumulate( ((ns, None) for ns in namelist), scale_to, chunk_size, MAX_PROC )
+    return groups.get( None, composite_accumulator() ).get_composite( namestring )
+
+
+def group_compose( group_key: str, bins: List[ float ], namelist: Iterable[ str ] = None,
+                   scale_to: Union[ float, Spectrum ] = None, chunk_size: int = 250,
+                   MAX_PROC: int = None ) -> Dict[ Tuple[ float, float ], Spectrum ]:
+    """
+    Forms one composite per bin of a shenCat field in a single pass over the rest frame spectra.
+
+    Each namestring in namelist (defaults to every namestring in shenCat) is placed into the bin of bins containing
+    shenCat.subkey( namestring, group_key ), where bins are the ascending bin edges [ e0, e1, ... en ] forming the
+    groups [ e0, e1 ), [ e1, e2 ), ... [ en-1, en ].  Namestrings outside of the edges, or not in shenCat, are skipped.
+
+    The spectra are then loaded exactly once, in chunks spread over worker processes as in multi_compose, each being
+    added to the accumulator of its group.  The partial accumulators of each group are then merged.
+
+    i.e. group_compose( 'z', [ 0.46, 0.55, 0.64, 0.73, 0.82 ] ) returns four redshift slice composites.
+
+    :param group_key: shenCat subkey to group by, such as 'z' or 'ab'
+    :type group_key: str
+    :param bins: Ascending bin edges
+    :type bins: list
+    :param namelist: Iterable of namestrings to compose.  Defaults to None, in which case all of shenCat is used
+    :type namelist: Iterable
+    :param scale_to: Flux density or Spectrum to scale each spectrum to.  Defaults to None (no scaling)
+    :type scale_to: float or Spectrum
+    :param chunk_size: Number of namestrings per worker task.  Defaults to 250
+    :type chunk_size: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: Dictionary of { ( low edge, high edge ) : composite Spectrum }.  Empty bins are not included.
+    :rtype: dict
+    """
+    from bisect import bisect_right
+    from catalog import shenCat
+
+    bins = sorted( bins )
+    if namelist is None:
+        namelist = shenCat.keys()
+
+    def _group( ns: str ) -> Optional[ Tuple[ float, float ] ]:
+        if ns not in shenCat:
+            return None
+        value = shenCat.subkey( ns, group_key )
+        i = bisect_right( bins, value ) - 1
+        if value == bins[ -1 ]:
+            i -= 1
+        if i < 0 or i >= len( bins ) - 1:
+            return None
+        return (bins[ i ], bins[ i + 1 ])
+
+    pairs = ((ns, _group( ns )) for ns in namelist)
+    groups = __grouped_accumulate( (pair for pair in pairs if pair[ 1 ] is not None), scale_to, chunk_size,
+                                   MAX_PROC )
+    return { group: groups[ group ].get_composite( f"Composite {group_key} {group[ 0 ]}-{group[ 1 ]}" ) for group in
+             sorted( groups ) }
+
+
+def __grouped_accumulate( grouped_names: Iterable[ Tuple[ str, object ] ], scale_to: Union[ float, Spectrum ],
+                          chunk_size: int, MAX_PROC: int ) -> Dict[ object, composite_accumulator ]:
+    """
+    Loads and accumulates the ( namestring, group ) pairs of grouped_names across worker processes, returning the
+    merged { group : composite_accumulator } dictionary.
+    """
+    from tools.async_tools import generic_unordered_multiprocesser
+
+    if isinstance( scale_to, Spectrum ):
+        scale_to = scale_to.aveFlux()
+    grouped_names = list( grouped_names )
+    input_values = [ (grouped_names[ i: i + chunk_size ], scale_to) for i in
+                     range( 0, len( grouped_names ), chunk_size ) ]
+
+    partials = [ ]
+    generic_unordered_multiprocesser( input_values, __compose_chunk_wrapper, partials, MAX_PROC )
+
+    groups = { }
+    for partial in partials:
+        for group, accumulator in partial.items():
+            if group not in groups:
+                groups[ group ] = composite_accumulator()
+            groups[ group ].merge( accumulator )
+    return groups
+
+
+def __compose_chunk_wrapper( inputV: tuple ) -> Dict[ object, composite_accumulator ]:
+    grouped_names, scale_to = inputV
+    from fileio.spec_load_write import rspecLoader
+
+    groups = { }
+    for ns, group in grouped_names:
+        spec = rspecLoader( ns )
+        if scale_to is not None:
+            spec.scale( scaleflux=scale_to )
+        if group not in groups:
+            groups[ group ] = composite_accumulator()
+        groups[ group ].add( spec )
+    return groups
+
+
+def median_estimator( flux ):
+    """
+    Median composite estimator over the first (spectrum) axis of a stacked flux array, ignoring NaN values.
+
+    :param flux: Stacked flux array of shape ( number of spectra, number of wavelengths )
+    :type flux: ndarray
+    :return: Median flux density at each wavelength
+    :rtype: ndarray
+    """
+    from warnings import catch_warnings, simplefilter
+    from numpy import nanmedian
+
+    with catch_warnings():
+        simplefilter( "ignore", category=RuntimeWarning )
+        return nanmedian( flux, axis=0 )
+
+
+def clipped_mean_estimator( flux, n_sigma: float = 3, iterations: int = 5 ):
+    """
+    Sigma-clipped mean composite estimator over the first (spectrum) axis of a stacked flux array, ignoring NaN values.
+    At each iteration, values further than n_sigma standard deviations from the mean of their wavelength are rejected
+    and the mean is recomputed, stopping early if nothing further is rejected.
+
+    :param flux: Stacked flux array of shape ( number of spectra, number of wavelengths )
+    :type flux: ndarray
+    :param n_sigma: Rejection threshold in standard deviations.  Defaults to 3
+    :type n_sigma: float
+    :param iterations: Maximum number of clipping iterations.  Defaults to 5
+    :type iterations: int
+    :return: Clipped mean flux density at each wavelength
+    :rtype: ndarray
+    """
+    from warnings import catch_warnings, simplefilter
+    from numpy import abs, isnan, nan, nanmean, nanstd, where
+
+    with catch_warnings():
+        simplefilter( "ignore", category=RuntimeWarning )
+        clipped = flux
+        for _ in range( iterations ):
+            mean, sigma = nanmean( clipped, axis=0 ), nanstd( clipped, axis=0 )
+            reject = abs( clipped - mean ) > n_sigma * sigma
+            if not reject.any():
+                break
+            clipped = where( reject, nan, clipped )
+        return nanmean( clipped, axis=0 ) if not isnan( clipped ).all() else nanmean( flux, axis=0 )
+
+
+def robust_compose( speclist: Iterable[ Spectrum ], namestring: str = "", estimator: str = "median",
+                    n_bootstrap: int = 100, seed: int = None, n_sigma: float = 3, iterations: int = 5,
+                    wl_chunk_size: int = 500, resamples_per_task: int = 25, MAX_PROC: int = None ) -> Spectrum:
+    """
+    Forms a median or sigma-clipped mean composite with bootstrap uncertainties.
+
+    The spectra are stacked (via spectrum.utils.stack_speclist) and the estimator applied to every wavelength.  The
+    error of each composite point is the standard deviation of that estimator over n_bootstrap resamples (drawn with
+    replacement) of the spectra.
+
+    The work is split into tasks of at most wl_chunk_size wavelengths, spread over a process pool.  Each task's slice of
+    the stack is built only as the pool is ready for it and sent once, and the task applies the estimator and every
+    bootstrap resample to it, so memory is bounded by ( number of spectra ) x wl_chunk_size per task in flight - the
+    full stack is never formed.  The resamples are drawn in blocks of resamples_per_task, each from its own random
+    stream spawned from seed, and every wavelength chunk uses the same streams - the results are reproducible for a
+    given seed regardless of the number of processes, and each resample uses the same spectra across all wavelengths.
+
+    :param speclist: Iterable of Spectrum to compose
+    :type speclist: Iterable
+    :param namestring: Namestring to assign to the composite.  Defaults to ""
+    :type namestring: str
+    :param estimator: Either "median" or "clipped" (sigma-clipped mean).  Defaults to "median"
+    :type estimator: str
+    :param n_bootstrap: Number of bootstrap resamples.  Defaults to 100
+    :type n_bootstrap: int
+    :param seed: Random seed for the bootstrap.  Defaults to None (unpredictable)
+    :type seed: int
+    :param n_sigma: Rejection threshold for the clipped estimator.  Defaults to 3
+    :type n_sigma: float
+    :param iterations: Maximum clipping iterations for the clipped estimator.  Defaults to 5
+    :type iterations: int
+    :param wl_chunk_size: Number of wavelengths per task.  Defaults to 500
+    :type wl_chunk_size: int
+    :param resamples_per_task: Number of bootstrap resamples drawn from each random stream.  Defaults to 25
+    :type resamples_per_task: int
+    :param MAX_PROC: Maximum number of concurrent processes.  Defaults to cpu_count()
+    :type MAX_PROC: int
+    :return: Composite Spectrum
+    :rtype: Spectrum
+    :raises: ValueError
+    """
+    from numpy import full, isfinite, nan, zeros
+    from numpy.random import SeedSequence
+    from tools.async_tools import generic_unordered_multiprocesser_iter
+
+    if estimator not in ("median", "clipped"):
+        raise ValueError( f"robust_compose(): Unknown estimator {estimator}.  Use 'median' or 'clipped'" )
+    estimator_args = (estimator, n_sigma, iterations)
+
+    if not isinstance( speclist, list ):
+        speclist = list( speclist )
+    wavelengths = set()
+    for spec in speclist:
+        wavelengths.update( spec.keys() )
+    wavelengths = sorted( wavelengths )
+    n_wl = len( wavelengths )
+
+    block_sizes = [ min( resamples_per_task, n_bootstrap - i ) for i in range( 0, n_bootstrap, resamples_per_task ) ]
+    block_seeds = SeedSequence( seed ).spawn( len( block_sizes ) )
+    input_values = ((start, __stack_flux( speclist, wavelengths[ start:start + wl_chunk_size ] ), estimator_args,
+                     block_sizes, block_seeds) for start in range( 0, n_wl, wl_chunk_size ))
+
+    composite_flux, composite_err = full( n_wl, nan ), zeros( n_wl )
+    for start, flux_chunk, err_chunk in generic_unordered_multiprocesser_iter( input_values, __bootstrap_wrapper,
+                                                                              MAX_PROC ):
+        composite_flux[ start:start + flux_chunk.size ] = flux_chunk
+        composite_err[ start:start + err_chunk.size ] = err_chunk
+
+    keep = isfinite( composite_flux )
+    composite = Spectrum( ns=namestring )
+    composite.setDict( [ wl for wl, k in zip( wavelengths, keep ) if k ], composite_flux[ keep ].tolist(),
+                       composite_err[ keep ].tolist() )
+    return composite
+
+
+def __stack_flux( speclist: List[ Spectrum ], wavelengths: List[ float ] ):
+    """
+    The ( number of spectra ) x ( number of wavelengths ) flux density of speclist at wavelengths, NaN where missing.
+    """
+    from numpy import array, nan
+
+    return array( [ [ spec[ wl ][ 0 ] if wl in spec else nan for wl in wavelengths ] for spec in speclist ],
+                  dtype=float ).reshape( len( speclist ), len( wavelengths ) )
+
+
+def __apply_estimator( flux, estimator_args: tuple ):
+    estimator, n_sigma, iterations = estimator_args
+    if estimator == "median":
+        return median_estimator( flux )
+    return clipped_mean_estimator( flux, n_sigma, iterations )
+
+
+def __bootstrap_wrapper( inputV: tuple ) -> tuple:
+    start, flux, estimator_args, block_sizes, block_seeds = inputV
+    from warnings import catch_warnings, simplefilter
+    from numpy import array, isfinite, nanmean, nansum, sqrt, sum, where, zeros
+    from numpy.random import default_rng
+
+    n_spec, n_wl = flux.shape
+    composite_flux = __apply_estimator( flux, estimator_args )
+
+    # Combine the ( count, mean, M2 ) of each block of resamples in block order, so the result does not depend on the
+    # pool scheduling
+    count, mean, m2 = zeros( n_wl ), zeros( n_wl ), zeros( n_wl )
+    for n_resamples, block_seed in zip( block_sizes, block_seeds ):
+        rng = default_rng( block_seed )
+        estimates = array( [ __apply_estimator( flux[ rng.integers( 0, n_spec, n_spec ) ], estimator_args ) for _ in
+                             range( n_resamples ) ] )
+        n_b = sum( isfinite( estimates ), axis=0 )
+        with catch_warnings():
+            simplefilter( "ignore", category=RuntimeWarning )
+            mean_b = where( n_b > 0, nanmean( estimates, axis=0 ), 0 )
+        m2_b = nansum( (estimates - mean_b) ** 2, axis=0 )
+
+        n = count + n_b
+        safe_n = where( n > 0, n, 1 )
+        delta = mean_b - mean
+        mean += delta * n_b / safe_n
+        m2 += m2_b + delta ** 2 * count * n_b / safe_n
+        count = n
+    composite_err = sqrt( where( count > 1, m2 / where( count > 1, count - 1, 1 ), 0 ) )
+    return start, composite_flux, composite_err
@@ -1,4 +1,4 @@
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Tuple, Union
 
 from common.constants import DEFAULT_SCALE_RADIUS, DEFAULT_SCALE_WL
 from spectrum import Spectrum
@@ -71,6 +71,58 @@ def compose_speclist( speclist: List[ Spectrum ], namestring: str = "" ) -> Spec
     return composite
 
 
+def stack_speclist( speclist: Iterable[ Spectrum ], wavelengths: Iterable[ float ] = None ) -> tuple:
+    """
+    Stacks the given spectra onto a shared wavelength grid, returning a tuple of
+
+    ( namestrings, wavelengths, flux, err )
+
+    where namestrings is a list in the order of speclist, wavelengths is the sorted list of grid wavelengths and flux /
+    err are numpy arrays of shape ( number of spectra, number of wavelengths ).  Any wavelength missing from a spectrum
+    is filled with NaN.
+
+    If wavelengths is not passed, the grid is the union of every wavelength in speclist (and speclist will be iterated
+    twice, so it is converted to a list first).  Spectrum wavelengths not contained in the grid are ignored.
+
+    :param speclist: Iterable of Spectrum to stack
+    :type speclist: Iterable
+    :param wavelengths: Wavelength grid to stack onto.  Defaults to None
+    :type wavelengths: Iterable
+    :return: ( namestrings, wavelengths, flux, err )
+    :rtype: tuple
+    """
+    from numpy import empty, full, nan, vstack
+
+    if wavelengths is None:
+        if not isinstance( speclist, list ):
+            speclist = list( speclist )
+        wavelengths = set()
+        for spec in speclist:
+            wavelengths.update( spec.keys() )
+    wavelengths = sorted( wavelengths )
+    index = { wl: i for i, wl in enumerate( wavelengths ) }
+
+    namestrings = [ ]
+    flux_rows = [ ]
+    err_rows = [ ]
+    for spec in speclist:
+        flux_row = full( len( wavelengths ), nan )
+        err_row = full( len( wavelengths ), nan )
+        row = [ (index[ wl ], v[ 0 ], v[ 1 ]) for wl, v in spec.items() if wl in index ]
+        if len( row ) > 0:
+            cols, fluxes, errs = zip( *row )
+            flux_row[ list( cols ) ] = fluxes
+            err_row[ list( cols ) ] = errs
+        namestrings.append( spec.getNS() )
+        flux_rows.append( flux_row )
+        err_rows.append( err_row )
+
+    if len( namestrings ) == 0:
+        return namestrings, wavelengths, empty( (0, len( wavelengths )) ), empty( (0, len( wavelengths )) )
+
+    return namestrings, wavelengths, vstack( flux_rows ), vstack( err_rows )
+
+
 def find_nearest_wavelength( sorted_wavelengths: List[ float ], wavelength: float ) -> float:
     """
     Finds the value of the nearest wavelength in the sorted list sorted_wavelengths.
@@ -100,8 +152,12 @@ def find_nearest_wavelength( sorted_wavelengths: List[ float ], wavelength: floa
 def mutli_scale( primary: Spectrum, speclist: Iterable[ Spectrum ], scale_wl: float = DEFAULT_SCALE_WL,
                  scale_radius=DEFAULT_SCALE_RADIUS ) -> List[ Spectrum ]:
     """
-    Multiprocessing Spectrum.scale() method.  Scales speclist members to that of the primary Spectrum, returning a
-    list in the same order as it was provided.
+    Batch Spectrum.scale() method.  Scales speclist members to that of the primary Spectrum, returning a list in the
+    same order as it was provided.
+
+    The spectra are stacked once (stack_speclist()), the scale factors found from the stack by stack_scale_factors()
+    and applied with a single broadcast multiply (scale_stack()).  The returned spectra are scaled copies:  the
+    Spectrum objects in speclist are left as they were.
     
     :param primary: Spectrum object to scale all speclist memebers to
     :type primary: Spectrum
@@ -113,21 +169,114 @@ def mutli_scale( primary: Spectrum, speclist: Iterable[ Spectrum ], scale_wl: fl
     :type scale_radius: float
     :return: List of scaled Spectrum objects
     :rtype: list
+    :raises: ValueError
+    """
+    from numpy import isfinite
+
+    speclist = list( speclist )
+    _, wavelengths, flux, err = stack_speclist( speclist )
+    factors = stack_scale_factors( wavelengths, flux, primary, scale_wl, scale_radius )
+
+    bad = [ spec.getNS() for spec, f in zip( speclist, factors ) if not isfinite( f ) ]
+    if len( bad ) > 0:
+        raise ValueError( f"mutli_scale: Unable to scale spectra without flux in the scale window: {bad}" )
+
+    scale_stack( flux, err, factors )
+    return __unstack_speclist( speclist, wavelengths, flux, err )
+
+
+def scale_factors( speclist: Iterable[ Spectrum ], scale_to: Union[ float, Spectrum ],
+                   scale_wl: float = DEFAULT_SCALE_WL, scale_radius: float = DEFAULT_SCALE_RADIUS ):
+    """
+    Determines the factor each spectrum in speclist must be multiplied by to scale it to scale_to, in the manner of
+    Spectrum.scale().  scale_to may be a flux density or a Spectrum, in which case its Spectrum.aveFlux() is used.
+
+    speclist is stacked with stack_speclist() and the factors found by stack_scale_factors().  If the stack is wanted
+    as well, stack once and call stack_scale_factors() directly.
+
+    :param speclist: Iterable of Spectrum to determine scale factors for
+    :type speclist: Iterable
+    :param scale_to: Flux density or Spectrum to scale to
+    :type scale_to: float or Spectrum
+    :param scale_wl: Central wavelength to scale around.  Defaults to DEFAULT_SCALE_WL in common.constants
+    :type scale_wl: float
+    :param scale_radius: Radius around central wavelength.  Defaults to DEFAULT_SCALE_RADIUS
+    :type scale_radius: float
+    :return: Array of scale factors in the order of speclist
+    :rtype: ndarray
+    """
+    _, wavelengths, flux, _ = stack_speclist( speclist )
+    return stack_scale_factors( wavelengths, flux, scale_to, scale_wl, scale_radius )
+
+
+def stack_scale_factors( wavelengths: Iterable[ float ], flux, scale_to: Union[ float, Spectrum ],
+                         scale_wl: float = DEFAULT_SCALE_WL, scale_radius: float = DEFAULT_SCALE_RADIUS ):
+    """
+    Determines the factor each row of a stacked flux array (as from stack_speclist()) must be multiplied by to scale it
+    to scale_to, in the manner of Spectrum.scale():  scale_to over the mean flux density of the row within
+    scale_wl +/- scale_radius.  Missing (NaN) flux densities are left out of the mean, and rows with none in the window
+    are given a factor of NaN (where Spectrum.aveFlux() would exit).
+
+    The factors are not applied.  Pass them to scale_stack() to scale the stack.
+
+    :param wavelengths: Wavelength of each column of flux
+    :type wavelengths: Iterable
+    :param flux: Stacked flux array of shape ( number of spectra, number of wavelengths )
+    :type flux: ndarray
+    :param scale_to: Flux density or Spectrum to scale to
+    :type scale_to: float or Spectrum
+    :param scale_wl: Central wavelength to scale around.  Defaults to DEFAULT_SCALE_WL in common.constants
+    :type scale_wl: float
+    :param scale_radius: Radius around central wavelength.  Defaults to DEFAULT_SCALE_RADIUS
+    :type scale_radius: float
+    :return: Array of scale factors, one per row of flux
+    :rtype: ndarray
     """
-    from tools.async_tools import generic_ordered_multiprocesser
+    from numpy import asarray, errstate, isfinite, where
+
+    if isinstance( scale_to, Spectrum ):
+        scale_to = scale_to.aveFlux( central_wl=scale_wl, radius=scale_radius )
 
-    scale_flux = primary.aveFlux( central_wl=scale_wl, radius=scale_radius )
+    wavelengths = asarray( wavelengths, dtype=float )
+    window = flux[ :, (scale_wl - scale_radius <= wavelengths) & (wavelengths <= scale_wl + scale_radius) ]
+    present = isfinite( window )
+    with errstate( divide='ignore', invalid='ignore' ):
+        return scale_to * present.sum( axis=1 ) / where( present, window, 0 ).sum( axis=1 )
 
-    inputV = [ (spec, scale_flux, scale_wl, scale_radius) for spec in speclist ]
-    speclist = [ ]
-    generic_ordered_multiprocesser( inputV, __multi_scale_wrapper, speclist )
-    return speclist
 
+def scale_stack( flux, err, factors ) -> None:
+    """
+    Scales the rows of stacked flux and err arrays (as from stack_speclist()) by factors, in place.
+
+    :param flux: Stacked flux array of shape ( number of spectra, number of wavelengths )
+    :type flux: ndarray
+    :param err: Stacked error array of the same shape
+    :type err: ndarray
+    :param factors: Scale factor of each row
+    :type factors: ndarray
+    :rtype: None
+    """
+    from numpy import asarray
+
+    factors = asarray( factors, dtype=float )[ :, None ]
+    flux *= factors
+    err *= factors
+
+
+def __unstack_speclist( speclist: List[ Spectrum ], wavelengths: List[ float ], flux, err ) -> List[ Spectrum ]:
+    """
+    Copies of the spectra of speclist, with their flux densities and errors taken from the stacked flux and err rows.
+    Each copy keeps the wavelengths of its original.
+    """
+    from copy import copy
 
-def __multi_scale_wrapper( inputV: Tuple[ Spectrum, float, float, float ] ) -> Spectrum:
-    spec, scale_flux, scale_wl, scale_radius = inputV
-    spec.scale( scaleflux=scale_flux, scaleWL=scale_wl, radius=scale_radius )
-    return spec
+    index = { wl: i for i, wl in enumerate( wavelengths ) }
+    unstacked = [ ]
+    for spec, flux_row, err_row in zip( speclist, flux.tolist(), err.tolist() ):
+        scaled = copy( spec )
+        scaled.update( (wl, (flux_row[ index[ wl ] ], err_row[ index[ wl ] ])) for wl in spec )
+        unstacked.append( scaled )
+    return unstacked
 
 
 def reduce_speclist( namelist: Iterable[ str ], speclist: List[ Spectrum ] ) -> None:
@@ -0,0 +1,33 @@
+"""
+Import smoke test:  every module of the package must import, and every name one package imports from another must
+still be there.  Modules needing a third party package that is not installed (such as astropy or Gnuplot) are skipped.
+"""
+import importlib
+import pkgutil
+import unittest
+
+PACKAGES = ("analysis", "catalog", "common", "fileio", "spectrum", "tools")
+
+
+def iter_modules():
+    for package in PACKAGES:
+        yield package
+        for info in pkgutil.iter_modules( importlib.import_module( package ).__path__ ):
+            yield f"{package}.{info.name}"
+
+
+class import_test( unittest.TestCase ):
+
+    def test_import_all( self ):
+        for name in iter_modules():
+            with self.subTest( module=name ):
+                try:
+                    importlib.import_module( name )
+                except ModuleNotFoundError as e:
+                    if e.name is None or e.name.split( "." )[ 0 ] in PACKAGES:
+                        raise
+                    self.skipTest( f"{name} needs {e.name}" )
+
+
+if __name__ == "__main__":
+    unittest.main()
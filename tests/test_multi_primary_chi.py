@@ -0,0 +1,58 @@
+"""
+Tests of analysis.pipeline.multi_primary_chi_analysis against per-primary chi().
+"""
+import unittest
+
+from analysis.chi import chi
+from analysis.pipeline import multi_primary_chi_analysis
+from common.constants import CHI_BASE_MAG
+from spectrum import Spectrum, flux_from_AB
+
+
+def make_spectrum( namestring: str, seed: int, skip: int = 0 ) -> Spectrum:
+    from numpy.random import default_rng
+
+    rng = default_rng( seed )
+    spec = Spectrum( namestring=namestring, z=2.0, gmag=19.0 )
+    for wl in range( 4700, 4840, 2 ):
+        # Drop every skip'th pixel so the spectra do not all share the same wavelengths
+        if skip and wl % (2 * skip) == 0 and abs( wl - 4767 ) > 20:
+            continue
+        spec[ wl ] = (float( rng.uniform( 1, 2 ) ), float( rng.uniform( 0.05, 0.3 ) ))
+    return spec
+
+
+class multi_primary_chi_test( unittest.TestCase ):
+
+    def test_matches_chi( self ):
+        wl_limits, n_sigma = (4710, 4820), 1.5
+        primaries = [ make_spectrum( f"55555-4444-{i:03d}", i ) for i in range( 3 ) ]
+        speclist = [ make_spectrum( f"55555-4444-{i:03d}", i, skip=i % 4 ) for i in range( 10, 22 ) ]
+
+        results = multi_primary_chi_analysis( primaries, speclist, wl_limits, n_sigma=n_sigma, chunk_size=5,
+                                              MAX_PROC=1 )
+
+        scale_flux = flux_from_AB( CHI_BASE_MAG )
+        self.assertEqual( set( results ), { p.getNS() for p in primaries } )
+        for primary in primaries:
+            primary = primary.cpy()
+            primary.scale( scaleflux=scale_flux )
+            for spec in speclist:
+                spec = spec.cpy()
+                spec.scale( scaleflux=scale_flux )
+                expected = chi( primary, spec, *wl_limits, n_sigma=n_sigma )
+                self.assertAlmostEqual( results[ primary.getNS() ][ spec.getNS() ] / expected, 1, places=9 )
+
+    def test_maximum_chi_value( self ):
+        primaries = [ make_spectrum( f"55555-4444-{i:03d}", i ) for i in range( 2 ) ]
+        speclist = [ make_spectrum( f"55555-4444-{i:03d}", i ) for i in range( 10, 16 ) ]
+        every = multi_primary_chi_analysis( primaries, speclist, (4710, 4820), MAX_PROC=1 )
+        threshold = sorted( every[ primaries[ 0 ].getNS() ].values() )[ 2 ]
+        kept = multi_primary_chi_analysis( primaries, speclist, (4710, 4820), maximum_chi_value=threshold,
+                                           MAX_PROC=1 )
+        for ns, values in every.items():
+            self.assertEqual( kept[ ns ], { k: v for k, v in values.items() if v <= threshold } )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Tests of the tools.async_tools shared pool:  restarting it must not terminate a pool that a caller still holds.
+"""
+import unittest
+
+from tools import async_tools
+from tools.async_tools import generic_unordered_multiprocesser_iter, set_shared_pool_size, set_worker_preload
+
+
+def square( x: int ) -> int:
+    return x * x
+
+
+class shared_pool_test( unittest.TestCase ):
+
+    def tearDown( self ):
+        set_worker_preload()
+        set_shared_pool_size()
+
+    def test_restart_during_iteration( self ):
+        for name, restart in (("size", lambda: set_shared_pool_size( 2 )),
+                              ("preload", lambda: set_worker_preload( "numpy" ))):
+            with self.subTest( restart=name ):
+                set_worker_preload()
+                set_shared_pool_size()
+                results = generic_unordered_multiprocesser_iter( range( 200 ), square, max_in_flight=2, chunksize=5 )
+                first = [ next( results ) ]
+                held = async_tools.get_shared_pool()
+                restart()
+
+                # A new caller gets a new pool, while the running generator finishes on the old one
+                self.assertIsNot( async_tools.get_shared_pool(), held )
+                self.assertEqual( sorted( generic_unordered_multiprocesser_iter( range( 10 ), square ) ),
+                                  [ x * x for x in range( 10 ) ] )
+                self.assertEqual( sorted( first + list( results ) ), [ x * x for x in range( 200 ) ] )
+
+                # and the old pool is shut down once released
+                with self.assertRaises( ValueError ):
+                    held.apply_async( square, (1,) )
+
+    def test_restart_when_not_held( self ):
+        pool = async_tools.get_shared_pool()
+        set_shared_pool_size( 2 )
+        with self.assertRaises( ValueError ):
+            pool.apply_async( square, (1,) )
+
+    def test_staged_pipeline_holds_pool( self ):
+        from analysis.pipeline import pipeline_stage, staged_pipeline
+
+        def restart_stage( x: int ) -> int:
+            if x == 3:
+                set_shared_pool_size( 2 if async_tools.shared_pool_size() != 2 else 3 )
+            return x
+
+        stages = [ pipeline_stage( restart_stage, 1 ), pipeline_stage( square, 2, use_processes=True ) ]
+        self.assertEqual( sorted( staged_pipeline( range( 50 ), stages ).run() ), [ x * x for x in range( 50 ) ] )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests of analysis.slope_fit resampling:  bootstrap_fit must be reproducible for a seed and centred on the true fit.
+"""
+import unittest
+
+from analysis.slope_fit import bootstrap_fit
+
+
+class bootstrap_fit_test( unittest.TestCase ):
+
+    def setUp( self ):
+        from numpy import linspace
+        from numpy.random import default_rng
+
+        self.slope, self.intercept = 2.5, -1.0
+        self.x = linspace( 0, 10, 200 )
+        self.y = self.slope * self.x + self.intercept + default_rng( 7 ).normal( 0, 0.5, self.x.size )
+
+    def test_reproducible( self ):
+        # The same seed and batch_size give the same resamples, whatever the number of processes
+        from numpy import array_equal
+
+        first = bootstrap_fit( "linear", self.x, self.y, n_resamples=400, seed=11, batch_size=100, MAX_PROC=1 )
+        second = bootstrap_fit( "linear", self.x, self.y, n_resamples=400, seed=11, batch_size=100, MAX_PROC=2 )
+        self.assertTrue( array_equal( first[ "params" ], second[ "params" ] ) )
+        self.assertEqual( first[ "uncertainty" ], second[ "uncertainty" ] )
+
+    def test_centred_on_true_slope( self ):
+        results = bootstrap_fit( "linear", self.x, self.y, n_resamples=400, seed=11, batch_size=100, MAX_PROC=1 )
+        slope_mean = results[ "params" ][ :, 0 ].mean()
+        slope_err = results[ "uncertainty" ][ 0 ]
+        self.assertGreater( slope_err, 0 )
+        self.assertLess( abs( slope_mean - self.slope ), 4 * slope_err )
+        self.assertLess( abs( results[ "fit" ][ 0 ] - self.slope ), 4 * slope_err )
+        low, high = results[ "percentiles" ][ 2.5 ][ 0 ], results[ "percentiles" ][ 97.5 ][ 0 ]
+        self.assertLess( low, results[ "fit" ][ 0 ] )
+        self.assertGreater( high, results[ "fit" ][ 0 ] )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Tests of fileio.spec_archive:  an interrupted append must leave the archive as it was before the append.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from fileio.spec_archive import spec_archive
+from spectrum import Spectrum
+
+
+def make_spectrum( namestring: str, n_pixels: int ) -> Spectrum:
+    spec = Spectrum( namestring=namestring, z=1.5, gmag=18.0 )
+    spec.update( (1000 + 2 * i, (float( i ), 0.1 * i)) for i in range( n_pixels ) )
+    return spec
+
+
+class interrupted_append_test( unittest.TestCase ):
+
+    def setUp( self ):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join( self.directory, "test.sarc" )
+        # Many entries, so that the index is longer than the record appended below
+        self.original = [ make_spectrum( f"55555-4444-{i:03d}", 50 ) for i in range( 100 ) ]
+        with spec_archive( self.path, "a" ) as archive:
+            archive.extend( self.original )
+
+    def tearDown( self ):
+        shutil.rmtree( self.directory, ignore_errors=True )
+
+    def interrupted_copy( self, speclist ) -> str:
+        """
+        Appends speclist without flushing the index, and returns a copy of the archive file as it was left on the disk
+        at that point - as if the process had been killed.
+        """
+        copy = os.path.join( self.directory, "interrupted.sarc" )
+        archive = spec_archive( self.path, "a" )
+        archive.extend( speclist )
+        archive._spec_archive__file.flush()
+        shutil.copyfile( self.path, copy )
+        archive.close()
+        return copy
+
+    def assert_original( self, path: str ) -> None:
+        with spec_archive( path ) as archive:
+            self.assertEqual( archive.keys(), [ spec.getNS() for spec in self.original ] )
+            self.assertEqual( dict( archive.get( "55555-4444-042" ) ), dict( self.original[ 42 ] ) )
+
+    def test_short_append( self ):
+        self.assert_original( self.interrupted_copy( [ make_spectrum( "66666-4444-000", 1 ) ] ) )
+
+    def test_long_append( self ):
+        self.assert_original( self.interrupted_copy( [ make_spectrum( f"66666-4444-{i:03d}", 500 )
+                                                       for i in range( 20 ) ] ) )
+
+    def test_truncated_append( self ):
+        copy = self.interrupted_copy( [ make_spectrum( "66666-4444-000", 500 ) ] )
+        with open( copy, 'r+b' ) as infile:
+            infile.truncate( os.path.getsize( copy ) - 100 )
+        self.assert_original( copy )
+
+    def test_append_after_interruption( self ):
+        copy = self.interrupted_copy( [ make_spectrum( "66666-4444-000", 500 ) ] )
+        with spec_archive( copy, "a" ) as archive:
+            archive.add( make_spectrum( "77777-4444-000", 10 ) )
+        with spec_archive( copy ) as archive:
+            self.assertEqual( len( archive ), len( self.original ) + 1 )
+            self.assertNotIn( "66666-4444-000", archive )
+            self.assertEqual( dict( archive.get( "77777-4444-000" ) ), dict( make_spectrum( "77777-4444-000", 10 ) ) )
+            self.assertEqual( dict( archive.get( "55555-4444-099" ) ), dict( self.original[ 99 ] ) )
+
+    def test_completed_append( self ):
+        self.interrupted_copy( [ make_spectrum( "66666-4444-000", 1 ) ] )
+        with spec_archive( self.path ) as archive:
+            self.assertEqual( len( archive ), len( self.original ) + 1 )
+            self.assertEqual( dict( archive.get( "66666-4444-000" ) ), dict( make_spectrum( "66666-4444-000", 1 ) ) )
+
+
+if __name__ == "__main__":
+    unittest.main()
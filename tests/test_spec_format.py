@@ -0,0 +1,56 @@
+"""
+Tests of fileio.spec_format:  wavelength types and values the binary format cannot hold.
+"""
+import shutil
+import tempfile
+import unittest
+
+from fileio.spec_format import FLAG_GRID, FLAG_INT_WAVELENGTHS, can_encode, decode_spectrum, encode_spectrum
+from fileio.spec_load_write import load, write
+from spectrum import Spectrum
+
+
+def flags( buffer: bytes ) -> int:
+    return buffer[ 5 ]
+
+
+class spec_format_test( unittest.TestCase ):
+
+    def test_numpy_integer_wavelengths( self ):
+        from numpy import arange
+
+        spec = Spectrum( namestring="55555-4444-333", z=1.5, gmag=18.0 )
+        spec.update( (wl, (1.0, 0.1)) for wl in arange( 1000, 1100, 2 ) )
+        buffer = encode_spectrum( spec )
+        self.assertEqual( flags( buffer ) & (FLAG_INT_WAVELENGTHS | FLAG_GRID), FLAG_INT_WAVELENGTHS | FLAG_GRID )
+        decoded = decode_spectrum( buffer )
+        self.assertEqual( list( decoded ), list( range( 1000, 1100, 2 ) ) )
+        self.assertTrue( all( type( wl ) is int for wl in decoded ) )
+
+    def test_float_wavelengths( self ):
+        spec = Spectrum( namestring="55555-4444-333", z=1.5, gmag=18.0 )
+        spec.update( (1000.5 + wl, (1.0, 0.1)) for wl in range( 10 ) )
+        buffer = encode_spectrum( spec )
+        self.assertEqual( flags( buffer ) & FLAG_INT_WAVELENGTHS, 0 )
+        self.assertEqual( dict( decode_spectrum( buffer ) ), dict( spec ) )
+
+    def test_none_flux_rejected( self ):
+        spec = Spectrum( namestring="55555-4444-333", z=1.5, gmag=18.0 )
+        spec.update( { 1000: (1.0, 0.1), 1002: (None, 0.1), 1004: (1.0, None) } )
+        self.assertFalse( can_encode( spec ) )
+        with self.assertRaises( ValueError ):
+            encode_spectrum( spec )
+
+    def test_none_flux_written_with_pickle( self ):
+        spec = Spectrum( namestring="55555-4444-333", z=1.5, gmag=18.0 )
+        spec.update( { 1000: (1.0, 0.1), 1002: (None, 0.1) } )
+        directory = tempfile.mkdtemp()
+        try:
+            write( spec, directory, "none.spec" )
+            self.assertEqual( dict( load( directory, "none.spec", cache=False ) ), dict( spec ) )
+        finally:
+            shutil.rmtree( directory, ignore_errors=True )
+
+
+if __name__ == "__main__":
+    unittest.main()
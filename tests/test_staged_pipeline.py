@@ -0,0 +1,82 @@
+"""
+Tests of analysis.pipeline.staged_pipeline:  failing stages must stop the pipeline rather than hang it, and
+get_chi_staged_pipeline must not modify the spectra passed to it.
+"""
+import unittest
+from threading import Thread
+
+from analysis.pipeline import get_chi_staged_pipeline, pipeline_stage, staged_pipeline
+from spectrum import Spectrum
+
+
+def make_spectrum( namestring: str, flux: float, wl_low: int = 4700, wl_high: int = 4840 ) -> Spectrum:
+    spec = Spectrum( namestring=namestring, z=2.0, gmag=19.0 )
+    spec.update( (wl, (flux + 0.001 * wl, 0.1)) for wl in range( wl_low, wl_high, 2 ) )
+    return spec
+
+
+def run_with_timeout( pipeline: staged_pipeline, seconds: float = 30 ) -> dict:
+    """
+    Runs the pipeline in a thread, returning { "results": list } or { "error": exception } - or neither if it hung.
+    """
+    outcome = { }
+
+    def target():
+        try:
+            outcome[ "results" ] = list( pipeline.run() )
+        except BaseException as e:
+            outcome[ "error" ] = e
+
+    thread = Thread( target=target, daemon=True )
+    thread.start()
+    thread.join( seconds )
+    return outcome
+
+
+def exiting_stage( item: int ) -> int:
+    if item == 5:
+        exit( 1 )
+    return item
+
+
+class staged_pipeline_test( unittest.TestCase ):
+
+    def test_stage_exit_stops_pipeline( self ):
+        for workers in (1, 3):
+            with self.subTest( workers=workers ):
+                pipeline = staged_pipeline( range( 20 ), [ pipeline_stage( exiting_stage, workers ),
+                                                           pipeline_stage( lambda x: x, 2 ) ] )
+                outcome = run_with_timeout( pipeline )
+                self.assertIn( "error", outcome, "staged_pipeline hung after a stage called exit()" )
+                self.assertIsInstance( outcome[ "error" ], RuntimeError )
+                self.assertIn( "SystemExit", str( outcome[ "error" ] ) )
+
+    def test_source_exit_stops_pipeline( self ):
+        def source():
+            yield 1
+            exit( 1 )
+
+        outcome = run_with_timeout( staged_pipeline( source(), [ pipeline_stage( lambda x: x, 2 ) ] ) )
+        self.assertIn( "error", outcome, "staged_pipeline hung after its source called exit()" )
+        self.assertIsInstance( outcome[ "error" ], SystemExit )
+
+    def test_chi_unscalable_spectrum( self ):
+        # No pixels near the scale wavelength:  Spectrum.aveFlux calls exit()
+        primary = make_spectrum( "55555-4444-000", 1.0 )
+        speclist = [ make_spectrum( "55555-4444-001", 1.1 ), make_spectrum( "55555-4444-002", 1.2, 4800, 4840 ) ]
+        outcome = run_with_timeout( get_chi_staged_pipeline( primary, speclist, (4710, 4820), 1E10 ) )
+        self.assertIn( "error", outcome, "get_chi_staged_pipeline hung on a spectrum it could not scale" )
+
+    def test_chi_inputs_unmodified( self ):
+        primary = make_spectrum( "55555-4444-000", 1.0 )
+        speclist = [ make_spectrum( f"55555-4444-{i:03d}", 1.0 + 0.1 * i ) for i in range( 1, 6 ) ]
+        before = [ dict( spec ) for spec in [ primary ] + speclist ]
+
+        outcome = run_with_timeout( get_chi_staged_pipeline( primary, speclist, (4710, 4820), 1E10 ) )
+        self.assertNotIn( "error", outcome )
+        self.assertEqual( sorted( ns for ns, _ in outcome[ "results" ] ), [ spec.getNS() for spec in speclist ] )
+        self.assertEqual( [ dict( spec ) for spec in [ primary ] + speclist ], before )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,21 +27,91 @@ The pool.imap methods generally low impact in memory, as the results are pulled
  is completely done, memeory use is substantial for large operations.  If RAM is not a restriction (or the process is
  small),then the _map_async_ method may be desirable.  Notice, this async method implies no guaranteed order and order
  should not be expected.
+
+The generic_unordered_multiprocesser_iter and generic_ordered_multiprocesser_iter generators are lower still in memory:
+ each result is yielded as soon as it is available rather than gathered into a list, only max_in_flight batches of
+ values are submitted ahead of the caller, and the caller may stop iterating at any time.
  
 All methods make use of the same passing structure (with the exception of the generic_async_wrapper, which is more useful
- for writing/reading the disk and does not use Pool, so does not take a MAX_PROC value), so they can be used
- interchangably simply without any need to change the values passed, their order, typing, etc.
+ for writing/reading the disk and does not use Pool, so takes a max_concurrency value rather than MAX_PROC), so they can
+ be used interchangably simply without any need to change the values passed, their order, typing, etc.
+
+Each of the generic_ multiprocess methods also accepts a backend, which selects how multi_function is executed:
+
+    "process"   A multiprocessing.Pool of MAX_PROC worker processes (the default, and the only option previously)
+    "thread"    A multiprocessing.pool.ThreadPool of MAX_PROC threads.  Best for numpy heavy work which releases the GIL,
+                or for disk bound work, as nothing is pickled or sent to another process.
+    "serial"    Every value is operated in turn, in this process.  Best for small jobs, where starting a pool and
+                pickling values costs more than the work itself.
+    "asyncio"   Values are operated on an asyncio event loop, at most MAX_PROC at once.  If multi_function is a coroutine
+                function it is awaited directly, otherwise it is run in a thread pool executor.
+    "auto"      The first value is operated serially as a calibration run.  The remaining values are then sent to the
+                backend chosen by select_backend() from the number of values, the measured task time and the pickled
+                size of the value and its result.
+
+The "process" backend operates on a single shared worker pool (see get_shared_pool()) whenever MAX_PROC is not given or
+ matches its size.  The pool is created on first use, reused by every later call - so repeated scale, chi^2, scale ...
+ calls within a script pay worker startup and imports only once - and shut down when the interpreter exits.  Its size
+ may be changed with set_shared_pool_size().  Calls with any other MAX_PROC are given their own pool, as before.
+ Callers hold the shared pool from acquire_shared_pool() to release_shared_pool().  Should the pool need restarting
+ while held (a new size or preload, or a new __main__ function) the holders keep the old pool until they are done.
+
+Pool workers may also preload resources - the catalog, cosmology, heavy imports - once as they start, rather than
+ each task paying for them on first use.  See set_worker_preload() and WORKER_PRELOAD_REGISTRY.
 """
-from typing import Callable, Iterable
-
-
-async def generic_async_wrapper( input_values: Iterable, async_function: Callable, output_values: list = None ) -> None:
+from threading import RLock
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+EXECUTION_BACKENDS = ("serial", "thread", "process", "asyncio", "auto")
+
+# Thresholds used by select_backend() for the "auto" backend
+AUTO_SERIAL_SECONDS = 0.05  # Estimated total work (seconds) below which a pool is not worth starting
+AUTO_THREAD_OVERHEAD = 5E-5  # Approximate cost (seconds) of handing one task to a thread pool
+AUTO_PROCESS_OVERHEAD = 2E-4  # Approximate cost (seconds) of handing one task to a process pool
+AUTO_PICKLE_RATE = 2E8  # Approximate rate (bytes / second) at which values are pickled and piped to a process
+
+DEFAULT_IO_CONCURRENCY = 16  # Default number of concurrent operations (threads) of generic_async_wrapper
+
+# Adaptive batching of the "process" and "thread" backends (see __pool_iter)
+TARGET_BATCH_SECONDS = 0.05  # Worker time per batch the batch size is adjusted towards
+TARGET_BATCH_BYTES = 4 * 1024 * 1024  # Maximum pickled size of a batch
+MAX_BATCH_SIZE = 1000  # Maximum number of values per batch
+
+__shared_pool = None
+__shared_pool_pid = None
+__shared_pool_size = None
+__shared_pool_main = None
+__shared_pool_users = { }  # { pool : number of holders } for the shared pool and any retired while held
+__shared_pool_lock = RLock()
+
+# Resources which pool workers may preload as they start (see set_worker_preload).  Module names are imported,
+# functions are called.
+WORKER_PRELOAD_REGISTRY = {
+    "catalog"  : "catalog",
+    "cosmology": "tools.cosmo",
+    "numpy"    : "numpy",
+    "scipy"    : "scipy.optimize",
+    "astropy"  : "astropy.cosmology",
+    "slope_fit": "analysis.slope_fit",
+    "chi"      : "analysis.chi",
+}
+__worker_preload = ()
+__warmup_queue = None
+__warmup_times = { }
+
+
+async def generic_async_wrapper( input_values: Iterable, async_function: Callable, output_values: list = None,
+                                 ordered: bool = False, max_concurrency: int = None ) -> None:
     """
-    Basic asyncronous operations wrapper.  Be aware, no order will be maintained in this process.
+    Basic asyncronous operations wrapper.  Unless ordered is True, no order will be maintained in this process.
     i.e. the results of output_values will very likely NOT correspond to those of input_values.
 
     input_values is a list of tuples. These values will be unpacked and passed to specified async_function
 
+    async_function may be a coroutine function, or an ordinary blocking function (such as a disk read or write).  A
+    blocking function is run on a thread pool executor, so that the operations truly overlap rather than each blocking
+    the event loop in turn.  In either case no more than max_concurrency operations run at once.
+
     SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
     METHODS
     
@@ -49,25 +119,567 @@ async def generic_async_wrapper( input_values: Iterable, async_function: Callabl
     If output_values is not given, no results will be returned from this method.
 
     :param input_values: list of tuples [ (val1, val2...), ... ] to be passed to async_function by async_function( *(val1, val2...) )
-    :param async_function: asyncronous method which contains the actual operation to be performed.
+    :param async_function: asyncronous (or blocking) method which contains the actual operation to be performed.
     :param output_values: If passed in, results returned by async_function will be appended to this list.
+    :param ordered: If True, output_values are appended in the order of input_values.  Defaults to False
+    :param max_concurrency: Maximum number of concurrent operations.  Defaults to DEFAULT_IO_CONCURRENCY
     :type input_values: list
     :type async_function: function
     :type output_values: list
+    :type ordered: bool
+    :type max_concurrency: int
     :return: None
     :rtype: None
     """
     import asyncio
-
-    coroutines = [ async_function( *input_value ) for input_value in input_values ]
-    completed, pending = await asyncio.wait( coroutines )
+    from concurrent.futures import ThreadPoolExecutor
+
+    max_concurrency = max_concurrency or DEFAULT_IO_CONCURRENCY
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore( max_concurrency )
+    is_coroutine = asyncio.iscoroutinefunction( async_function )
+    executor = None if is_coroutine else ThreadPoolExecutor( max_workers = max_concurrency )
+
+    async def operate( input_value ):
+        async with semaphore:
+            if is_coroutine:
+                return await async_function( *input_value )
+            return await loop.run_in_executor( executor, async_function, *input_value )
+
+    try:
+        coroutines = [ operate( input_value ) for input_value in input_values ]
+        if ordered:
+            results = await asyncio.gather( *coroutines )
+        else:
+            results = [ await result for result in asyncio.as_completed( coroutines ) ]
+    finally:
+        if executor is not None:
+            executor.shutdown( wait = True )
 
     if output_values is not None:
-        output_values.extend( [ result.result() for result in completed ] )
+        output_values.extend( results )
+
+
+def select_backend( n_tasks: int, task_seconds: float, payload_bytes: int = 0, picklable: bool = True ) -> str:
+    """
+    Chooses an execution backend for n_tasks tasks of task_seconds each, as used by the "auto" backend.
+
+    serial is chosen if the total work is below AUTO_SERIAL_SECONDS or each task is cheaper than handing it to a thread.
+    thread is chosen if the values or multi_function cannot be pickled, or if each task is not at least four times the
+    estimated cost of sending its payload_bytes to and from a process.  Otherwise, process is chosen.
+
+    :param n_tasks: Number of tasks to operate
+    :type n_tasks: int
+    :param task_seconds: Measured time of a single task, in seconds
+    :type task_seconds: float
+    :param payload_bytes: Pickled size of a single input value and its result.  Defaults to 0
+    :type payload_bytes: int
+    :param picklable: Whether the values and multi_function may be sent to a process.  Defaults to True
+    :type picklable: bool
+    :return: "serial", "thread" or "process"
+    :rtype: str
+    """
+    if n_tasks <= 1 or n_tasks * task_seconds < AUTO_SERIAL_SECONDS or task_seconds < AUTO_THREAD_OVERHEAD:
+        return "serial"
+    if not picklable or task_seconds < 4 * (AUTO_PROCESS_OVERHEAD + payload_bytes / AUTO_PICKLE_RATE):
+        return "thread"
+    return "process"
+
+
+def get_shared_pool( multi_function: Callable = None ):
+    """
+    Returns the shared worker pool used by the "process" backend, creating it if it has not yet been created (or was
+    created by a different process).  Its size is that given to set_shared_pool_size(), or cpu_count().  The pool is
+    shut down by shutdown_shared_pool(), which is registered to run when the interpreter exits.
+
+    Workers only know the __main__ script as it was when the pool was started.  If multi_function is passed and is a
+    __main__ function defined (or redefined) since, the pool is restarted so that the workers can find it.
+
+    A restart may replace the pool at any time, so a caller that keeps using the pool should hold it with
+    acquire_shared_pool() instead.
+
+    :param multi_function: Function about to be sent to the pool.  Defaults to None
+    :type multi_function: Callable
+    :return: The shared pool
+    :rtype: multiprocessing.pool.Pool
+    """
+    import atexit
+    import os
+    import sys
+    global __shared_pool, __shared_pool_pid, __shared_pool_main
+
+    with __shared_pool_lock:
+        main = vars( sys.modules[ "__main__" ] )
+        if __shared_pool is not None and getattr( multi_function, "__module__", None ) == "__main__":
+            name = multi_function.__qualname__
+            if name in main and __shared_pool_main.get( name ) is not main[ name ]:
+                __restart_shared_pool()
+
+        if __shared_pool is None or __shared_pool_pid != os.getpid():
+            if __shared_pool_pid is None:
+                atexit.register( shutdown_shared_pool )
+            if __shared_pool_pid != os.getpid():
+                # A forked child does not hold its parent's pools
+                __shared_pool_users.clear()
+            __shared_pool = __new_process_pool( shared_pool_size() )
+            __shared_pool_pid = os.getpid()
+            __shared_pool_main = dict( main )
+        return __shared_pool
+
+
+def acquire_shared_pool( multi_function: Callable = None ):
+    """
+    Returns the shared pool as get_shared_pool() does, and holds it until the matching release_shared_pool().  Should
+    the shared pool be restarted meanwhile (see set_shared_pool_size(), set_worker_preload() and get_shared_pool()),
+    later callers are given a new pool and this one is shut down only once every holder has released it.
+
+    :param multi_function: Function about to be sent to the pool.  Defaults to None
+    :type multi_function: Callable
+    :return: The shared pool
+    :rtype: multiprocessing.pool.Pool
+    """
+    with __shared_pool_lock:
+        pool = get_shared_pool( multi_function )
+        __shared_pool_users[ pool ] = __shared_pool_users.get( pool, 0 ) + 1
+        return pool
+
+
+def release_shared_pool( pool ) -> None:
+    """
+    Releases a pool held by acquire_shared_pool().  A pool replaced by a restart while held is shut down with its last
+    release.
+
+    :param pool: Pool returned by acquire_shared_pool()
+    :type pool: multiprocessing.pool.Pool
+    :rtype: None
+    """
+    with __shared_pool_lock:
+        users = __shared_pool_users.get( pool, 0 ) - 1
+        if users > 0:
+            __shared_pool_users[ pool ] = users
+            return
+        __shared_pool_users.pop( pool, None )
+        if pool is not __shared_pool:
+            pool.terminate()
+            pool.join()
+
+
+def shared_pool_size() -> int:
+    """
+    :return: Number of worker processes in the shared pool
+    :rtype: int
+    """
+    from multiprocessing import cpu_count
+    return __shared_pool_size or cpu_count()
+
+
+def set_shared_pool_size( size: int = None ) -> None:
+    """
+    Sets the number of worker processes in the shared pool.  If the shared pool is already running with a different
+    size it is restarted on next use (see acquire_shared_pool() for a pool still in use).
+
+    :param size: Number of worker processes.  Defaults to None (cpu_count())
+    :type size: int
+    :rtype: None
+    """
+    global __shared_pool_size
+    previous_size = shared_pool_size()
+    __shared_pool_size = size
+    if previous_size != shared_pool_size():
+        __restart_shared_pool()
+
+
+def shutdown_shared_pool() -> None:
+    """
+    Terminates the shared pool, if running, whether or not it is held.  Any later use will create a new one.
+
+    :rtype: None
+    """
+    import os
+    global __shared_pool
+
+    with __shared_pool_lock:
+        if __shared_pool is not None and __shared_pool_pid == os.getpid():
+            __shared_pool_users.pop( __shared_pool, None )
+            __shared_pool.terminate()
+            __shared_pool.join()
+        __shared_pool = None
+
+
+def __restart_shared_pool() -> None:
+    """
+    Has the next use of the shared pool create a new one.  The current pool is terminated now if no one holds it, and
+    otherwise left to its holders, to be terminated by the last release_shared_pool().
+    """
+    import os
+    global __shared_pool
+
+    with __shared_pool_lock:
+        if __shared_pool_users.get( __shared_pool, 0 ) > 0 and __shared_pool_pid == os.getpid():
+            __shared_pool = None
+        else:
+            shutdown_shared_pool()
+
+
+def register_preload( name: str, resource: Union[ str, Callable[ [ ], None ] ] ) -> None:
+    """
+    Registers a named resource which pool workers may be asked to preload by set_worker_preload().  resource is either
+    the dotted name of a module to import, or a picklable (module level) function called with no arguments.
+
+    :param name: Name of the resource
+    :type name: str
+    :param resource: Module name or function
+    :type resource: str or Callable
+    :rtype: None
+    """
+    WORKER_PRELOAD_REGISTRY[ name ] = resource
+
+
+def set_worker_preload( *names: str ) -> None:
+    """
+    Declares the registered resources (see WORKER_PRELOAD_REGISTRY and register_preload()) which every new pool worker
+    loads once, as it starts, rather than on first use by a task.  e.g.
+
+        set_worker_preload( "catalog", "cosmology" )
+
+    The shared pool is restarted if the declaration changes (see acquire_shared_pool() for a pool still in use).
+    Passing no names disables preloading.  The time each
+    worker spent on each resource may be found with get_worker_warmup().
+
+    :param names: Names of registered resources
+    :type names: str
+    :rtype: None
+    :raises: KeyError
+    """
+    global __worker_preload
+
+    unknown = [ name for name in names if name not in WORKER_PRELOAD_REGISTRY ]
+    if len( unknown ) > 0:
+        raise KeyError( f"async_tools: Unregistered preload resources {unknown}" )
+    if tuple( names ) != __worker_preload:
+        __worker_preload = tuple( names )
+        __restart_shared_pool()
+
+
+def get_worker_warmup() -> Dict[ int, Dict[ str, float ] ]:
+    """
+    Returns the preload warm up times reported by every pool worker started so far, as
+    { worker pid : { resource name : seconds } }.  Each worker also reports its "total" time.
+
+    :return: Warm up times per worker
+    :rtype: dict
+    """
+    from queue import Empty
+
+    if __warmup_queue is not None:
+        while True:
+            try:
+                pid, times = __warmup_queue.get_nowait()
+            except (Empty, OSError, ValueError):
+                break
+            __warmup_times[ pid ] = times
+    return dict( __warmup_times )
+
+
+def __preload_worker( resources: List[ Tuple[ str, Union[ str, Callable ] ] ], warmup_queue,
+                      cache_budget: int = None ) -> None:
+    """
+    Pool initializer.  Limits the worker's spectrum cache to cache_budget (see fileio.spec_cache.WORKER_CACHE_BUDGET),
+    then loads each of resources, reporting ( pid, { name : seconds } ) to warmup_queue.
+    """
+    import os
+    from importlib import import_module
+    from time import perf_counter
+
+    # A forked worker would otherwise keep the parent's cache, contents and full budget alike
+    if cache_budget is not None:
+        from fileio.spec_cache import SPEC_CACHE
+        SPEC_CACHE.set_budget( cache_budget )
+
+    if len( resources ) == 0:
+        return
+    times = { }
+    start = perf_counter()
+    for name, resource in resources:
+        resource_start = perf_counter()
+        if isinstance( resource, str ):
+            import_module( resource )
+        else:
+            resource()
+        times[ name ] = perf_counter() - resource_start
+    times[ "total" ] = perf_counter() - start
+    warmup_queue.put( (os.getpid(), times) )
+
+
+def __new_process_pool( processes: int ):
+    """
+    Creates a Pool of processes workers, each running __preload_worker for the declared preload resources and the
+    worker spectrum cache budget.
+    """
+    import sys
+    from multiprocessing import Pool, Queue
+    global __warmup_queue
+
+    spec_cache = sys.modules.get( "fileio.spec_cache" )
+    cache_budget = spec_cache.WORKER_CACHE_BUDGET if spec_cache is not None else None
+    resources = [ (name, WORKER_PRELOAD_REGISTRY[ name ]) for name in __worker_preload ]
+    if len( resources ) > 0 and __warmup_queue is None:
+        __warmup_queue = Queue()
+    return Pool( processes = processes, initializer = __preload_worker,
+                 initargs = (resources, __warmup_queue if len( resources ) > 0 else None, cache_budget) )
+
+
+def __get_process_pool( MAX_PROC: int = None, multi_function: Callable = None ):
+    """
+    Returns ( pool, shared ), where pool is the shared pool if MAX_PROC is None or its size, otherwise a new pool.  The
+    shared pool is held, and must be released with release_shared_pool().
+    """
+    if MAX_PROC is None or MAX_PROC == shared_pool_size():
+        return acquire_shared_pool( multi_function ), True
+    return __new_process_pool( MAX_PROC ), False
+
+
+def __execute( input_values: Iterable, multi_function: Callable, backend: str = "process", ordered: bool = False,
+               MAX_PROC: int = None, max_in_flight: int = None, chunksize: int = None ) -> Iterator:
+    """
+    Yields the result of multi_function for each of input_values using the given backend.  Results are in the order of
+    input_values if ordered is True, otherwise in the order they complete.  If max_in_flight is given, no more than that
+    many batches (or, for the asyncio backend, tasks) are submitted ahead of the results the caller has taken, so
+    input_values is only drawn from as results are consumed.  Values are sent to a pool in batches of chunksize; if not
+    given, the batch size is adapted as the run progresses (see __pool_iter).  Any pool other than the shared pool is
+    shut down when the generator finishes or is closed.
+    """
+    from multiprocessing import cpu_count
+
+    if backend not in EXECUTION_BACKENDS:
+        raise ValueError( f"async_tools: Unknown backend {backend}.  Must be one of {EXECUTION_BACKENDS}" )
+
+    if backend == "process":
+        pool, shared = __get_process_pool( MAX_PROC, multi_function )
+        try:
+            for r in __pool_iter( pool, multi_function, input_values, ordered, max_in_flight, chunksize,
+                                  MAX_PROC or shared_pool_size(), chunksize is None ):
+                yield r
+        except KeyboardInterrupt:
+            if shared:
+                shutdown_shared_pool()
+            raise
+        finally:
+            if shared:
+                release_shared_pool( pool )
+            else:
+                pool.terminate()
+                pool.join()
+        return
+
+    MAX_PROC = MAX_PROC or cpu_count()
+    if backend == "serial":
+        for input_value in input_values:
+            yield multi_function( input_value )
+
+    elif backend == "auto":
+        for r in __auto_execute( input_values, multi_function, ordered, MAX_PROC, max_in_flight, chunksize ):
+            yield r
+
+    elif backend == "asyncio":
+        for r in __asyncio_execute( input_values, multi_function, ordered, MAX_PROC, max_in_flight ):
+            yield r
+
+    else:
+        from multiprocessing.pool import ThreadPool
+
+        pool = ThreadPool( processes = MAX_PROC )
+        try:
+            for r in __pool_iter( pool, multi_function, input_values, ordered, max_in_flight, chunksize, MAX_PROC,
+                                  chunksize is None ):
+                yield r
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+
+def __pool_iter( pool, multi_function: Callable, input_values: Iterable, ordered: bool, max_in_flight: int = None,
+                 chunksize: int = None, n_workers: int = 1, adaptive: bool = False ) -> Iterator:
+    """
+    Yields the results of multi_function over input_values from pool.  Values are sent to the workers by
+    pool.apply_async in batches of chunksize.  No more than max_in_flight batches are outstanding, or if it is not
+    given, 16 * n_workers + 64.  If adaptive, the batch size is instead adjusted after each batch returns, from the
+    measured time per value and the pickled size of the first value, so that each batch takes about
+    TARGET_BATCH_SECONDS, holds at most TARGET_BATCH_BYTES / ( pickled size of the first value ) values, and at most
+    MAX_BATCH_SIZE.  The batch size does not depend on max_in_flight, which bounds memory only by the number of batches.
+    """
+    import pickle
+    from collections import deque
+    from itertools import islice
+    from queue import Queue
+
+    input_values = iter( input_values )
+    batch_size = chunksize or 1
+    max_batches = max( 1, max_in_flight ) if max_in_flight is not None else 16 * max( 1, n_workers ) + 64
+    task_seconds = None
+    value_bytes = None
+
+    pending = deque()
+    completed = Queue()
+    n_batches = 0
+    exhausted = False
+
+    def submit() -> None:
+        nonlocal n_batches, exhausted, value_bytes
+        batch = list( islice( input_values, batch_size ) )
+        if len( batch ) == 0:
+            exhausted = True
+            return
+        if adaptive and value_bytes is None:
+            try:
+                value_bytes = len( pickle.dumps( batch[ 0 ] ) )
+            except Exception:
+                value_bytes = 0
+        if ordered:
+            pending.append( pool.apply_async( __batch_call, ((multi_function, batch),) ) )
+        else:
+            pool.apply_async( __batch_call, ((multi_function, batch),), callback = lambda r: completed.put( (True, r) ),
+                              error_callback = lambda e: completed.put( (False, e) ) )
+        n_batches += 1
+
+    while True:
+        while not exhausted and n_batches < max_batches:
+            submit()
+        if n_batches == 0:
+            return
+
+        if ordered:
+            results, elapsed = pending.popleft().get()
+        else:
+            success, r = completed.get()
+            if not success:
+                raise r
+            results, elapsed = r
+        n_batches -= 1
+
+        if adaptive and len( results ) > 0:
+            per_value = elapsed / len( results )
+            task_seconds = per_value if task_seconds is None else 0.7 * task_seconds + 0.3 * per_value
+            size = TARGET_BATCH_SECONDS / max( task_seconds, 1E-7 )
+            if value_bytes:
+                size = min( size, TARGET_BATCH_BYTES / value_bytes )
+            batch_size = int( min( max( size, 1 ), MAX_BATCH_SIZE ) )
+
+        for r in results:
+            yield r
+
+
+def __batch_call( batch_input: tuple ) -> tuple:
+    """
+    Worker side of __pool_iter.  Operates multi_function over a batch of values, returning ( results, elapsed seconds ).
+    """
+    from time import perf_counter
+
+    multi_function, batch = batch_input
+    start = perf_counter()
+    results = [ multi_function( value ) for value in batch ]
+    return results, perf_counter() - start
+
+
+def __auto_execute( input_values: Iterable, multi_function: Callable, ordered: bool, MAX_PROC: int,
+                    max_in_flight: int = None, chunksize: int = None ) -> Iterator:
+    """
+    Operates the first input value serially to time it, then operates the remainder on the backend chosen by
+    select_backend().
+    """
+    import pickle
+    from time import perf_counter
+
+    n_values = len( input_values ) if hasattr( input_values, "__len__" ) else None
+    input_values = iter( input_values )
+    try:
+        first = next( input_values )
+    except StopIteration:
+        return
+
+    start = perf_counter()
+    result = multi_function( first )
+    task_seconds = perf_counter() - start
+    yield result
+
+    # The number of remaining values is needed to choose a backend; only unsized iterables must be drawn out for it
+    remaining = input_values if n_values is not None else list( input_values )
+    n_remaining = n_values - 1 if n_values is not None else len( remaining )
+    try:
+        payload_bytes = len( pickle.dumps( first ) ) + len( pickle.dumps( result ) )
+        pickle.dumps( multi_function )
+        picklable = True
+    except Exception:
+        payload_bytes, picklable = 0, False
+
+    backend = select_backend( n_remaining, task_seconds, payload_bytes, picklable )
+    for r in __execute( remaining, multi_function, backend, ordered, MAX_PROC, max_in_flight, chunksize ):
+        yield r
+
+
+def __asyncio_execute( input_values: Iterable, multi_function: Callable, ordered: bool, MAX_PROC: int,
+                       max_in_flight: int = None ) -> Iterator:
+    """
+    Operates input_values on a new event loop, at most MAX_PROC at once and with at most max_in_flight tasks created
+    ahead of the caller.  Coroutine functions are awaited, anything else is run in a thread pool executor.
+    """
+    import asyncio
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    async def new_semaphore():
+        return asyncio.Semaphore( MAX_PROC )
+
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor( max_workers = MAX_PROC )
+    is_coroutine = asyncio.iscoroutinefunction( multi_function )
+    semaphore = loop.run_until_complete( new_semaphore() )
+    input_values = iter( input_values )
+
+    async def operate( input_value ):
+        if not is_coroutine:
+            return await loop.run_in_executor( executor, multi_function, input_value )
+        async with semaphore:
+            return await multi_function( input_value )
+
+    tasks = deque()
+
+    def submit() -> bool:
+        try:
+            tasks.append( loop.create_task( operate( next( input_values ) ) ) )
+            return True
+        except StopIteration:
+            return False
+
+    try:
+        while (max_in_flight is None or len( tasks ) < max_in_flight) and submit():
+            pass
+        if ordered:
+            while tasks:
+                result = loop.run_until_complete( tasks[ 0 ] )
+                tasks.popleft()
+                submit()
+                yield result
+        else:
+            while tasks:
+                done, _ = loop.run_until_complete( asyncio.wait( tasks, return_when = asyncio.FIRST_COMPLETED ) )
+                for task in done:
+                    tasks.remove( task )
+                    submit()
+                for task in done:
+                    yield task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        if len( tasks ) > 0:
+            loop.run_until_complete( asyncio.wait( tasks ) )
+        executor.shutdown( wait = False )
+        loop.close()
 
 
 def generic_unordered_multiprocesser( input_values: Iterable, multi_function: Callable, output_values: list = None,
-                                      MAX_PROC: int = None ) -> None:
+                                      MAX_PROC: int = None, backend: str = "process", chunksize: int = None ) -> None:
     """
     SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
     METHODS
@@ -75,31 +687,110 @@ def generic_unordered_multiprocesser( input_values: Iterable, multi_function: Ca
     :param input_values: Iterable of values to pass to multi_function 
     :param multi_function: Callable which accepts only one input value, which will be passed from input_values
     :param output_values: If output values are desired, they will be gathered here.
-    :param MAX_PROC: Maxmium number of concurrent processed - will be passed to Pool().  Defaults to cpu_count()
+    :param MAX_PROC: Maxmium number of concurrent processes (or threads) - will be passed to Pool().  Defaults to
+    cpu_count()
     :type input_values: list
     :type multi_function: Callable
     :type output_values: list
     :type MAX_PROC: int
+    :param backend: Execution backend, one of EXECUTION_BACKENDS.  Defaults to "process"
+    :type backend: str
+    :param chunksize: Number of values sent to a worker at once.  Defaults to None (adaptive)
+    :type chunksize: int
     :return: None
     :rtype: None
     """
-    from multiprocessing import Pool, cpu_count
-    MAX_PROC = MAX_PROC or cpu_count()
-    pool = Pool( processes = MAX_PROC )
-
-    results = pool.imap_unordered( multi_function, input_values )
-    pool.close()
-    pool.join()
+    results = __execute( input_values, multi_function, backend, False, MAX_PROC, chunksize = chunksize )
 
     if output_values is not None:
         for r in results:
             output_values.append( r )
+    else:
+        for _ in results:
+            pass
+
+
+def generic_unordered_multiprocesser_iter( input_values: Iterable, multi_function: Callable,
+                                           MAX_PROC: int = None, backend: str = "process",
+                                           max_in_flight: int = None, chunksize: int = None ) -> Iterator:
+    """
+    Generator form of generic_unordered_multiprocesser.  Rather than gathering results into an output list after the
+    pool has finished, each result is yielded as soon as a worker returns it, in no guaranteed order.
 
-    del pool
+    At most max_in_flight batches of values (see chunksize) are handed to the workers ahead of the results taken by the
+    caller, so input_values (which may itself be a generator) is drawn from only as fast as results are consumed, and
+    memory holds no more than max_in_flight batches of pending results.  This allows for progress display or early
+    filtering of large runs.
+
+    max_in_flight counts batches, not values.  With a chunksize, up to max_in_flight * chunksize values are pending.
+    Without one, each batch holds at most MAX_BATCH_SIZE values and at most TARGET_BATCH_BYTES / ( pickled size of
+    the first value ) values, so about max_in_flight * TARGET_BATCH_BYTES of values are pending if later values are no
+    larger than the first.  When streaming values of varying size, pass a chunksize (or a smaller max_in_flight) to
+    bound memory regardless of the first value.
+
+    If the caller stops iterating early (break, close(), or the generator being garbage collected) no further values
+    are submitted; any still in flight on the shared pool are left to finish and their results discarded, while a pool
+    of its own is terminated.
+
+    SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
+    METHODS
+
+    :param input_values: Iterable of values to pass to multi_function
+    :param multi_function: Callable which accepts only one input value, which will be passed from input_values
+    :param MAX_PROC: Maxmium number of concurrent processes (or threads) - will be passed to Pool().  Defaults to
+    cpu_count()
+    :param backend: Execution backend, one of EXECUTION_BACKENDS.  Defaults to "process"
+    :param max_in_flight: Maximum number of batches submitted but not yet yielded.  Defaults to 4 * MAX_PROC
+    :param chunksize: Number of values sent to a worker at once.  Defaults to None (adaptive)
+    :type input_values: Iterable
+    :type multi_function: Callable
+    :type MAX_PROC: int
+    :type backend: str
+    :type max_in_flight: int
+    :type chunksize: int
+    :return: Generator of multi_function results
+    :rtype: Iterator
+    """
+    max_in_flight = max_in_flight or 4 * (MAX_PROC or shared_pool_size())
+    for r in __execute( input_values, multi_function, backend, False, MAX_PROC, max_in_flight, chunksize ):
+        yield r
+
+
+def generic_ordered_multiprocesser_iter( input_values: Iterable, multi_function: Callable,
+                                         MAX_PROC: int = None, backend: str = "process",
+                                         max_in_flight: int = None, chunksize: int = None ) -> Iterator:
+    """
+    Generator form of generic_ordered_multiprocesser.  Results are yielded in the order of input_values, each as soon as
+    it and every result before it have been returned.  See generic_unordered_multiprocesser_iter for max_in_flight and
+    stopping early, and for the values max_in_flight allows pending.  Note that one slow value holds back the results
+    after it, up to max_in_flight batches.
+
+    SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
+    METHODS
+
+    :param input_values: Iterable of values to pass to multi_function
+    :param multi_function: Callable which accepts only one input value, which will be passed from input_values
+    :param MAX_PROC: Maxmium number of concurrent processes (or threads) - will be passed to Pool().  Defaults to
+    cpu_count()
+    :param backend: Execution backend, one of EXECUTION_BACKENDS.  Defaults to "process"
+    :param max_in_flight: Maximum number of batches submitted but not yet yielded.  Defaults to 4 * MAX_PROC
+    :param chunksize: Number of values sent to a worker at once.  Defaults to None (adaptive)
+    :type input_values: Iterable
+    :type multi_function: Callable
+    :type MAX_PROC: int
+    :type backend: str
+    :type max_in_flight: int
+    :type chunksize: int
+    :return: Generator of multi_function results
+    :rtype: Iterator
+    """
+    max_in_flight = max_in_flight or 4 * (MAX_PROC or shared_pool_size())
+    for r in __execute( input_values, multi_function, backend, True, MAX_PROC, max_in_flight, chunksize ):
+        yield r
 
 
 def generic_ordered_multiprocesser( input_values: Iterable, multi_function: Callable, output_values: list = None,
-                                    MAX_PROC: int = None ) -> None:
+                                    MAX_PROC: int = None, backend: str = "process", chunksize: int = None ) -> None:
     """
     SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
     METHODS
@@ -107,31 +798,31 @@ def generic_ordered_multiprocesser( input_values: Iterable, multi_function: Call
     :param input_values: Iterable of values to pass to multi_function 
     :param multi_function: Callable which accepts only one input value, which will be passed from input_values
     :param output_values: If output values are desired, they will be gathered here.
-    :param MAX_PROC: Maxmium number of concurrent processed - will be passed to Pool().  Defaults to cpu_count()
+    :param MAX_PROC: Maxmium number of concurrent processes (or threads) - will be passed to Pool().  Defaults to
+    cpu_count()
     :type input_values: list
     :type multi_function: Callable
     :type output_values: list
     :type MAX_PROC: int
+    :param backend: Execution backend, one of EXECUTION_BACKENDS.  Defaults to "process"
+    :type backend: str
+    :param chunksize: Number of values sent to a worker at once.  Defaults to None (adaptive)
+    :type chunksize: int
     :return: None
     :rtype: None
     """
-    from multiprocessing import Pool, cpu_count
-    MAX_PROC = MAX_PROC or cpu_count()
-    pool = Pool( processes = MAX_PROC )
-
-    results = pool.imap( multi_function, input_values )
-    pool.close()
-    pool.join()
+    results = __execute( input_values, multi_function, backend, True, MAX_PROC, chunksize = chunksize )
 
     if output_values is not None:
         for r in results:
             output_values.append( r )
-
-    del pool
+    else:
+        for _ in results:
+            pass
 
 
 def generic_map_async_multiprocesser( input_values: Iterable, multi_function: Callable, output_values: list = None,
-                                      MAX_PROC: int = None ) -> None:
+                                      MAX_PROC: int = None, backend: str = "process", chunksize: int = None ) -> None:
     """
     SEE NOTES AT THE TOP OF THE tools.async_tools PACKAGE FOR MORE INFORMATION ON HOW TO USE THE generic_ MULTIPROCESS
     METHODS
@@ -139,24 +830,34 @@ def generic_map_async_multiprocesser( input_values: Iterable, multi_function: Ca
     :param input_values: Iterable of values to pass to multi_function 
     :param multi_function: Callable which accepts only one input value, which will be passed from input_values
     :param output_values: If output values are desired, they will be gathered here.
-    :param MAX_PROC: Maxmium number of concurrent processed - will be passed to Pool().  Defaults to cpu_count()
+    :param MAX_PROC: Maxmium number of concurrent processes (or threads) - will be passed to Pool().  Defaults to
+    cpu_count()
     :type input_values: list
     :type multi_function: Callable
     :type output_values: list
     :type MAX_PROC: int
+    :param backend: Execution backend, one of EXECUTION_BACKENDS.  Defaults to "process"
+    :type backend: str
+    :param chunksize: Number of values sent to a worker at once, by pool.map_async for the "process" backend.  Defaults
+    to None (adaptive, as the other generic_ methods)
+    :type chunksize: int
     :return: None
     :rtype: None
     """
-    from multiprocessing import Pool
-
-    pool = Pool( processes = MAX_PROC )
-
-    results = pool.map_async( multi_function, input_values )
-    pool.close()
-    pool.join()
+    # Without a chunksize, the "process" backend batches adaptively (see __pool_iter) rather than leaving map_async to
+    # pick one fixed chunksize from the number of values
+    if backend != "process" or chunksize is None:
+        results = list( __execute( input_values, multi_function, backend, True, MAX_PROC, chunksize = chunksize ) )
+    else:
+        pool, shared = __get_process_pool( MAX_PROC, multi_function )
+        try:
+            results = pool.map_async( multi_function, input_values, chunksize ).get()
+        finally:
+            if shared:
+                release_shared_pool( pool )
+            else:
+                pool.terminate()
+                pool.join()
 
     if output_values is not None:
-        output_values.extend( results.get() )
-
-    del pool
-
+        output_values.extend( results )
@@ -1,4 +1,4 @@
-from typing import Callable, List, Union
+from typing import Callable, List, Tuple, Union
 
 import Gnuplot
 
@@ -169,7 +169,8 @@ def four_panel_multiplot( path: str, filename: str, prime: Spectrum, speclist: I
 
 def ab_z_plot( path: str, filename: str, points: Union[ dict, List[ str ], List[ Spectrum ] ],
                primary: Union[ str or Spectrum ] = None, plotTitle: str = "", n_sigma: float = 1,
-               rs_fit_func: Callable[ [ float ], float ] = None, rs_fit_title: str = None, png: bool = False,
+               rs_fit_func: Callable[ [ float ], float ] = None, rs_fit_title: str = None,
+               rs_fit_band: Tuple[ Iterable, Iterable, Iterable ] = None, png: bool = False,
                debug: bool = False ) -> None:
     """
     Make an AB magnitude vs Redshift plot.
@@ -186,6 +187,9 @@ def ab_z_plot( path: str, filename: str, points: Union[ dict, List[ str ], List[
     the plot and so should only take one value: rs_fit_func( z ).  A specific title for the key can be provided in 
     rs_fit_title.  Otherwise it will be labeled simply "Fit function."
     
+    rs_fit_band may be passed as ( x values, lower values, upper values ) to draw a confidence band about the fit, such
+    as the 'band' returned by analysis.slope_fit.bootstrap_fit or monte_carlo_fit.
+    
     If png = True is passed, png terminal will be used to plot output rather than the default PDF terminal.  The
     filename extension will be adjusted accordingly.
     
@@ -205,6 +209,8 @@ def ab_z_plot( path: str, filename: str, points: Union[ dict, List[ str ], List[
     :type rs_fit_func: Callable
     :param rs_fit_title: Title of rs_fit_function for key
     :type rs_fit_title: str
+    :param rs_fit_band: ( x, lower, upper ) lists of a fit confidence band
+    :type rs_fit_band: tuple
     :param png: Use PNG terminal rather than PDF terminal.  Not as pretty, but quicker to scroll between when visually parsing data
     :type png: bool
     :param debug: Don't output to a file, call Gnuplot with persist = True.
@@ -269,6 +275,12 @@ def ab_z_plot( path: str, filename: str, points: Union[ dict, List[ str ], List[
                                       with_=" dt '-'", color="grey50" )
         plotlist.append( fitplot )
 
+    if rs_fit_band is not None:
+        band_x, band_lower, band_upper = rs_fit_band
+        plotlist.append( make_line_plotitem( band_x, band_lower, "Fit Confidence Band", with_=" dt '.'",
+                                             color="grey50" ) )
+        plotlist.append( make_line_plotitem( band_x, band_upper, "", with_=" dt '.'", color="grey50" ) )
+
     """ Data has been formed.  Make actual plot """
     g = Gnuplot.Gnuplot( persist=debug )
     g.title( r"%s" % plotTitle )